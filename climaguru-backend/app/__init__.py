@@ -51,7 +51,7 @@ def create_app(config_name=None):
 )
     
     # Importar modelos para que SQLAlchemy los registre
-    from app.models import Usuario, APIKey, Consulta, DatosClima, Sesion, LogsActividad, CiudadesFavoritas
+    from app.models import Usuario, APIKey, Consulta, BlobDatos, DatosClima, Sesion, LogsActividad, CiudadesFavoritas
     
     # Inicializar base de datos (MySQL y SQLite)
     with app.app_context():
@@ -64,6 +64,12 @@ def create_app(config_name=None):
     # Registrar blueprints (rutas)
     register_blueprints(app)
     
+    # Refresco en segundo plano de las ciudades favoritas
+    start_prewarmer(app)
+    
+    # Escritura por lotes de la auditoría (opcional)
+    start_audit_queue(app)
+    
     # Configurar logging
     setup_logging(app)
     
@@ -93,6 +99,39 @@ def register_blueprints(app):
         return {'status': 'ok', 'message': 'ClimaGuru API está funcionando'}, 200
 
 
+def start_prewarmer(app):
+    """Iniciar el precalentamiento de la caché de clima para las ciudades favoritas"""
+    if not app.config.get('WEATHER_PREWARM_ENABLED'):
+        return
+    
+    from app.routes.consultas import aggregator
+    from app.services.prewarm import FavoritesPrewarmer
+    
+    # El candado de la ronda solo coordina a los workers si la caché es compartida
+    if not aggregator.cache.shared:
+        app.logger.warning(
+            f"Precalentamiento deshabilitado: la caché '{aggregator.cache.name}' es local del proceso "
+            "y cada worker consultaría todas las favoritas; use WEATHER_CACHE_BACKEND=sqlite o redis"
+        )
+        return
+    
+    app.extensions['favorites_prewarmer'] = FavoritesPrewarmer(
+        app, aggregator, interval=app.config['WEATHER_PREWARM_INTERVAL']
+    )
+    app.extensions['favorites_prewarmer'].start()
+
+
+def start_audit_queue(app):
+    """Iniciar la cola write-behind de LogsActividad si está habilitada"""
+    if not app.config.get('AUDIT_WRITE_BEHIND'):
+        return
+    
+    from app.services.audit_queue import AuditLogQueue
+    
+    app.extensions['audit_queue'] = AuditLogQueue(app, interval=app.config['AUDIT_FLUSH_INTERVAL'])
+    app.extensions['audit_queue'].start()
+
+
 def setup_logging(app):
     """Configurar sistema de logging"""
     import logging
@@ -51,6 +51,21 @@ class Config:
     # Logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FILE = os.getenv('LOG_FILE', 'logs/climaguru.log')
+    
+    # Teselas de radar pre-renderizadas (src/processors/radar_tiles.py)
+    RADAR_TILES_DIR = os.getenv('RADAR_TILES_DIR', os.path.join('..', 'productos_radar', 'teselas'))
+    RADAR_TILES_MAX_AGE = int(os.getenv('RADAR_TILES_MAX_AGE', 31536000))  # 1 año
+    RADAR_TILES_EMPTY_MAX_AGE = int(os.getenv('RADAR_TILES_EMPTY_MAX_AGE', 300))  # teselas sin ecos (204)
+
+    # Refresco periódico del clima de las ciudades favoritas (app/services/prewarm.py)
+    # Requiere un backend de caché compartido (sqlite o redis): con la caché en memoria
+    # cada worker precalentaría todas las favoritas por su cuenta
+    WEATHER_PREWARM_ENABLED = os.getenv('WEATHER_PREWARM_ENABLED', 'false').lower() == 'true'
+    WEATHER_PREWARM_INTERVAL = int(os.getenv('WEATHER_PREWARM_INTERVAL', 60))
+    
+    # Auditoría diferida: LogsActividad de consultas en tiempo real por lotes (app/services/audit_queue.py)
+    AUDIT_WRITE_BEHIND = os.getenv('AUDIT_WRITE_BEHIND', 'false').lower() == 'true'
+    AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', 2.0))
 
 
 class DevelopmentConfig(Config):
@@ -78,6 +93,7 @@ class TestingConfig(Config):
     # Usar base de datos de prueba
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(seconds=5)
+    WEATHER_PREWARM_ENABLED = False
 
 
 # Diccionario de configuraciones
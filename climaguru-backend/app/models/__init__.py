@@ -8,6 +8,7 @@ from app.models.usuario import Usuario
 from app.models.sesion import Sesion
 from app.models.api_key import APIKey
 from app.models.consulta import Consulta
+from app.models.blob_datos import BlobDatos
 from app.models.dato_meteorologico import DatosClima
 from app.models.logs_actividad import LogsActividad
 from app.models.ciudades_favoritas import CiudadesFavoritas
@@ -18,6 +19,7 @@ __all__ = [
     'Sesion',
     'APIKey', 
     'Consulta',
+    'BlobDatos',
     'DatosClima',
     'LogsActividad',
     'CiudadesFavoritas'
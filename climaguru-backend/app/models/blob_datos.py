@@ -0,0 +1,76 @@
+"""
+Modelo: BlobDatos
+=================
+Almacén direccionado por contenido de los resultados completos del agregador:
+cada payload distinto se guarda una sola vez, comprimido, con su hash SHA-256
+como clave primaria. Las filas de datos_clima lo referencian por hash.
+"""
+import json
+import zlib
+import hashlib
+from app import db
+from datetime import datetime
+
+
+class BlobDatos(db.Model):
+    """Payload JSON comprimido, único por contenido"""
+
+    __tablename__ = 'blobs_datos'
+
+    hash = db.Column(db.String(64), primary_key=True)  # SHA-256 del JSON canónico
+    codificacion = db.Column(db.String(10), nullable=False, default='zlib')
+    datos = db.Column(db.LargeBinary(length=16777215), nullable=False)  # MEDIUMBLOB en MySQL
+    tamano_original = db.Column(db.Integer)
+    tamano_comprimido = db.Column(db.Integer)
+    creado_en = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @staticmethod
+    def serializar(payload):
+        """JSON canónico (claves ordenadas, sin espacios) para que el hash no dependa del orden"""
+        return json.dumps(payload, sort_keys=True, separators=(',', ':'),
+                          ensure_ascii=False, default=str).encode('utf-8')
+
+    @classmethod
+    def guardar(cls, payload):
+        """
+        Guarda el payload si su contenido no existía y devuelve su hash
+
+        Es un solo INSERT que ignora la clave duplicada (otra solicitud pudo guardar
+        el mismo contenido al mismo tiempo); como el hash identifica el contenido,
+        no hace falta releer ni bloquear la fila.
+        """
+        raw = cls.serializar(payload)
+        digest = hashlib.sha256(raw).hexdigest()
+        comprimido = zlib.compress(raw, 6)
+        db.session.execute(cls._insertar_si_no_existe({
+            'hash': digest, 'codificacion': 'zlib', 'datos': comprimido,
+            'tamano_original': len(raw), 'tamano_comprimido': len(comprimido),
+            'creado_en': datetime.utcnow(),
+        }))
+        return digest
+
+    @classmethod
+    def _insertar_si_no_existe(cls, fila):
+        """INSERT que no falla si el hash ya existe, según el motor de base de datos"""
+        dialecto = db.session.get_bind().dialect.name
+        if dialecto in ('mysql', 'mariadb'):
+            from sqlalchemy.dialects.mysql import insert
+            stmt = insert(cls.__table__).values(**fila)
+            return stmt.on_duplicate_key_update(hash=stmt.inserted.hash)
+        if dialecto == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialecto == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            raise NotImplementedError(f"Motor no soportado para blobs_datos: {dialecto}")
+        return insert(cls.__table__).values(**fila).on_conflict_do_nothing(index_elements=['hash'])
+
+    def contenido(self):
+        """Payload descomprimido (se decodifica una vez por instancia, al primer acceso)"""
+        if not hasattr(self, '_contenido'):
+            raw = zlib.decompress(self.datos) if self.codificacion == 'zlib' else self.datos
+            self._contenido = json.loads(raw)
+        return self._contenido
+
+    def __repr__(self):
+        return f'<BlobDatos {self.hash[:12]} {self.tamano_comprimido}/{self.tamano_original} bytes>'
@@ -40,9 +40,34 @@ class DatosClima(db.Model):
     
     # Metadatos
     fuentes_utilizadas = db.Column(db.JSON)
-    datos_completos = db.Column(db.JSON)  # Todos los datos crudos
+    # Todos los datos crudos: en blobs_datos (comprimidos y sin duplicar) referenciados por
+    # hash; la columna JSON solo conserva filas anteriores a la migración
+    datos_hash = db.Column(db.String(64), db.ForeignKey('blobs_datos.hash'), index=True)
+    datos_completos_json = db.Column('datos_completos', db.JSON)
+    # Campos propios de la solicitud (CAMPOS_SOLICITUD), fuera del blob para que las
+    # consultas servidas desde la misma celda en caché compartan su contenido
+    datos_solicitud = db.Column(db.JSON)
     guardado_en = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # lazy='select': el blob solo se lee (y descomprime) al acceder a datos_completos
+    blob = db.relationship('BlobDatos', lazy='select')
+    
+    CAMPOS_SOLICITUD = ('ciudad', 'coordenadas')
+    
+    @property
+    def datos_completos(self):
+        """Resultado completo del agregador"""
+        if self.blob is not None:
+            return dict(self.blob.contenido(), **(self.datos_solicitud or {}))
+        return self.datos_completos_json
+    
+    @classmethod
+    def separar_solicitud(cls, result):
+        """(contenido de la celda, campos de la solicitud) de un resultado del agregador"""
+        contenido = {k: v for k, v in result.items() if k not in cls.CAMPOS_SOLICITUD}
+        solicitud = {k: result[k] for k in cls.CAMPOS_SOLICITUD if k in result}
+        return contenido, solicitud
+    
     def to_dict(self):
         """Convertir a diccionario"""
         return {
@@ -4,10 +4,12 @@ Rutas de Consultas
 ==================
 Endpoints para realizar consultas meteorológicas
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
+import time
 from datetime import datetime
 from app.extensions import db
+from app.models.blob_datos import BlobDatos
 from app.models.consulta import Consulta
 from app.models.dato_meteorologico import DatosClima
 from app.models.logs_actividad import LogsActividad
@@ -34,8 +36,9 @@ def consulta_tiempo_real():
         - formato: string (json, csv, txt, yaml) - default: json
     
     Returns:
-        - consulta: datos de la consulta registrada
-        - datos: datos climáticos procesados
+        200: resultado del agregador (resumen, fuentes, pronóstico, ...) y consulta_id
+        207: el mismo resultado, pero la consulta no se pudo registrar: consulta_id es
+             null y error_registro explica el fallo
     """
     usuario_id = get_jwt_identity()
     data = request.get_json()
@@ -46,22 +49,7 @@ def consulta_tiempo_real():
             'error': 'Debe proporcionar ciudad o coordenadas (latitud, longitud)'
         }), 400
     
-    # Crear registro de consulta
-    consulta = Consulta(
-        usuario_id=int(usuario_id),  # Convert string to int
-        tipo_consulta='tiempo_real',
-        ciudad=data.get('ciudad'),
-        latitud=data.get('latitud'),
-        longitud=data.get('longitud'),
-        formato_salida=data.get('formato', 'json'),
-        parametros_solicitados=data.get('parametros', ['temperatura', 'humedad', 'viento']),
-        estado='procesando',
-        ip_origen=request.remote_addr
-    )
-    
-    db.session.add(consulta)
-    db.session.commit()
-    
+    started = time.monotonic()
     try:
         # Usar WeatherAggregator para obtener datos reales
         result = aggregator.get_all_weather(
@@ -69,13 +57,39 @@ def consulta_tiempo_real():
             lat=data.get('latitud'),
             lon=data.get('longitud')
         )
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        
+        try:
+            db.session.add(_nueva_consulta(usuario_id, data, estado='error', mensaje_error=str(e)))
+            db.session.commit()
+        except Exception as db_error:
+            db.session.rollback()
+            current_app.logger.error(f"No se pudo registrar la consulta fallida: {db_error}")
         
+        return jsonify({
+            'error': 'Error al procesar la consulta',
+            'message': str(e)
+        }), 500
+    
+    # Consulta, datos y auditoría se guardan en una sola transacción (un commit)
+    consulta = _nueva_consulta(usuario_id, data, estado='completada')
+    consulta.completada_en = datetime.utcnow()
+    consulta.tiempo_respuesta_ms = int((time.monotonic() - started) * 1000)
+    
+    # Con la cola de auditoría activa, el log se escribe por lotes fuera de la solicitud
+    audit_queue = current_app.extensions.get('audit_queue')
+    consulta_id = None
+    error_registro = None
+    try:
         # Extraer resumen para guardar en BD
         resumen = result.get('resumen', {})
-        
-        # Guardar datos procesados
-        datos_clima = DatosClima(
-            consulta_id=consulta.id,
+        # El resultado completo va a blobs_datos (un INSERT que ignora duplicados);
+        # la ciudad y coordenadas de esta solicitud quedan en la fila de datos_clima
+        contenido, solicitud = DatosClima.separar_solicitud(result)
+        datos_hash = BlobDatos.guardar(contenido)
+        consulta.datos_clima = DatosClima(
             temperatura_promedio=resumen.get('temperatura'),
             humedad_relativa=resumen.get('humedad'),
             presion_atmosferica=resumen.get('presion'),
@@ -83,47 +97,59 @@ def consulta_tiempo_real():
             direccion_viento=None,  # No disponible en resumen
             descripcion_clima=resumen.get('descripcion'),
             fuentes_utilizadas=list(result.get('fuentes', {}).keys()),
-            datos_completos=result
+            datos_hash=datos_hash,
+            datos_solicitud=solicitud
         )
         
-        db.session.add(datos_clima)
-        
-        # Actualizar consulta
-        consulta.estado = 'completada'
-        consulta.completada_en = datetime.utcnow()
-        consulta.tiempo_respuesta_ms = 500  # TODO: medir tiempo real
-        
-        db.session.commit()
+        db.session.add(consulta)
+        # flush asigna consulta.id dentro de la misma transacción
+        db.session.flush()
+        detalle = {
+            'consulta_id': consulta.id,
+            'ciudad': result.get('ciudad'),
+            'fuentes': result.get('total_fuentes')
+        }
+        if audit_queue is None:
+            db.session.add(LogsActividad(
+                usuario_id=int(usuario_id),
+                accion='consulta_tiempo_real',
+                detalle=detalle,
+                ip_address=request.remote_addr
+            ))
         
-        # Registrar log
-        log = LogsActividad(
-            usuario_id=int(usuario_id),
-            accion='consulta_tiempo_real',
-            detalle={
-                'consulta_id': consulta.id,
-                'ciudad': result.get('ciudad'),
-                'fuentes': result.get('total_fuentes')
-            },
-            ip_address=request.remote_addr
-        )
-        db.session.add(log)
         db.session.commit()
-        
-        # Retornar resultado directamente del agregador
-        return jsonify(result), 200
-        
+        consulta_id = detalle['consulta_id']
     except Exception as e:
-        consulta.estado = 'error'
-        consulta.mensaje_error = str(e)
-        db.session.commit()
-        
-        import traceback
-        traceback.print_exc()
-        
-        return jsonify({
-            'error': 'Error al procesar la consulta',
-            'message': str(e)
-        }), 500
+        # Los datos del clima ya se obtuvieron: se entregan igual, con 207 y error_registro
+        # para que el cliente sepa que la consulta no quedó registrada
+        db.session.rollback()
+        current_app.logger.error(f"No se pudo registrar la consulta: {e}")
+        error_registro = 'La consulta no se pudo registrar en el historial'
+    else:
+        if audit_queue is not None:
+            audit_queue.log('consulta_tiempo_real', usuario_id=int(usuario_id), detalle=detalle,
+                            ip_address=request.remote_addr)
+    
+    # Resultado del agregador más el id de la consulta registrada
+    if error_registro:
+        return jsonify(dict(result, consulta_id=None, error_registro=error_registro)), 207
+    return jsonify(dict(result, consulta_id=consulta_id)), 200
+
+
+def _nueva_consulta(usuario_id, data, estado, mensaje_error=None):
+    """Registro de Consulta de tiempo real a partir del cuerpo de la solicitud"""
+    return Consulta(
+        usuario_id=int(usuario_id),  # Convert string to int
+        tipo_consulta='tiempo_real',
+        ciudad=data.get('ciudad'),
+        latitud=data.get('latitud'),
+        longitud=data.get('longitud'),
+        formato_salida=data.get('formato', 'json'),
+        parametros_solicitados=data.get('parametros', ['temperatura', 'humedad', 'viento']),
+        estado=estado,
+        mensaje_error=mensaje_error,
+        ip_origen=request.remote_addr
+    )
 
 
 @consultas_bp.route('/historico', methods=['POST'])
@@ -370,3 +396,10 @@ def get_ideam_radar_detail(nombre):
     if not radar:
         return jsonify({'error': 'Radar no encontrado'}), 404
     return jsonify({'radar': radar}), 200
+
+
+@consultas_bp.route('/proveedores/estado', methods=['GET'])
+@jwt_required()
+def get_estado_proveedores():
+    """Estado de los circuitos y latencias de los proveedores meteorológicos"""
+    return jsonify({'proveedores': aggregator.provider_status()}), 200
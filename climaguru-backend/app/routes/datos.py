@@ -2,13 +2,118 @@
 """
 Rutas de Datos
 ================
-Endpoints para obtener datos históricos y estadísticas
+Endpoints para obtener datos históricos, estadísticas, teselas de radar y
+autocompletado de municipios
 """
-from flask import Blueprint, jsonify
+import os
+import json
+from flask import Blueprint, jsonify, request, current_app, send_from_directory, abort
+from app.services.gazetteer import get_gazetteer
 
 datos_bp = Blueprint('datos', __name__)
 
+FORMATOS_TESELA = {'png': 'image/png', 'webp': 'image/webp'}
+
+
+def _directorio_teselas():
+    """Directorio absoluto donde el generador deja las pirámides de teselas"""
+    return os.path.abspath(os.path.join(current_app.root_path, '..',
+                                        current_app.config['RADAR_TILES_DIR']))
+
+
 @datos_bp.route('/historicos', methods=['GET'])
 def get_historicos():
     """Obtener datos históricos"""
     return jsonify({'message': 'Endpoint de datos históricos'})
+
+
+@datos_bp.route('/ciudades/autocompletar', methods=['GET'])
+def autocompletar_ciudades():
+    """
+    Sugerencias de municipios colombianos para el buscador (nomenclátor local)
+    
+    Query params:
+        - q: texto escrito por el usuario
+        - limit: int (default: 8, max: 20)
+    
+    Returns:
+        - resultados: lista con nombre, departamento, código DANE y coordenadas
+    """
+    texto = request.args.get('q', '').strip()
+    limite = min(request.args.get('limit', 8, type=int), 20)
+    
+    lugares = get_gazetteer().autocomplete(texto, limite) if texto else []
+    response = jsonify({
+        'consulta': texto,
+        'resultados': [{
+            'nombre': p['nombre'],
+            'departamento': p['departamento'],
+            'dane': p['dane'],
+            'latitud': p['lat'],
+            'longitud': p['lon']
+        } for p in lugares]
+    })
+    # El nomenclátor es estático: las respuestas pueden cachearse en el navegador
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    return response, 200
+
+
+@datos_bp.route('/radar/teselas/<producto>', methods=['GET'])
+def get_teselas_disponibles(producto):
+    """
+    Lista las marcas temporales con teselas de un producto (mosaico, qpe, ...)
+    
+    Returns:
+        - marcas: marcas disponibles, la más reciente al final
+        - ultima: metadata de la marca más reciente
+    """
+    base = os.path.join(_directorio_teselas(), os.path.basename(producto))
+    if not os.path.isdir(base):
+        return jsonify({'error': 'Producto no disponible'}), 404
+    
+    marcas = sorted(
+        m for m in os.listdir(base)
+        if os.path.isfile(os.path.join(base, m, 'metadata.json'))
+    )
+    
+    ultima = None
+    if marcas:
+        with open(os.path.join(base, marcas[-1], 'metadata.json'), encoding='utf-8') as f:
+            ultima = json.load(f)
+    
+    response = jsonify({'producto': producto, 'marcas': marcas, 'ultima': ultima})
+    # El listado cambia con cada volumen nuevo; cachear solo brevemente
+    response.headers['Cache-Control'] = 'public, max-age=60'
+    return response, 200
+
+
+@datos_bp.route('/radar/teselas/<producto>/<marca>/<int:z>/<int:x>/<int:y>.<ext>', methods=['GET'])
+def get_tesela(producto, marca, z, x, y, ext):
+    """
+    Sirve una tesela XYZ pre-renderizada
+    
+    Las teselas de una marca temporal no cambian, así que se sirven con
+    caché de larga duración. Las teselas sin ecos no se generan: en una marca
+    completa (con metadata.json) se responden con 204 y caché corta, porque
+    regenerar la marca puede agregarlas. Una marca inexistente o aún en
+    proceso responde 404 sin caché.
+    """
+    if ext not in FORMATOS_TESELA:
+        abort(404)
+    
+    max_age = current_app.config['RADAR_TILES_MAX_AGE']
+    dir_marca = os.path.join(_directorio_teselas(), os.path.basename(producto), os.path.basename(marca))
+    directorio = os.path.join(dir_marca, str(z), str(x))
+    archivo = f"{y}.{ext}"
+    
+    if not os.path.isfile(os.path.join(directorio, archivo)):
+        # metadata.json se escribe al terminar la marca
+        if not os.path.isfile(os.path.join(dir_marca, 'metadata.json')):
+            return jsonify({'error': 'Marca no disponible'}), 404, {'Cache-Control': 'no-store'}
+        vacia_max_age = current_app.config['RADAR_TILES_EMPTY_MAX_AGE']
+        return '', 204, {'Cache-Control': f'public, max-age={vacia_max_age}'}
+    
+    response = send_from_directory(directorio, archivo, mimetype=FORMATOS_TESELA[ext],
+                                   max_age=max_age)
+    response.headers['Cache-Control'] = f'public, max-age={max_age}, immutable'
+    return response
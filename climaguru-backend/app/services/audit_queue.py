@@ -0,0 +1,99 @@
+"""
+Cola de Auditoría (write-behind)
+================================
+Acumula registros de LogsActividad en memoria y los inserta por lotes desde
+un hilo en segundo plano, fuera del camino de la solicitud. Un registro en
+cola se pierde si el proceso muere antes del siguiente volcado.
+"""
+import queue
+import atexit
+import threading
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.extensions import db
+from app.models.logs_actividad import LogsActividad
+
+logger = logging.getLogger("AuditQueue")
+
+
+class AuditLogQueue:
+    def __init__(self, app, interval: float = 2.0, batch_size: int = 500, maxsize: int = 10000):
+        """
+        Args:
+            app: aplicación Flask (para el contexto de base de datos)
+            interval: segundos máximos que un registro espera en la cola
+            batch_size: registros por INSERT masivo
+            maxsize: límite de la cola; si se llena, el registro se escribe en el momento
+        """
+        self.app = app
+        self.interval = interval
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="audit-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        logger.info(f"Auditoría diferida: volcado cada {self.interval}s en lotes de {self.batch_size}")
+
+    def stop(self):
+        """Detiene el hilo y vuelca lo pendiente"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 5)
+        self.flush()
+
+    def log(self, accion: str, usuario_id: Optional[int] = None, detalle: Dict[str, Any] = None,
+            ip_address: str = None, user_agent: str = None):
+        """Encola un registro con la misma forma que LogsActividad"""
+        row = {
+            "usuario_id": usuario_id,
+            "accion": accion,
+            "detalle": detalle,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "creado_en": datetime.utcnow(),
+        }
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            logger.warning("Cola de auditoría llena; escribiendo registro directamente")
+            self._insert([row])
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error volcando auditoría: {e}")
+
+    def flush(self) -> int:
+        """Inserta todo lo encolado en lotes de batch_size; devuelve el número de registros"""
+        total = 0
+        while True:
+            rows = []
+            while len(rows) < self.batch_size:
+                try:
+                    rows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not rows:
+                return total
+            self._insert(rows)
+            total += len(rows)
+
+    def _insert(self, rows):
+        # Conexión propia (no la sesión de la solicitud): un INSERT con varias filas y un commit
+        with self.app.app_context():
+            try:
+                with db.engine.begin() as conn:
+                    conn.execute(LogsActividad.__table__.insert(), rows)
+            except Exception as e:
+                logger.error(f"No se pudieron guardar {len(rows)} registros de auditoría: {e}")
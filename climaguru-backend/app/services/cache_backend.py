@@ -0,0 +1,368 @@
+"""
+Backends de Caché
+=================
+Interfaz común de caché con TTL por entrada y tres implementaciones:
+en memoria del proceso, SQLite local compartido entre workers y un cliente
+del protocolo Redis (RESP) que puede apuntar a Redis o a un sustituto local.
+"""
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger("WeatherCache")
+
+
+class CacheBackendError(Exception):
+    """El backend no pudo responder (servidor caído, base de datos bloqueada...)"""
+
+
+class CacheBackend:
+    """Interfaz de caché clave -> valor serializable en JSON con TTL en segundos"""
+    name = "base"
+    # True si todos los workers ven las mismas entradas y candados
+    shared = False
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    # Candados con TTL para coordinar consultas entre workers (ver single_flight.py)
+    def acquire_lock(self, key: str, token: str, ttl: float) -> bool:
+        """True si se tomó el candado; lanza CacheBackendError si no se pudo saber"""
+        raise NotImplementedError
+
+    def release_lock(self, key: str, token: str) -> None:
+        raise NotImplementedError
+
+    def lock_held(self, key: str) -> bool:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Caché local del proceso (cada worker de gunicorn tiene la suya)"""
+    name = "memory"
+
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def acquire_lock(self, key: str, token: str, ttl: float) -> bool:
+        with self._lock:
+            holder = self._locks.get(key)
+            if holder and holder[1] >= time.time():
+                return False
+            self._locks[key] = (token, time.time() + ttl)
+            return True
+
+    def release_lock(self, key: str, token: str) -> None:
+        with self._lock:
+            if self._locks.get(key, (None,))[0] == token:
+                del self._locks[key]
+
+    def lock_held(self, key: str) -> bool:
+        with self._lock:
+            holder = self._locks.get(key)
+            return bool(holder) and holder[1] >= time.time()
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Caché en un archivo SQLite (WAL) compartido por todos los workers de la máquina
+
+    Cada hilo usa su propia conexión; las entradas vencidas se purgan
+    periódicamente al escribir.
+    """
+    name = "sqlite"
+    shared = True
+    PURGE_EVERY = 200
+
+    def __init__(self, path: str = os.path.join("instance", "weather_cache.sqlite")):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache (expires)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS locks (
+                key TEXT PRIMARY KEY,
+                token TEXT NOT NULL,
+                expires REAL NOT NULL
+            )
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            row = self._conn().execute(
+                "SELECT value FROM cache WHERE key = ? AND expires >= ?", (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"[SQLiteCache] Error leyendo {key}: {e}")
+            return None
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl)
+            )
+            with self._writes_lock:
+                self._writes += 1
+                purge = self._writes % self.PURGE_EVERY == 0
+            if purge:
+                conn.execute("DELETE FROM cache WHERE expires < ?", (time.time(),))
+        except sqlite3.Error as e:
+            logger.error(f"[SQLiteCache] Error escribiendo {key}: {e}")
+
+    def delete(self, key: str) -> None:
+        try:
+            self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.error(f"[SQLiteCache] Error borrando {key}: {e}")
+
+    def acquire_lock(self, key: str, token: str, ttl: float) -> bool:
+        try:
+            conn = self._conn()
+            now = time.time()
+            conn.execute("DELETE FROM locks WHERE key = ? AND expires < ?", (key, now))
+            cursor = conn.execute("INSERT OR IGNORE INTO locks (key, token, expires) VALUES (?, ?, ?)",
+                                  (key, token, now + ttl))
+            return cursor.rowcount == 1
+        except sqlite3.Error as e:
+            logger.error(f"[SQLiteCache] Error tomando candado {key}: {e}")
+            raise CacheBackendError(str(e)) from e
+
+    def release_lock(self, key: str, token: str) -> None:
+        try:
+            self._conn().execute("DELETE FROM locks WHERE key = ? AND token = ?", (key, token))
+        except sqlite3.Error as e:
+            logger.error(f"[SQLiteCache] Error liberando candado {key}: {e}")
+
+    def lock_held(self, key: str) -> bool:
+        try:
+            return self._conn().execute(
+                "SELECT 1 FROM locks WHERE key = ? AND expires >= ?", (key, time.time())
+            ).fetchone() is not None
+        except sqlite3.Error:
+            return False
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cliente mínimo del protocolo Redis (RESP2) sin dependencias externas
+
+    Solo usa GET, SET (EX/PX/NX), DEL y EVAL, así que sirve con Redis, Valkey,
+    KeyDB o cualquier sustituto local compatible. Los errores de red se registran y
+    se tratan como fallos de caché: la consulta sigue contra los proveedores.
+    """
+    name = "redis"
+    shared = True
+    RETRY_AFTER = 30
+    # Borra el candado solo si sigue siendo del mismo dueño, en una operación atómica
+    RELEASE_SCRIPT = ("if redis.call('get', KEYS[1]) == ARGV[1] then "
+                      "return redis.call('del', KEYS[1]) else return 0 end")
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "climaguru:",
+                 timeout: float = 0.5):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.timeout = timeout
+        self._local = threading.local()
+        # Tras un error de red no se reintenta durante RETRY_AFTER segundos
+        self._down_until = 0.0
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        conn = (sock, sock.makefile("rb"))
+        self._local.conn = conn
+        if self.password:
+            self._roundtrip("AUTH", self.password)
+        if self.db:
+            self._roundtrip("SELECT", str(self.db))
+        return conn
+
+    @staticmethod
+    def _encode(*args) -> bytes:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    def _read(self, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Conexión cerrada por el servidor")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RuntimeError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            return [self._read(reader) for _ in range(int(payload))]
+        raise RuntimeError(f"Respuesta RESP inválida: {line!r}")
+
+    def _roundtrip(self, *args):
+        sock, reader = self._local.conn
+        sock.sendall(self._encode(*args))
+        return self._read(reader)
+
+    def _command(self, *args):
+        """Ejecuta un comando reconectando una vez si la conexión del hilo se cayó"""
+        if time.monotonic() < self._down_until:
+            raise ConnectionError("Servidor de caché no disponible")
+        for attempt in range(2):
+            try:
+                if getattr(self._local, "conn", None) is None:
+                    self._connect()
+                return self._roundtrip(*args)
+            except (OSError, ConnectionError) as e:
+                self._close()
+                if attempt:
+                    self._down_until = time.monotonic() + self.RETRY_AFTER
+                    raise e
+
+    def _close(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn:
+            try:
+                conn[1].close()
+                conn[0].close()
+            except OSError:
+                pass
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            data = self._command("GET", self.prefix + key)
+        except Exception as e:
+            logger.error(f"[RedisCache] Error leyendo {key}: {e}")
+            return None
+        return json.loads(data) if data is not None else None
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        try:
+            self._command("SET", self.prefix + key, json.dumps(value), "EX", int(ttl))
+        except Exception as e:
+            logger.error(f"[RedisCache] Error escribiendo {key}: {e}")
+
+    def delete(self, key: str) -> None:
+        try:
+            self._command("DEL", self.prefix + key)
+        except Exception as e:
+            logger.error(f"[RedisCache] Error borrando {key}: {e}")
+
+    def acquire_lock(self, key: str, token: str, ttl: float) -> bool:
+        try:
+            return self._command("SET", f"{self.prefix}lock:{key}", token, "NX", "PX", int(ttl * 1000)) == "OK"
+        except Exception as e:
+            logger.error(f"[RedisCache] Error tomando candado {key}: {e}")
+            raise CacheBackendError(str(e)) from e
+
+    def release_lock(self, key: str, token: str) -> None:
+        try:
+            # Con GET y DEL por separado, el candado podría vencer y ser tomado por otro
+            # worker entre ambos comandos, y este worker borraría el candado ajeno
+            self._command("EVAL", self.RELEASE_SCRIPT, 1, f"{self.prefix}lock:{key}", token)
+        except Exception as e:
+            logger.error(f"[RedisCache] Error liberando candado {key}: {e}")
+
+    def lock_held(self, key: str) -> bool:
+        try:
+            return self._command("GET", f"{self.prefix}lock:{key}") is not None
+        except Exception:
+            return False
+
+
+def get_cache_backend(kind: str = None, url: str = None) -> CacheBackend:
+    """
+    Crea el backend configurado por entorno
+
+    WEATHER_CACHE_BACKEND: memory (defecto), sqlite o redis
+    WEATHER_CACHE_URL: ruta del archivo SQLite o URL redis://host:puerto/db
+    """
+    kind = (kind or os.getenv("WEATHER_CACHE_BACKEND", "memory")).lower()
+    url = url or os.getenv("WEATHER_CACHE_URL")
+
+    if kind == "sqlite":
+        backend = SQLiteCacheBackend(url) if url else SQLiteCacheBackend()
+    elif kind == "redis":
+        backend = RedisCacheBackend(url) if url else RedisCacheBackend()
+    elif kind == "memory":
+        backend = MemoryCacheBackend()
+    else:
+        raise ValueError(f"Backend de caché no soportado: {kind}")
+
+    logger.info(f"Backend de caché: {backend.name}")
+    return backend
@@ -0,0 +1,203 @@
+"""
+Nomenclátor de Colombia
+=======================
+Resolución offline de municipios colombianos (código DANE, coordenadas,
+departamento y alias) con un trie de prefijos para autocompletado y un
+índice de trigramas para búsquedas con errores de escritura o sin tildes.
+"""
+import os
+import csv
+import re
+import logging
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger("Gazetteer")
+
+# Archivo incluido con capitales y principales municipios; GAZETTEER_PATH permite
+# cargar el DIVIPOLA completo con las mismas columnas
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "gazetteer_colombia.csv")
+
+# Similitud mínima (Dice sobre trigramas) de una coincidencia aproximada: más
+# estricta al resolver (si no, se consulta la geocodificación en línea) que al sugerir.
+# Al resolver, además, ninguna otra clave puede quedar a menos de RESOLVE_MARGIN:
+# con pocos lugares cargados, un nombre desconocido o extranjero ("Santiago",
+# "Santa Rosa de Osos") se parece a medias a algún municipio y no debe tomarse por él
+RESOLVE_SIMILARITY = 0.75
+RESOLVE_MARGIN = 0.1
+SUGGEST_SIMILARITY = 0.45
+
+
+def fold(text: str) -> str:
+    """Minúsculas sin tildes ni puntuación y con espacios simples"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children = {}
+        self.ids = []
+
+
+class Gazetteer:
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("GAZETTEER_PATH", DEFAULT_PATH)
+        self.places: List[Dict[str, Any]] = []
+        self.root = _TrieNode()
+        self.exact = defaultdict(list)       # nombre o alias normalizado -> ids
+        self.trigram_index = defaultdict(set)
+        self.keys: Dict[str, set] = {}       # clave normalizada -> trigramas
+        self._names: List[str] = []          # nombre oficial normalizado por lugar
+        self._departments: List[str] = []
+        self._department_names = set()
+        self._load()
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                place = {
+                    "dane": row["dane"],
+                    "nombre": row["nombre"],
+                    "departamento": row["departamento"],
+                    "lat": float(row["lat"]),
+                    "lon": float(row["lon"]),
+                    "capital": int(row.get("capital") or 0),
+                }
+                self._names.append(fold(row["nombre"]))
+                self._departments.append(fold(row["departamento"]))
+                self._department_names.add(fold(row["departamento"]))
+                idx = len(self.places)
+                self.places.append(place)
+
+                names = [row["nombre"]] + [a for a in (row.get("alias") or "").split("|") if a]
+                for name in names:
+                    self._index(fold(name), idx)
+                # "Granada Meta" o "Granada, Meta" desambiguan municipios homónimos; estas
+                # claves compuestas no entran al índice de trigramas: con ellas un nombre de
+                # departamento suelto coincidiría de forma aproximada con cualquiera de sus municipios
+                self._index(fold(f"{row['nombre']} {row['departamento']}"), idx, fuzzy=False)
+
+        logger.info(f"Nomenclátor cargado: {len(self.places)} lugares, {len(self.keys)} claves")
+
+    def _index(self, key: str, idx: int, fuzzy: bool = True):
+        if not key or idx in self.exact[key]:
+            return
+        self.exact[key].append(idx)
+
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, _TrieNode())
+        node.ids.append(idx)
+
+        if not fuzzy:
+            return
+        grams = self.keys.setdefault(key, trigrams(key))
+        for gram in grams:
+            self.trigram_index[gram].add(key)
+
+    def _rank(self, ids, prefix: str = ""):
+        """Primero los nombres oficiales que empiezan por el prefijo, luego capitales y orden alfabético"""
+        return sorted(set(ids), key=lambda i: (not self._names[i].startswith(prefix),
+                                               -self.places[i]["capital"], self._names[i]))
+
+    def _prefix(self, prefix: str, limit: int) -> List[int]:
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+
+        found, stack = [], [node]
+        while stack:
+            current = stack.pop()
+            found.extend(current.ids)
+            stack.extend(current.children.values())
+        return self._rank(found, prefix)[:limit]
+
+    def _fuzzy(self, query: str, limit: int, min_similarity: float) -> List[tuple]:
+        """(similitud, clave) de las claves que comparten más trigramas con la consulta"""
+        grams = trigrams(query)
+        shared = defaultdict(int)
+        for gram in grams:
+            for key in self.trigram_index.get(gram, ()):
+                shared[key] += 1
+
+        scored = [(2.0 * n / (len(grams) + len(self.keys[key])), key) for key, n in shared.items()]
+        scored.sort(reverse=True)
+        return [s for s in scored[:limit] if s[0] >= min_similarity]
+
+    def resolve(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Lugar que corresponde a un nombre (exacto, por alias o aproximado); None si no hay
+
+        Una coincidencia aproximada solo se acepta si es casi completa y no tiene
+        competidoras (ver RESOLVE_SIMILARITY); en otro caso se deja al geocodificador.
+
+        Acepta "Municipio, Departamento"; si el calificador no es un departamento
+        colombiano (ej. "Madrid, España") no se resuelve aquí.
+        """
+        name_part, _, qualifier = (name or "").partition(",")
+        query, qualifier = fold(name_part), fold(qualifier)
+        if not query:
+            return None
+
+        allowed = None
+        if qualifier and qualifier != "colombia":
+            allowed = {i for i, dept in enumerate(self._departments) if dept.startswith(qualifier)}
+            if not allowed:
+                return None
+
+        candidates = list(self.exact.get(query, ()))
+        if not candidates and query in self._department_names:
+            # Un departamento sin municipio no es un lugar puntual: se deja al geocodificador
+            return None
+        if not candidates:
+            candidates = self._fuzzy_candidates(query, allowed)
+
+        if allowed is not None:
+            candidates = [i for i in candidates if i in allowed]
+        return self.places[self._rank(candidates)[0]] if candidates else None
+
+    def _fuzzy_candidates(self, query: str, allowed: Optional[set]) -> List[int]:
+        """Lugares de la única clave aproximada que cubre casi toda la consulta, o ninguno"""
+        matches = [(score, key) for score, key in self._fuzzy(query, 5, RESOLVE_SIMILARITY - RESOLVE_MARGIN)
+                   if allowed is None or allowed.intersection(self.exact[key])]
+        if not matches or matches[0][0] < RESOLVE_SIMILARITY:
+            return []
+        best_score, best_key = matches[0]
+        best = set(self.exact[best_key])
+        rivals = [key for score, key in matches[1:] if score > best_score - RESOLVE_MARGIN]
+        if any(set(self.exact[key]) != best for key in rivals):
+            # Otra clave casi igual de parecida apunta a otro lugar: la consulta es ambigua
+            return []
+        return list(best)
+
+    def autocomplete(self, text: str, limit: int = 8) -> List[Dict[str, Any]]:
+        """Sugerencias para un texto parcial: prefijos primero, luego coincidencias aproximadas"""
+        query = fold(text)
+        if not query:
+            return []
+
+        ids = self._prefix(query, limit)
+        if len(ids) < limit and len(query) >= 3:
+            for _, key in self._fuzzy(query, limit, SUGGEST_SIMILARITY):
+                ids.extend(i for i in self._rank(self.exact[key]) if i not in ids)
+
+        return [self.places[i] for i in ids[:limit]]
+
+
+@lru_cache(maxsize=1)
+def get_gazetteer() -> Gazetteer:
+    """Instancia compartida (se carga una vez por proceso)"""
+    return Gazetteer()
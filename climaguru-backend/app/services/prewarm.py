@@ -0,0 +1,85 @@
+"""
+Precalentamiento de Ciudades Favoritas
+======================================
+Hilo en segundo plano que refresca periódicamente el clima de la unión de
+ciudades favoritas de todos los usuarios antes de que venza en la caché, de
+modo que el dashboard de esas ciudades casi siempre sea un acierto de caché.
+"""
+import time
+import uuid
+import threading
+import logging
+from typing import Any, Dict, List
+
+from app.extensions import db
+from app.models.ciudades_favoritas import CiudadesFavoritas
+from app.services.weather_service import WeatherAggregator
+
+logger = logging.getLogger("FavoritesPrewarmer")
+
+
+class FavoritesPrewarmer:
+    def __init__(self, app, aggregator: WeatherAggregator, interval: float = 60.0):
+        """
+        Args:
+            app: aplicación Flask (para el contexto de base de datos)
+            aggregator: agregador cuya caché se precalienta
+            interval: segundos entre rondas
+        """
+        self.app = app
+        self.aggregator = aggregator
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="favorites-prewarm", daemon=True)
+        self._thread.start()
+        logger.info(f"Precalentamiento de favoritas cada {self.interval:.0f}s")
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Error en ronda de precalentamiento: {e}")
+            self._stop.wait(self.interval)
+
+    def favorite_places(self) -> List[Dict[str, Any]]:
+        """Unión (sin repetidos) de las ciudades favoritas de todos los usuarios"""
+        with self.app.app_context():
+            try:
+                rows = db.session.query(
+                    CiudadesFavoritas.nombre_ciudad,
+                    CiudadesFavoritas.latitud,
+                    CiudadesFavoritas.longitud
+                ).distinct().all()
+            finally:
+                db.session.remove()
+        return [{"ciudad": nombre, "lat": float(lat), "lon": float(lon)} for nombre, lat, lon in rows]
+
+    def run_once(self) -> int:
+        """
+        Ejecuta una ronda si ningún otro worker la hizo en este intervalo
+
+        Returns:
+            Número de celdas programadas para refresco
+        """
+        # El candado no se libera: vence solo y así hay una ronda por intervalo entre workers.
+        # Si el backend falla (CacheBackendError) la ronda se omite en vez de hacerla cada worker
+        if not self.aggregator.cache.acquire_lock("prewarm:favoritas", uuid.uuid4().hex, self.interval * 0.9):
+            return 0
+
+        started = time.monotonic()
+        places = self.favorite_places()
+        # Antelación: lo que falta hasta la próxima ronda más el plazo de la consulta
+        scheduled = self.aggregator.prewarm(places, horizon=self.interval + self.aggregator.deadline)
+        logger.info(f"Precalentamiento: {len(places)} favoritas, {scheduled} celdas a refrescar "
+                    f"({time.monotonic() - started:.2f}s)")
+        return scheduled
@@ -0,0 +1,188 @@
+"""
+Salud de Proveedores
+====================
+Seguimiento por proveedor meteorológico: histograma de latencias, interruptor
+de circuito (circuit breaker) que omite proveedores que fallan durante un
+periodo de enfriamiento, y retardo para solicitudes de cobertura (hedging)
+en proveedores con cola de latencia larga.
+"""
+import os
+import time
+import bisect
+import threading
+from typing import Any, Dict, Optional
+
+# Fallos consecutivos que abren el circuito y segundos que permanece abierto
+BREAKER_FAILURES = int(os.getenv("WEATHER_BREAKER_FAILURES", 5))
+BREAKER_COOLDOWN = float(os.getenv("WEATHER_BREAKER_COOLDOWN", 30.0))
+
+# Solo se cubre con una segunda solicitud a proveedores con suficientes muestras
+# y cuyo p95 supera HEDGE_TAIL_RATIO veces la mediana
+HEDGE_MIN_SAMPLES = 20
+HEDGE_TAIL_RATIO = 3.0
+
+# Límites superiores (segundos) de los intervalos del histograma
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    """
+    Histograma de latencias con intervalos fijos
+
+    Al llegar a `decay_at` muestras se reducen todos los conteos a la mitad,
+    así los percentiles siguen el comportamiento reciente del proveedor.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS, decay_at: int = 1000):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0
+        self.decay_at = decay_at
+
+    def add(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.total += 1
+        if self.total >= self.decay_at:
+            self.counts = [c // 2 for c in self.counts]
+            self.total = sum(self.counts)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Límite superior del intervalo que contiene el cuantil q (0-1); None si no hay muestras"""
+        if not self.total:
+            return None
+        target = q * self.total
+        running = 0
+        for i, count in enumerate(self.counts):
+            running += count
+            if running >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"<={b}s" for b in self.buckets] + [f">{self.buckets[-1]}s"]
+        return {
+            "muestras": self.total,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "intervalos": dict(zip(labels, self.counts)),
+        }
+
+
+class CircuitBreaker:
+    """
+    Interruptor de circuito: cerrado -> abierto -> semiabierto
+
+    Tras `failures` fallos consecutivos el circuito se abre y el proveedor se
+    omite durante `cooldown` segundos; después se deja pasar una sola solicitud
+    de prueba: si responde se cierra, si falla vuelve a abrirse.
+
+    allow() entrega un pase que acompaña al resultado en record(). Cada vez que
+    el circuito se abre o se cierra cambia la generación, así los resultados
+    tardíos de llamadas admitidas antes no cuentan, y con el circuito abierto
+    o semiabierto solo el pase de la solicitud de prueba lo cierra o reabre.
+    """
+    CLOSED, OPEN, HALF_OPEN = "cerrado", "abierto", "semiabierto"
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.generation = 0
+        self._trial = None
+
+    @property
+    def state(self) -> str:
+        if self.consecutive_failures < self.failures:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow(self) -> Optional[tuple]:
+        """Pase para consultar al proveedor, o None si el circuito no lo permite"""
+        state = self.state
+        if state == self.CLOSED:
+            return ("normal", self.generation)
+        if state == self.HALF_OPEN and self._trial is None:
+            self._trial = ("prueba", self.generation)
+            return self._trial
+        return None
+
+    def record(self, ok: bool, ticket: tuple):
+        if self.state == self.CLOSED:
+            if ticket != ("normal", self.generation):
+                return
+            if ok:
+                self.consecutive_failures = 0
+                return
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.failures:
+                self._open()
+            return
+
+        # Abierto o semiabierto: solo decide la solicitud de prueba en curso
+        if ticket is None or ticket != self._trial:
+            return
+        self._trial = None
+        if ok:
+            self.consecutive_failures = 0
+            self.generation += 1
+        else:
+            self._open()
+
+    def _open(self):
+        self.opened_at = time.monotonic()
+        self.generation += 1
+        self._trial = None
+
+
+class ProviderHealth:
+    """Estado de un proveedor compartido por los hilos del proceso"""
+
+    def __init__(self, name: str, breaker: CircuitBreaker = None):
+        self.name = name
+        self.latency = LatencyHistogram()
+        self.breaker = breaker or CircuitBreaker()
+        self.ok = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> Optional[tuple]:
+        """Pase para consultar el proveedor; None si su circuito está abierto"""
+        with self._lock:
+            return self.breaker.allow()
+
+    def record(self, seconds: float, ok: bool, ticket: tuple = None):
+        with self._lock:
+            self.latency.add(seconds)
+            self.breaker.record(ok, ticket)
+            if ok:
+                self.ok += 1
+            else:
+                self.errors += 1
+
+    def hedge_delay(self, deadline: float) -> Optional[float]:
+        """
+        Espera antes de lanzar una solicitud de cobertura (p95 observado)
+
+        None si el proveedor no tiene cola larga o el p95 no cabe en el plazo.
+        """
+        with self._lock:
+            if self.latency.total < HEDGE_MIN_SAMPLES:
+                return None
+            p50, p95 = self.latency.percentile(0.5), self.latency.percentile(0.95)
+        if p95 >= deadline or p95 < HEDGE_TAIL_RATIO * p50:
+            return None
+        return p95
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "circuito": self.breaker.state,
+                "fallos_consecutivos": self.breaker.consecutive_failures,
+                "exitos": self.ok,
+                "errores": self.errors,
+                "latencia": self.latency.snapshot(),
+            }
@@ -0,0 +1,134 @@
+"""
+Coalescencia de Consultas (single-flight)
+=========================================
+Cuando varias solicitudes fallan en la caché para la misma clave, solo una
+consulta a los proveedores y las demás esperan su resultado. Dentro de un
+proceso se coordinan los hilos; entre workers se usa un candado con TTL en el
+backend de caché compartido.
+"""
+import time
+import uuid
+import random
+import threading
+import logging
+from typing import Any, Callable, Optional
+
+from app.services.cache_backend import CacheBackend, CacheBackendError
+
+logger = logging.getLogger("SingleFlight")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    # Espera máxima entre reintentos del candado cuando el backend falla
+    MAX_BACKOFF = 1.0
+
+    def __init__(self, cache: CacheBackend, lock_ttl: float = 10.0, poll_interval: float = 0.1,
+                 error_wait: float = 2.0):
+        """
+        Args:
+            cache: backend donde el líder publica el resultado y se guardan los candados
+            lock_ttl: vida máxima del candado entre workers (por si el líder muere)
+            poll_interval: cada cuánto un worker seguidor revisa la caché
+            error_wait: tiempo reintentando el candado si el backend falla antes de
+                consultar sin coordinación
+        """
+        self.cache = cache
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self.error_wait = error_wait
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fetch: Callable[[], Any], lookup: Callable[[], Optional[Any]],
+           wait_timeout: float = 10.0) -> Any:
+        """
+        Ejecuta fetch una sola vez por clave entre las solicitudes concurrentes
+
+        Args:
+            key: clave de coalescencia (la misma de la caché)
+            fetch: consulta a los proveedores; debe guardar su resultado en la caché
+            lookup: lectura de la caché usada por los seguidores de otros workers
+            wait_timeout: espera máxima de un seguidor antes de consultar por su cuenta
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            # Seguidor en el mismo proceso: espera al hilo líder
+            if call.done.wait(wait_timeout):
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            logger.warning(f"Espera agotada para {key}; se consulta directamente")
+            return fetch()
+
+        try:
+            call.result = self._across_workers(key, fetch, lookup, wait_timeout)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _across_workers(self, key, fetch, lookup, wait_timeout):
+        """
+        Coordina al hilo líder de cada worker mediante un candado en el backend
+
+        Si el líder termina sin publicar (error) o su candado vence, los que esperaban
+        vuelven a competir por el candado en vez de consultar todos a la vez. Si el
+        backend falla al tomar el candado, se reintenta con retroceso exponencial
+        aleatorio durante error_wait antes de consultar sin coordinación.
+        """
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + wait_timeout
+        error_deadline = None
+        backoff = self.poll_interval
+
+        while True:
+            try:
+                acquired = self.cache.acquire_lock(key, token, self.lock_ttl)
+            except CacheBackendError:
+                now = time.monotonic()
+                error_deadline = error_deadline or now + self.error_wait
+                if now >= min(deadline, error_deadline):
+                    break
+                time.sleep(backoff * random.uniform(0.5, 1.0))
+                backoff = min(backoff * 2, self.MAX_BACKOFF)
+                result = lookup()
+                if result is not None:
+                    return result
+                continue
+
+            if acquired:
+                try:
+                    return fetch()
+                finally:
+                    self.cache.release_lock(key, token)
+
+            # Otro worker está consultando: esperar a que publique el resultado o suelte el candado
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                result = lookup()
+                if result is not None:
+                    logger.info(f"Resultado de {key} obtenido de otro worker")
+                    return result
+                if not self.cache.lock_held(key):
+                    break
+            if time.monotonic() >= deadline:
+                break
+
+        logger.warning(f"Sin coordinación para {key} (espera agotada o backend caído); se consulta directamente")
+        return fetch()
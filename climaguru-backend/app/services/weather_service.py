@@ -5,12 +5,19 @@ Integra múltiples APIs meteorológicas y promedia sus resultados.
 Implementa caché por TTL y logging estructurado.
 """
 import os
+import time
+import atexit
+import threading
 import requests
 import logging
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
 from typing import Dict, List, Any, Optional
-from cachetools import TTLCache
+from app.services.cache_backend import CacheBackend, get_cache_backend
+from app.services.single_flight import SingleFlight
+from app.services.gazetteer import get_gazetteer
+from app.services.provider_health import ProviderHealth
+from app.utils import geohash
 
 # Configuración de logging
 LOG_DIR = os.path.join(os.getcwd(), 'logs')
@@ -27,10 +34,39 @@ logging.basicConfig(
 )
 logger = logging.getLogger("WeatherAggregator")
 
+# Hilos compartidos por todas las consultas y plazo total de cada consulta (segundos)
+WEATHER_MAX_WORKERS = int(os.getenv("WEATHER_MAX_WORKERS", 16))
+WEATHER_DEADLINE = float(os.getenv("WEATHER_DEADLINE_SECONDS", 4.0))
+
+# Celda geohash de las entradas de caché (6 ≈ 1.2 x 0.6 km) y radio para reutilizar
+# una celda vecina ya cacheada (0 = solo la propia celda)
+WEATHER_GEOHASH_PRECISION = int(os.getenv("WEATHER_GEOHASH_PRECISION", 6))
+WEATHER_NEIGHBOR_RADIUS_KM = float(os.getenv("WEATHER_NEIGHBOR_RADIUS_KM", 0))
+
+# TTL (segundos) de cada tipo de entrada en la caché compartida
+GEO_TTL = 3600
+WEATHER_TTL = 300
+AIR_QUALITY_TTL = 1800
+
+# Tiempo adicional (segundos) en que una entrada vencida se sirve mientras se
+# refresca en segundo plano, e hilos dedicados a esos refrescos
+WEATHER_STALE_TTL = int(os.getenv("WEATHER_STALE_TTL", 900))
+
+# Vigencia (segundos) de un resultado parcial (algún proveedor no respondió en el
+# plazo): se cachea igual para no repetir la espera en cada consulta, pero vence
+# pronto para que stale-while-revalidate reintente a los proveedores faltantes
+WEATHER_PARTIAL_TTL = int(os.getenv("WEATHER_PARTIAL_TTL", 30))
+WEATHER_REFRESH_WORKERS = int(os.getenv("WEATHER_REFRESH_WORKERS", 4))
+
+# Solicitudes de cobertura (hedging) a proveedores con cola de latencia larga
+WEATHER_HEDGE = os.getenv("WEATHER_HEDGE", "false").lower() == "true"
+
 # --- Clientes de API ---
 class WeatherClient:
     def __init__(self, name: str):
         self.name = name
+    def is_configured(self) -> bool:
+        return True
     def get_weather(self, lat: float, lon: float, city: str = "") -> Optional[Dict[str, Any]]:
         raise NotImplementedError
 
@@ -41,6 +77,9 @@ class OpenWeatherClient(WeatherClient):
         self.base_url = "https://api.openweathermap.org/data/2.5/weather"
         self.air_url = "https://api.openweathermap.org/data/2.5/air_pollution"
 
+    def is_configured(self) -> bool:
+        return bool(self.api_key)
+
     def get_weather(self, lat: float, lon: float, city: str = "") -> Optional[Dict[str, Any]]:
         if not self.api_key: return None
         try:
@@ -85,6 +124,9 @@ class MeteosourceClient(WeatherClient):
         self.api_key = api_key
         self.base_url = "https://www.meteosource.com/api/v1/free/point"
 
+    def is_configured(self) -> bool:
+        return bool(self.api_key)
+
     def get_weather(self, lat: float, lon: float, city: str = "") -> Optional[Dict[str, Any]]:
         if not self.api_key: return None
         try:
@@ -150,22 +192,51 @@ class OpenMeteoLocalClient(WeatherClient):
 # --- Agregador ---
 class WeatherAggregator:
     # Improvement 5: Caching with 5 min TTL
-    def __init__(self):
+    def __init__(self, max_workers: int = WEATHER_MAX_WORKERS, deadline: float = WEATHER_DEADLINE,
+                 cache: Optional[CacheBackend] = None, precision: int = WEATHER_GEOHASH_PRECISION,
+                 neighbor_radius_km: float = WEATHER_NEIGHBOR_RADIUS_KM, hedge: bool = WEATHER_HEDGE):
         self.owm = OpenWeatherClient(os.getenv("OPENWEATHERMAP_API_KEY", ""))
         self.ms = MeteosourceClient(os.getenv("METEOSOURCE_API_KEY", ""))
         self.om = OpenMeteoLocalClient()
         self.clients = [self.owm, self.ms, self.om]
         
-        # Geocoding cache
-        self.geo_cache = TTLCache(maxsize=100, ttl=3600) # 1 hour for geocoding
-        # Weather results cache
-        self.weather_cache = TTLCache(maxsize=100, ttl=300) # 5 minutes for weather
+        # Salud por proveedor (la calidad de aire de OpenWeatherMap se sigue aparte)
+        self.health = {name: ProviderHealth(name) for name in [c.name for c in self.clients] + ["calidad_aire"]}
+        self.hedge = hedge
+        
+        # Pool de hilos de larga vida (acotado) compartido por todas las consultas
+        self.deadline = deadline
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="weather")
+        atexit.register(self.executor.shutdown, wait=False)
+        # Los refrescos en segundo plano usan su propio pool: si compartieran el de las
+        # consultas, sus hilos quedarían bloqueados esperando sub-tareas del mismo pool
+        self.refresher = ThreadPoolExecutor(max_workers=WEATHER_REFRESH_WORKERS,
+                                            thread_name_prefix="weather-refresh")
+        atexit.register(self.refresher.shutdown, wait=False)
+        self._refreshing = set()
+        self._refreshing_lock = threading.Lock()
+        if hedge:
+            self.hedger = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="weather-hedge")
+            atexit.register(self.hedger.shutdown, wait=False)
+        
+        # Caché de geocodificación, clima y calidad de aire (compartible entre workers)
+        self.cache = cache or get_cache_backend()
+        self.flight = SingleFlight(self.cache, lock_ttl=deadline + 5.0)
+        self.gazetteer = get_gazetteer()
+        self.precision = precision
+        self.neighbor_radius_km = neighbor_radius_km
         
-        logger.info("WeatherAggregator inicializado con caching")
+        logger.info(f"WeatherAggregator inicializado con caché {self.cache.name}")
 
     def get_coordinates(self, city: str) -> Optional[Dict[str, float]]:
-        if city in self.geo_cache:
-            return self.geo_cache[city]
+        # Municipios colombianos: nomenclátor local, sin llamadas de red
+        place = self.gazetteer.resolve(city)
+        if place:
+            return {"lat": place["lat"], "lon": place["lon"], "name": place["nombre"]}
+        
+        cached = self.cache.get(f"geo:{city.lower()}")
+        if cached is not None:
+            return cached
             
         try:
             # Fallback simple geocoding via Open-Meteo
@@ -178,7 +249,7 @@ class WeatherAggregator:
                     "lon": data["results"][0]["longitude"],
                     "name": data["results"][0]["name"]
                 }
-                self.geo_cache[city] = res
+                self.cache.set(f"geo:{city.lower()}", res, GEO_TTL)
                 return res
         except Exception as e:
             logger.error(f"Error geocoding {city}: {e}")
@@ -193,26 +264,163 @@ class WeatherAggregator:
             lat, lon = coords["lat"], coords["lon"]
             ciudad = coords["name"]
 
-        # Improvement 5: Check weather cache
-        cache_key = f"{lat:.3f},{lon:.3f}"
-        if cache_key in self.weather_cache:
-            logger.info(f"Caché hit para {ciudad} ({cache_key})")
-            return self.weather_cache[cache_key]
+        # Improvement 5: Check weather cache (por celda geohash, compartida entre puntos cercanos)
+        lat, lon = float(lat), float(lon)
+        cell, cached = self._cached_cell(lat, lon)
+        if cached is not None:
+            if self._age(cached) > self._freshness(cached):
+                # Stale-while-revalidate: se responde con la entrada vencida y se refresca aparte
+                logger.info(f"Caché obsoleta para {ciudad} (celda {cell}); refrescando en segundo plano")
+                self.refresh_async(cached.get("ciudad") or ciudad, cell)
+            else:
+                logger.info(f"Caché hit para {ciudad} (celda {cell})")
+            return self._localize(cached, ciudad, lat, lon)
+
+        # Las solicitudes simultáneas para la misma celda esperan una sola consulta
+        result = self.flight.do(
+            f"weather:{cell}",
+            fetch=lambda: self._fetch_weather(ciudad, cell),
+            lookup=lambda: self.cache.get(f"weather:{cell}"),
+            wait_timeout=self.deadline + 1.0
+        )
+        return self._localize(result, ciudad, lat, lon)
+
+    def _cached_cell(self, lat: float, lon: float):
+        """
+        Celda del punto y su resultado en caché (o None)
+
+        Si la celda propia no está en caché y hay radio de vecindad, se usa la
+        celda vecina cacheada cuyo centro esté más cerca, dentro del radio.
+        """
+        cell = geohash.encode(lat, lon, self.precision)
+        cached = self.cache.get(f"weather:{cell}")
+        if cached is not None or self.neighbor_radius_km <= 0:
+            return cell, cached
+
+        candidates = []
+        for neighbor in geohash.neighbors(cell):
+            distance = geohash.distance_km(lat, lon, *geohash.decode(neighbor))
+            if distance <= self.neighbor_radius_km:
+                candidates.append((distance, neighbor))
+
+        for _, neighbor in sorted(candidates):
+            cached = self.cache.get(f"weather:{neighbor}")
+            if cached is not None:
+                return neighbor, cached
+        return cell, None
+
+    @staticmethod
+    def _age(entry: Dict[str, Any]) -> float:
+        """Segundos desde que se guardó una entrada de clima en la caché"""
+        return time.time() - entry.get("_guardado", 0)
+
+    @staticmethod
+    def _freshness(entry: Dict[str, Any]) -> float:
+        """Segundos en que una entrada de clima se sirve sin refrescarla (menos si es parcial)"""
+        return entry.get("_vigencia", WEATHER_TTL)
+
+    def refresh_async(self, ciudad: str, cell: str) -> bool:
+        """
+        Programa la consulta de una celda en segundo plano (una sola a la vez por celda)
+
+        Returns:
+            True si se programó; False si ya había un refresco en curso en este proceso
+        """
+        with self._refreshing_lock:
+            if cell in self._refreshing:
+                return False
+            self._refreshing.add(cell)
+
+        def run():
+            try:
+                # Comparte la clave de coalescencia con las consultas normales: si otro
+                # worker ya está refrescando la celda, este no vuelve a consultar
+                self.flight.do(
+                    f"weather:{cell}",
+                    fetch=lambda: self._fetch_weather(ciudad, cell),
+                    lookup=lambda: self.cache.get(f"weather:{cell}"),
+                    wait_timeout=self.deadline + 1.0
+                )
+            except Exception as e:
+                logger.error(f"Error refrescando celda {cell} ({ciudad}): {e}")
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard(cell)
 
-        logger.info(f"Consultando clima para {ciudad} ({lat}, {lon})")
+        self.refresher.submit(run)
+        return True
+
+    def prewarm(self, places: List[Dict[str, Any]], horizon: float = 0) -> int:
+        """
+        Refresca las celdas de los lugares dados que vencen dentro de `horizon` segundos
+
+        Args:
+            places: lista de {"ciudad", "lat", "lon"}
+            horizon: antelación con la que se refresca una entrada antes de vencer
+
+        Returns:
+            Número de celdas programadas para refresco
+        """
+        scheduled = 0
+        seen = set()
+        for place in places:
+            cell = geohash.encode(float(place["lat"]), float(place["lon"]), self.precision)
+            if cell in seen:
+                continue
+            seen.add(cell)
+            cached = self.cache.get(f"weather:{cell}")
+            if cached is None or self._age(cached) + horizon >= self._freshness(cached):
+                scheduled += self.refresh_async(place["ciudad"], cell)
+        return scheduled
+
+    def _localize(self, result: Dict[str, Any], ciudad: str, lat: float, lon: float) -> Dict[str, Any]:
+        """Copia del resultado de la celda con la ciudad y coordenadas de esta solicitud"""
+        localized = dict(result)
+        localized.pop("_guardado", None)
+        localized.pop("_vigencia", None)
+        localized["ciudad"] = ciudad
+        localized["coordenadas"] = {"latitude": lat, "longitude": lon}
+        return localized
+
+    def _fetch_weather(self, ciudad: str, cell: str) -> Dict[str, Any]:
+        """Consulta a todos los proveedores en el centro de la celda y guarda el resultado completo"""
+        started = time.monotonic()
+        lat, lon = geohash.decode(cell)
+        logger.info(f"Consultando clima para {ciudad} (celda {cell}: {lat:.4f}, {lon:.4f})")
+        
+        # Clima y calidad de aire en el mismo abanico, con un único plazo total
+        calls = {c.name: (c.get_weather, lat, lon, ciudad) for c in self.clients if c.is_configured()}
+        air_quality = self.cache.get(f"aire:{cell}")
+        if air_quality is None and self.owm.is_configured():
+            calls["calidad_aire"] = (self.owm.get_air_quality, lat, lon)
+        
+        # Los proveedores con el circuito abierto no se consultan ni retrasan la respuesta
+        tickets = {name: self.health[name].allow() for name in calls}
+        skipped = sorted(name for name, ticket in tickets.items() if ticket is None)
+        if skipped:
+            logger.warning(f"Circuito abierto, se omiten: {skipped}")
+        deadline_at = started + self.deadline
+        tasks = {self.executor.submit(self._call_provider, name, tickets[name], deadline_at, *call): name
+                 for name, call in calls.items() if name not in skipped}
         
         results = {}
-        with ThreadPoolExecutor(max_workers=len(self.clients)) as executor:
-            task_to_client = {executor.submit(c.get_weather, lat, lon, ciudad): c.name for c in self.clients}
-            for future in as_completed(task_to_client):
-                client_name = task_to_client[future]
+        pending = set(tasks.values())
+        try:
+            for future in as_completed(tasks, timeout=max(0.0, self.deadline - (time.monotonic() - started))):
+                name = tasks[future]
+                pending.discard(name)
                 data = future.result()
-                if data:
-                    results[client_name] = data
+                if not data:
+                    continue
+                if name == "calidad_aire":
+                    air_quality = data
+                    self.cache.set(f"aire:{cell}", data, AIR_QUALITY_TTL)
+                else:
+                    results[name] = data
+        except FuturesTimeout:
+            # Las llamadas tardías terminan en segundo plano; su resultado se descarta
+            logger.warning(f"Plazo de {self.deadline}s agotado para {ciudad}; sin respuesta de: {sorted(pending)}")
 
-        # Unificar calidad de aire
-        air_quality = self.owm.get_air_quality(lat, lon)
-        
         # Promediar resultados
         summary = self._calculate_summary(results)
         
@@ -222,18 +430,84 @@ class WeatherAggregator:
         final_result = {
             "ciudad": ciudad,
             "coordenadas": {"latitude": lat, "longitude": lon},
+            # Ubicación efectiva de los datos: centro de la celda consultada
+            "celda": geohash.cell_info(cell),
             "total_fuentes": len(results),
             "resumen": summary,
             "fuentes": results,
             "calidad_aire": air_quality,
             "pronostico": pronostico,
+            "fuentes_sin_respuesta": sorted(pending),
+            "fuentes_omitidas": skipped,
             "timestamp": datetime.now().isoformat()
         }
         
-        # Cache result
-        self.weather_cache[cache_key] = final_result
+        # Un resultado parcial también se cachea (si no, cada consulta de la celda volvería a
+        # esperar el plazo completo), con vigencia corta para reintentar pronto a los faltantes.
+        # Se conserva WEATHER_STALE_TTL más allá de su vigencia para servirla mientras se refresca
+        freshness = WEATHER_PARTIAL_TTL if pending else WEATHER_TTL
+        self.cache.set(f"weather:{cell}", dict(final_result, _guardado=time.time(), _vigencia=freshness),
+                       freshness + WEATHER_STALE_TTL)
         return final_result
 
+    def _call_provider(self, name: str, ticket: tuple, deadline_at: float, fn, *args) -> Optional[Dict[str, Any]]:
+        """
+        Consulta un proveedor; con hedging, lanza una segunda solicitud si tarda más de su p95
+
+        Args:
+            ticket: pase del circuito del proveedor (ver CircuitBreaker.allow)
+            deadline_at: instante (time.monotonic) en que vence el plazo de la consulta
+        """
+        health = self.health[name]
+        remaining = deadline_at - time.monotonic()
+        delay = health.hedge_delay(remaining) if self.hedge else None
+        if delay is None:
+            return self._attempt(health, ticket, deadline_at, fn, args)
+
+        first = self.hedger.submit(self._attempt, health, ticket, deadline_at, fn, args)
+        try:
+            return first.result(timeout=delay)
+        except FuturesTimeout:
+            pass
+
+        logger.info(f"[{name}] Sin respuesta tras {delay}s (p95); lanzando solicitud de cobertura")
+        second = self.hedger.submit(self._attempt, health, ticket, deadline_at, fn, args)
+        try:
+            # Solo lo que queda del plazo de la consulta, no un plazo completo nuevo
+            for future in as_completed([first, second], timeout=max(0.0, deadline_at - time.monotonic())):
+                result = future.result()
+                if result is not None:
+                    return result
+        except FuturesTimeout:
+            pass
+        return None
+
+    @staticmethod
+    def _attempt(health: ProviderHealth, ticket: tuple, deadline_at: float, fn, args) -> Optional[Dict[str, Any]]:
+        """
+        Una solicitud al proveedor, registrando su latencia y resultado
+
+        Una respuesta que llega después del plazo de la consulta ya se descartó, así que
+        cuenta como fallo: si no, el circuito nunca se abriría para un proveedor que
+        responde siempre tarde, que es justo el caso contra el que existe.
+        """
+        started = time.monotonic()
+        try:
+            result = fn(*args)
+        except Exception as e:
+            logger.error(f"[{health.name}] Error: {e}")
+            result = None
+        finished = time.monotonic()
+        late = finished > deadline_at
+        if late and result is not None:
+            logger.warning(f"[{health.name}] Respuesta tras el plazo ({finished - started:.2f}s); se cuenta como fallo")
+        health.record(finished - started, result is not None and not late, ticket)
+        return result
+
+    def provider_status(self) -> Dict[str, Any]:
+        """Circuito, conteos e histograma de latencias de cada proveedor"""
+        return {name: health.snapshot() for name, health in self.health.items()}
+
     def _calculate_summary(self, results: Dict[str, Any]) -> Dict[str, Any]:
         temps = [r["temperatura"] for r in results.values() if r.get("temperatura") is not None]
         hums = [r["humedad"] for r in results.values() if r.get("humedad") is not None]
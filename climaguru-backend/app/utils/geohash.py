@@ -0,0 +1,98 @@
+"""
+Geohash
+=======
+Codificación de coordenadas en celdas geohash (base 32), centro de una celda,
+celdas vecinas y distancia entre puntos.
+"""
+import math
+from typing import Dict, List, Tuple
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {c: i for i, c in enumerate(_BASE32)}
+
+RADIO_TIERRA_KM = 6371.0
+
+
+def encode(lat: float, lon: float, precision: int = 6) -> str:
+    """Geohash de un punto; precisión 6 ≈ 1.2 x 0.6 km, 5 ≈ 4.9 x 4.9 km"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits, bit_count, even = 0, 0, True
+
+    while len(chars) < precision:
+        rango, valor = (lon_range, lon) if even else (lat_range, lat)
+        medio = (rango[0] + rango[1]) / 2
+        bits <<= 1
+        if valor >= medio:
+            bits |= 1
+            rango[0] = medio
+        else:
+            rango[1] = medio
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+
+    return "".join(chars)
+
+
+def bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """Límites (lat_min, lat_max, lon_min, lon_max) de una celda"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        valor = _DECODE[char]
+        for shift in range(4, -1, -1):
+            rango = lon_range if even else lat_range
+            medio = (rango[0] + rango[1]) / 2
+            if (valor >> shift) & 1:
+                rango[0] = medio
+            else:
+                rango[1] = medio
+            even = not even
+
+    return lat_range[0], lat_range[1], lon_range[0], lon_range[1]
+
+
+def decode(geohash: str) -> Tuple[float, float]:
+    """Centro (lat, lon) de una celda"""
+    lat_min, lat_max, lon_min, lon_max = bounds(geohash)
+    return (lat_min + lat_max) / 2, (lon_min + lon_max) / 2
+
+
+def neighbors(geohash: str) -> List[str]:
+    """Las 8 celdas que rodean a una celda (misma precisión)"""
+    lat_min, lat_max, lon_min, lon_max = bounds(geohash)
+    lat, lon = (lat_min + lat_max) / 2, (lon_min + lon_max) / 2
+    dlat, dlon = lat_max - lat_min, lon_max - lon_min
+
+    vecinos = []
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            if i == 0 and j == 0:
+                continue
+            vlat = lat + i * dlat
+            if not -90.0 < vlat < 90.0:
+                continue
+            vlon = (lon + j * dlon + 180.0) % 360.0 - 180.0
+            vecinos.append(encode(vlat, vlon, len(geohash)))
+    return vecinos
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distancia de gran círculo (haversine) en km"""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(a))
+
+
+def cell_info(geohash: str) -> Dict[str, float]:
+    """Descripción de la celda que se devuelve al cliente"""
+    lat, lon = decode(geohash)
+    return {"geohash": geohash, "precision": len(geohash),
+            "latitude": round(lat, 5), "longitude": round(lon, 5)}
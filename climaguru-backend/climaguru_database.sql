@@ -87,6 +87,20 @@ CREATE TABLE consultas (
     INDEX idx_coordenadas (latitud, longitud)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- =====================================================
+-- TABLA: blobs_datos
+-- Resultados completos del agregador, comprimidos (zlib)
+-- y guardados una sola vez por contenido (hash SHA-256)
+-- =====================================================
+CREATE TABLE blobs_datos (
+    hash CHAR(64) PRIMARY KEY,
+    codificacion VARCHAR(10) NOT NULL DEFAULT 'zlib',
+    datos MEDIUMBLOB NOT NULL,
+    tamano_original INT,
+    tamano_comprimido INT,
+    creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- =====================================================
 -- TABLA: datos_clima
 -- Almacena los datos procesados y promedios
@@ -107,10 +121,14 @@ CREATE TABLE datos_clima (
     calidad_aire INT,
     descripcion_clima VARCHAR(100),
     fuentes_utilizadas JSON,
-    datos_completos JSON,
+    datos_hash CHAR(64),
+    datos_completos JSON,  -- solo filas anteriores a blobs_datos
+    datos_solicitud JSON,  -- ciudad y coordenadas de la consulta (fuera del blob compartido)
     guardado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     
     FOREIGN KEY (consulta_id) REFERENCES consultas(id) ON DELETE CASCADE,
+    FOREIGN KEY (datos_hash) REFERENCES blobs_datos(hash),
+    INDEX idx_datos_hash (datos_hash),
     UNIQUE KEY unique_consulta (consulta_id),
     INDEX idx_temperatura (temperatura_promedio),
     INDEX idx_fecha (guardado_en)
@@ -0,0 +1,121 @@
+"""blobs_datos: content-addressed storage for datos_clima.datos_completos
+
+Revision ID: 5e9ca1a97f46
+Revises: f818813064a7
+Create Date: 2026-10-19 10:12:37.418205
+
+"""
+import json
+import zlib
+import hashlib
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e9ca1a97f46'
+down_revision = 'f818813064a7'
+branch_labels = None
+depends_on = None
+
+BATCH = 500
+
+
+def _serializar(payload):
+    # Debe coincidir con BlobDatos.serializar para que los hashes sean los mismos
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'),
+                      ensure_ascii=False, default=str).encode('utf-8')
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if 'blobs_datos' not in insp.get_table_names():
+        op.create_table('blobs_datos',
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('codificacion', sa.String(length=10), nullable=False),
+        sa.Column('datos', sa.LargeBinary(length=16777215), nullable=False),
+        sa.Column('tamano_original', sa.Integer(), nullable=True),
+        sa.Column('tamano_comprimido', sa.Integer(), nullable=True),
+        sa.Column('creado_en', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('hash')
+        )
+
+    columns = [col['name'] for col in insp.get_columns('datos_clima')]
+    if 'datos_hash' not in columns:
+        with op.batch_alter_table('datos_clima', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('datos_hash', sa.String(length=64), nullable=True))
+            batch_op.create_index(batch_op.f('ix_datos_clima_datos_hash'), ['datos_hash'], unique=False)
+            batch_op.create_foreign_key('fk_datos_clima_blob', 'blobs_datos', ['datos_hash'], ['hash'])
+
+    # Mover los JSON existentes al almacén (una fila por contenido distinto) y vaciar la columna
+    datos_clima = sa.table('datos_clima',
+        sa.column('id', sa.Integer), sa.column('datos_completos', sa.JSON), sa.column('datos_hash', sa.String))
+    blobs = sa.table('blobs_datos',
+        sa.column('hash', sa.String), sa.column('codificacion', sa.String), sa.column('datos', sa.LargeBinary),
+        sa.column('tamano_original', sa.Integer), sa.column('tamano_comprimido', sa.Integer),
+        sa.column('creado_en', sa.DateTime))
+
+    existentes = set(bind.execute(sa.select(blobs.c.hash)).scalars())
+    ultimo_id = 0
+    while True:
+        filas = bind.execute(
+            sa.select(datos_clima.c.id, datos_clima.c.datos_completos)
+            .where(datos_clima.c.id > ultimo_id)
+            .where(datos_clima.c.datos_completos.isnot(None))
+            .order_by(datos_clima.c.id)
+            .limit(BATCH)
+        ).all()
+        if not filas:
+            break
+
+        nuevos, referencias = [], []
+        for fila_id, payload in filas:
+            if isinstance(payload, str):
+                payload = json.loads(payload)
+            raw = _serializar(payload)
+            digest = hashlib.sha256(raw).hexdigest()
+            if digest not in existentes:
+                comprimido = zlib.compress(raw, 6)
+                nuevos.append({'hash': digest, 'codificacion': 'zlib', 'datos': comprimido,
+                               'tamano_original': len(raw), 'tamano_comprimido': len(comprimido),
+                               'creado_en': datetime.utcnow()})
+                existentes.add(digest)
+            referencias.append((fila_id, digest))
+            ultimo_id = fila_id
+
+        # Primero los blobs, para que la clave foránea de datos_clima sea válida
+        if nuevos:
+            bind.execute(blobs.insert(), nuevos)
+        for fila_id, digest in referencias:
+            bind.execute(datos_clima.update().where(datos_clima.c.id == fila_id)
+                         .values(datos_hash=digest, datos_completos=sa.null()))
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    # Restaurar los JSON en datos_clima antes de eliminar el almacén
+    datos_clima = sa.table('datos_clima',
+        sa.column('id', sa.Integer), sa.column('datos_completos', sa.JSON), sa.column('datos_hash', sa.String))
+    blobs = sa.table('blobs_datos',
+        sa.column('hash', sa.String), sa.column('codificacion', sa.String), sa.column('datos', sa.LargeBinary))
+
+    filas = bind.execute(
+        sa.select(datos_clima.c.id, blobs.c.codificacion, blobs.c.datos)
+        .select_from(datos_clima.join(blobs, datos_clima.c.datos_hash == blobs.c.hash))
+    )
+    for fila_id, codificacion, datos in filas.all():
+        raw = zlib.decompress(datos) if codificacion == 'zlib' else datos
+        bind.execute(datos_clima.update().where(datos_clima.c.id == fila_id)
+                     .values(datos_completos=json.loads(raw)))
+
+    with op.batch_alter_table('datos_clima', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_datos_clima_blob', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_datos_clima_datos_hash'))
+        batch_op.drop_column('datos_hash')
+
+    op.drop_table('blobs_datos')
@@ -0,0 +1,51 @@
+"""datos_clima.datos_solicitud: per-request fields outside the shared blob
+
+Revision ID: b7d2e4f19c30
+Revises: 5e9ca1a97f46
+Create Date: 2026-10-19 18:40:11.902317
+
+"""
+import json
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e4f19c30'
+down_revision = '5e9ca1a97f46'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('datos_clima', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('datos_solicitud', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    # Las filas con campos de solicitud vuelven a la columna JSON con el contenido completo:
+    # su blob es compartido y no puede llevar la ciudad de una sola consulta
+    datos_clima = sa.table('datos_clima',
+        sa.column('id', sa.Integer), sa.column('datos_completos', sa.JSON),
+        sa.column('datos_hash', sa.String), sa.column('datos_solicitud', sa.JSON))
+    blobs = sa.table('blobs_datos',
+        sa.column('hash', sa.String), sa.column('codificacion', sa.String), sa.column('datos', sa.LargeBinary))
+
+    filas = bind.execute(
+        sa.select(datos_clima.c.id, datos_clima.c.datos_solicitud, blobs.c.codificacion, blobs.c.datos)
+        .select_from(datos_clima.join(blobs, datos_clima.c.datos_hash == blobs.c.hash))
+        .where(datos_clima.c.datos_solicitud.isnot(None))
+    )
+    for fila_id, solicitud, codificacion, datos in filas.all():
+        if isinstance(solicitud, str):
+            solicitud = json.loads(solicitud)
+        raw = zlib.decompress(datos) if codificacion == 'zlib' else datos
+        bind.execute(datos_clima.update().where(datos_clima.c.id == fila_id)
+                     .values(datos_completos=dict(json.loads(raw), **solicitud), datos_hash=sa.null()))
+
+    with op.batch_alter_table('datos_clima', schema=None) as batch_op:
+        batch_op.drop_column('datos_solicitud')
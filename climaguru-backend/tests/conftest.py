@@ -0,0 +1,22 @@
+"""
+Fixtures compartidas: aplicación con la configuración de testing (SQLite en memoria)
+"""
+import pytest
+
+from app import create_app
+from app.extensions import db as _db
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        _db.create_all()
+        yield app
+        _db.session.remove()
+        _db.drop_all()
+
+
+@pytest.fixture
+def db(app):
+    return _db
@@ -0,0 +1,86 @@
+"""
+Tests del almacén de blobs direccionado por contenido (app/models/blob_datos.py)
+"""
+import zlib
+
+from app.models import BlobDatos, Consulta, DatosClima
+
+
+PAYLOAD = {"resumen": {"temperatura": 24.5},
+           "fuentes": {"open_meteo": {"pronostico_diario": list(range(200))}}}
+
+
+def _datos(db, result, usuario_id=1):
+    """Guarda un resultado como lo hace la ruta de consultas en tiempo real"""
+    contenido, solicitud = DatosClima.separar_solicitud(result)
+    consulta = Consulta(usuario_id=usuario_id, tipo_consulta='tiempo_real', estado='completada')
+    consulta.datos_clima = DatosClima(datos_hash=BlobDatos.guardar(contenido), datos_solicitud=solicitud)
+    db.session.add(consulta)
+    db.session.commit()
+    return consulta.datos_clima.id
+
+
+def test_contenido_identico_se_guarda_una_vez(db):
+    for _ in range(3):
+        _datos(db, PAYLOAD)
+    # El orden de las claves no cambia el hash
+    _datos(db, dict(reversed(list(PAYLOAD.items()))))
+
+    assert DatosClima.query.count() == 4
+    assert BlobDatos.query.count() == 1
+    assert len({d.datos_hash for d in DatosClima.query}) == 1
+
+    _datos(db, dict(PAYLOAD, resumen={"temperatura": 19.0}))
+    assert BlobDatos.query.count() == 2
+
+
+def test_campos_de_la_solicitud_no_cuentan_para_el_hash(db):
+    # Dos consultas servidas desde la misma celda en caché, con su propia ciudad y coordenadas
+    a = _datos(db, dict(PAYLOAD, ciudad="Cali", coordenadas={"latitude": 3.45, "longitude": -76.53}))
+    b = _datos(db, dict(PAYLOAD, ciudad="Jamundí", coordenadas={"latitude": 3.44, "longitude": -76.52}))
+    assert BlobDatos.query.count() == 1
+    assert "ciudad" not in BlobDatos.query.one().contenido()
+
+    db.session.expunge_all()
+    assert db.session.get(DatosClima, a).datos_completos["ciudad"] == "Cali"
+    datos = db.session.get(DatosClima, b).datos_completos
+    assert datos["ciudad"] == "Jamundí"
+    assert datos["coordenadas"] == {"latitude": 3.44, "longitude": -76.52}
+    assert datos["resumen"] == PAYLOAD["resumen"]
+
+
+def test_blob_comprimido_y_lectura_perezosa(db):
+    datos_id = _datos(db, PAYLOAD)
+    db.session.expunge_all()
+
+    blob = BlobDatos.query.one()
+    assert blob.codificacion == 'zlib'
+    assert blob.tamano_comprimido < blob.tamano_original
+    assert zlib.decompress(blob.datos) == BlobDatos.serializar(PAYLOAD)
+    db.session.expunge_all()
+
+    datos = db.session.get(DatosClima, datos_id)
+    assert 'blob' not in datos.__dict__  # aún no se ha leído el blob
+    assert datos.datos_completos == PAYLOAD
+    assert datos.datos_completos_json is None
+
+
+def test_guardar_contenido_existente_no_falla(db):
+    """Otra solicitud ya guardó el mismo contenido: el INSERT se ignora"""
+    digest = BlobDatos.guardar(PAYLOAD)
+    db.session.commit()
+    db.session.expunge_all()
+
+    assert BlobDatos.guardar(PAYLOAD) == digest
+    db.session.commit()
+    assert BlobDatos.query.count() == 1
+    assert db.session.get(BlobDatos, digest).contenido() == PAYLOAD
+
+
+def test_filas_anteriores_usan_la_columna_json(db):
+    consulta = Consulta(usuario_id=1, tipo_consulta='tiempo_real', estado='completada')
+    consulta.datos_clima = DatosClima(datos_completos_json={"legado": True})
+    db.session.add(consulta)
+    db.session.commit()
+    assert consulta.datos_clima.datos_completos == {"legado": True}
+
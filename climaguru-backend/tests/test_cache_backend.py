@@ -0,0 +1,179 @@
+"""
+Tests de los backends de caché: lectura, escritura, vencimiento y candados
+(app/services/cache_backend.py)
+
+El backend Redis se prueba contra un servidor RESP mínimo en proceso que
+implementa GET, SET (EX/PX/NX), DEL y el script de liberación del candado.
+"""
+import time
+import socketserver
+import threading
+
+import pytest
+
+from app.services.cache_backend import (CacheBackendError, MemoryCacheBackend, SQLiteCacheBackend,
+                                        RedisCacheBackend, get_cache_backend)
+
+
+class _FakeRedis(socketserver.StreamRequestHandler):
+    store = {}  # clave -> (valor, vence)
+
+    @classmethod
+    def _get(cls, key):
+        entry = cls.store.get(key)
+        if entry is None or (entry[1] is not None and entry[1] < time.time()):
+            cls.store.pop(key, None)
+            return None
+        return entry[0]
+
+    def _reply(self, value):
+        if value is None:
+            self.wfile.write(b"$-1\r\n")
+        elif isinstance(value, int):
+            self.wfile.write(b":%d\r\n" % value)
+        elif value == "OK":
+            self.wfile.write(b"+OK\r\n")
+        else:
+            self.wfile.write(b"$%d\r\n%s\r\n" % (len(value), value))
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2])
+            cmd = args[0].upper()
+
+            if cmd == b"GET":
+                self._reply(self._get(args[1]))
+            elif cmd == b"SET":
+                opts = [a.upper() for a in args[3:]]
+                expires = None
+                if b"EX" in opts:
+                    expires = time.time() + int(args[3 + opts.index(b"EX") + 1])
+                if b"PX" in opts:
+                    expires = time.time() + int(args[3 + opts.index(b"PX") + 1]) / 1000
+                if b"NX" in opts and self._get(args[1]) is not None:
+                    self._reply(None)
+                else:
+                    self.store[args[1]] = (args[2], expires)
+                    self._reply("OK")
+            elif cmd == b"DEL":
+                self._reply(int(self.store.pop(args[1], None) is not None))
+            elif cmd == b"EVAL" and args[1].decode() == RedisCacheBackend.RELEASE_SCRIPT:
+                key, token = args[3], args[4]
+                owned = self._get(key) == token
+                if owned:
+                    del self.store[key]
+                self._reply(int(owned))
+            else:
+                self.wfile.write(b"-ERR comando no soportado\r\n")
+
+
+@pytest.fixture(scope="module")
+def redis_url():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _FakeRedis)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"redis://127.0.0.1:{server.server_address[1]}/0"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryCacheBackend()
+    if request.param == "sqlite":
+        return SQLiteCacheBackend(str(tmp_path / "cache.sqlite"))
+    _FakeRedis.store.clear()
+    return RedisCacheBackend(request.getfixturevalue("redis_url"))
+
+
+def test_guarda_y_lee_valores_json(backend):
+    valor = {"ciudad": "Medellín", "temperatura": 22.5, "fuentes": ["open_meteo"], "aire": None}
+    backend.set("weather:d29e", valor, 60)
+    assert backend.get("weather:d29e") == valor
+    assert backend.get("weather:otra") is None
+
+
+def test_borrar_entrada(backend):
+    backend.set("k", {"v": 1}, 60)
+    backend.delete("k")
+    assert backend.get("k") is None
+    backend.delete("k")  # borrar una clave inexistente no falla
+
+
+def test_entrada_vence_con_su_ttl(backend):
+    backend.set("k", {"v": 1}, 1)
+    backend.set("larga", {"v": 2}, 60)
+    time.sleep(1.1)
+    assert backend.get("k") is None
+    assert backend.get("larga") == {"v": 2}
+
+
+def test_sqlite_compartido_entre_workers(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    SQLiteCacheBackend(path).set("k", {"v": 1}, 60)
+    assert SQLiteCacheBackend(path).get("k") == {"v": 1}
+
+
+def test_memoria_descarta_la_menos_usada():
+    cache = MemoryCacheBackend(maxsize=2)
+    cache.set("a", 1, 60)
+    cache.set("b", 2, 60)
+    cache.get("a")
+    cache.set("c", 3, 60)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_redis_sin_servidor_no_interrumpe():
+    with socketserver.TCPServer(("127.0.0.1", 0), socketserver.BaseRequestHandler) as server:
+        port = server.server_address[1]
+    cache = RedisCacheBackend(f"redis://127.0.0.1:{port}/0")
+    cache.set("k", {"v": 1}, 60)
+    assert cache.get("k") is None
+    # El candado no se da por tomado: quien lo pide decide cómo esperar (ver single_flight.py)
+    with pytest.raises(CacheBackendError):
+        cache.acquire_lock("k", "a", 5)
+
+
+def test_backend_desconocido():
+    with pytest.raises(ValueError):
+        get_cache_backend("memcached")
+
+
+def test_candado_exclusivo(backend):
+    assert backend.acquire_lock("k", "a", 5)
+    assert not backend.acquire_lock("k", "b", 5)
+    assert backend.lock_held("k")
+
+
+def test_solo_el_dueno_libera(backend):
+    backend.acquire_lock("k", "a", 5)
+    backend.release_lock("k", "b")
+    assert backend.lock_held("k")
+    backend.release_lock("k", "a")
+    assert not backend.lock_held("k")
+    assert backend.acquire_lock("k", "b", 5)
+
+
+def test_candado_vencido_se_puede_tomar(backend):
+    assert backend.acquire_lock("k", "a", 0.05)
+    time.sleep(0.1)
+    assert not backend.lock_held("k")
+    assert backend.acquire_lock("k", "b", 5)
+
+
+def test_dueno_anterior_no_borra_el_candado_nuevo(backend):
+    # "a" vence, "b" toma el candado y la liberación tardía de "a" no debe afectarlo
+    backend.acquire_lock("k", "a", 0.05)
+    time.sleep(0.1)
+    assert backend.acquire_lock("k", "b", 5)
+    backend.release_lock("k", "a")
+    assert backend.lock_held("k")
+    assert not backend.acquire_lock("k", "c", 5)
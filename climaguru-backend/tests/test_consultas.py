@@ -0,0 +1,108 @@
+"""
+Tests de la consulta de clima en tiempo real (app/routes/consultas.py)
+"""
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+import app.routes.consultas as consultas
+from app.models import Consulta, DatosClima, LogsActividad, Usuario
+from app.services.audit_queue import AuditLogQueue
+
+
+RESULTADO = {
+    "ciudad": "Cali",
+    "coordenadas": {"latitude": 3.4516, "longitude": -76.532},
+    "resumen": {"temperatura": 24.5, "humedad": 70, "presion": 1012, "viento": 8.0, "descripcion": "Nublado"},
+    "fuentes": {"open_meteo": {"temperatura": 24.5}},
+    "total_fuentes": 1,
+}
+
+
+@pytest.fixture
+def cliente(app, db, monkeypatch):
+    usuario = Usuario(username="ana", email="ana@example.com", password="secreto123")
+    db.session.add(usuario)
+    db.session.commit()
+    token = create_access_token(identity=str(usuario.id))
+
+    monkeypatch.setattr(consultas.aggregator, "get_all_weather", lambda ciudad, lat, lon: dict(RESULTADO))
+    cliente = app.test_client()
+    cliente.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    return cliente
+
+
+@pytest.fixture
+def commits(db):
+    contador = []
+    listener = lambda conn: contador.append(1)
+    event.listen(db.engine, "commit", listener)
+    yield contador
+    event.remove(db.engine, "commit", listener)
+
+
+def test_consulta_datos_y_log_en_un_solo_commit(cliente, db, commits):
+    r = cliente.post("/api/consultas/tiempo-real", json={"ciudad": "Cali"})
+
+    assert r.status_code == 200
+    assert len(commits) == 1
+    consulta = Consulta.query.one()
+    assert r.get_json()["consulta_id"] == consulta.id
+    assert consulta.estado == "completada"
+    assert consulta.tiempo_respuesta_ms is not None
+    assert DatosClima.query.one().datos_completos["ciudad"] == "Cali"
+    log = LogsActividad.query.one()
+    assert log.detalle["consulta_id"] == consulta.id
+
+
+def test_cola_de_auditoria_saca_el_log_de_la_solicitud(cliente, app, db, commits):
+    cola = AuditLogQueue(app)  # sin iniciar el hilo: el volcado se hace a mano
+    app.extensions["audit_queue"] = cola
+
+    r = cliente.post("/api/consultas/tiempo-real", json={"ciudad": "Cali"})
+    assert r.status_code == 200
+    assert len(commits) == 1
+    assert LogsActividad.query.count() == 0
+
+    assert cola.flush() == 1
+    assert LogsActividad.query.one().detalle["consulta_id"] == r.get_json()["consulta_id"]
+
+
+def test_fallo_al_guardar_devuelve_207(cliente, db, monkeypatch):
+    def falla():
+        raise RuntimeError("base de datos caída")
+    monkeypatch.setattr(db.session, "commit", falla)
+
+    r = cliente.post("/api/consultas/tiempo-real", json={"ciudad": "Cali"})
+    assert r.status_code == 207
+    assert r.get_json()["consulta_id"] is None
+    assert r.get_json()["error_registro"]
+    assert r.get_json()["ciudad"] == "Cali"
+    monkeypatch.undo()
+    assert Consulta.query.count() == 0
+
+
+def test_error_del_agregador_registra_consulta_fallida(cliente, db, monkeypatch):
+    def falla(ciudad, lat, lon):
+        raise ValueError("No se pudo encontrar la ciudad: Atlantida")
+    monkeypatch.setattr(consultas.aggregator, "get_all_weather", falla)
+
+    r = cliente.post("/api/consultas/tiempo-real", json={"ciudad": "Atlantida"})
+    assert r.status_code == 500
+    consulta = Consulta.query.one()
+    assert consulta.estado == "error"
+    assert "Atlantida" in consulta.mensaje_error
+
+
+def test_error_del_agregador_con_base_de_datos_caida(cliente, db, monkeypatch):
+    def falla(*args, **kwargs):
+        raise RuntimeError("base de datos caída")
+    monkeypatch.setattr(consultas.aggregator, "get_all_weather",
+                        lambda ciudad, lat, lon: falla())
+    monkeypatch.setattr(db.session, "commit", falla)
+
+    r = cliente.post("/api/consultas/tiempo-real", json={"ciudad": "Atlantida"})
+    assert r.status_code == 500
+    assert r.get_json()["error"] == "Error al procesar la consulta"
+    monkeypatch.undo()
+    assert Consulta.query.count() == 0
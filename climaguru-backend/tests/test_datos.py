@@ -0,0 +1,35 @@
+"""
+Tests de las rutas de datos (teselas de radar)
+"""
+import pytest
+
+
+@pytest.fixture
+def cliente(app, tmp_path):
+    marca = tmp_path / 'mosaico' / '20250101T1200'
+    (marca / '5' / '1').mkdir(parents=True)
+    (marca / 'metadata.json').write_text('{}')
+    (marca / '5' / '1' / '2.png').write_bytes(b'\x89PNG')
+    # Marca en proceso: teselas sin metadata.json
+    (tmp_path / 'mosaico' / '20250101T1210' / '5' / '1').mkdir(parents=True)
+    app.config['RADAR_TILES_DIR'] = str(tmp_path)
+    return app.test_client()
+
+
+def test_tesela_existente_es_inmutable(cliente):
+    r = cliente.get('/api/datos/radar/teselas/mosaico/20250101T1200/5/1/2.png')
+    assert r.status_code == 200
+    assert 'immutable' in r.headers['Cache-Control']
+
+
+def test_tesela_sin_ecos_en_marca_completa(cliente, app):
+    r = cliente.get('/api/datos/radar/teselas/mosaico/20250101T1200/5/1/3.png')
+    assert r.status_code == 204
+    assert r.headers['Cache-Control'] == f"public, max-age={app.config['RADAR_TILES_EMPTY_MAX_AGE']}"
+
+
+@pytest.mark.parametrize('marca', ['20250101T1210', 'no-existe'])
+def test_marca_en_proceso_o_inexistente(cliente, marca):
+    r = cliente.get(f'/api/datos/radar/teselas/mosaico/{marca}/5/1/2.png')
+    assert r.status_code == 404
+    assert r.headers['Cache-Control'] == 'no-store'
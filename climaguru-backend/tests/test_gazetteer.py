@@ -0,0 +1,65 @@
+"""
+Tests del nomenclátor de Colombia (app/services/gazetteer.py)
+"""
+import pytest
+
+from app.services.gazetteer import Gazetteer
+
+
+@pytest.fixture(scope="module")
+def gazetteer():
+    return Gazetteer()
+
+
+@pytest.mark.parametrize("nombre", [
+    "Santander", "Tolima", "Magdalena", "Córdoba", "Cordoba", "Bolivar", "Bolívar",
+    "Cauca", "Antioquia", "Cundinamarca", "Norte de Santander", "Valle del Cauca",
+])
+def test_departamento_solo_no_resuelve_a_un_municipio(gazetteer, nombre):
+    # Debe caer a la geocodificación en línea en vez de devolver un pueblo arbitrario
+    assert gazetteer.resolve(nombre) is None
+
+
+@pytest.mark.parametrize("consulta, esperado", [
+    ("Medellín", ("Medellín", "Antioquia")),
+    ("medelin", ("Medellín", "Antioquia")),
+    ("Bogota", ("Bogotá", "Bogotá D.C.")),
+    ("Cucuta", ("Cúcuta", "Norte de Santander")),
+    ("Cartagena, Bolivar", ("Cartagena", "Bolívar")),
+    ("Granada Meta", ("Granada", "Meta")),
+    ("Caldas", ("Caldas", "Antioquia")),
+])
+def test_resuelve_municipios(gazetteer, consulta, esperado):
+    lugar = gazetteer.resolve(consulta)
+    assert lugar is not None
+    assert (lugar["nombre"], lugar["departamento"]) == esperado
+
+
+@pytest.mark.parametrize("nombre", [
+    "Santa Rosa de Osos",  # no incluido; se parece a Santa Rosa de Cabal
+    "San Juan",            # alias parcial de San Juan de Pasto y San Juan de Girón
+    "Santiago",            # Santiago de Chile, no Santiago de Cali
+    "San Jose",            # San José (Costa Rica), San José de Cúcuta, del Guaviare...
+    "Cartagna",            # a medio camino entre Cartagena y Cartago
+])
+def test_coincidencia_parcial_o_ambigua_no_resuelve(gazetteer, nombre):
+    assert gazetteer.resolve(nombre) is None
+
+
+@pytest.mark.parametrize("consulta, esperado", [
+    ("Barranquila", "Barranquilla"),
+    ("Bucaramnga", "Bucaramanga"),
+    ("Santiago de Cali", "Cali"),
+])
+def test_errores_de_escritura_casi_completos_resuelven(gazetteer, consulta, esperado):
+    assert gazetteer.resolve(consulta)["nombre"] == esperado
+
+
+def test_calificador_extranjero_no_resuelve(gazetteer):
+    assert gazetteer.resolve("Madrid, España") is None
+
+
+def test_autocompletar_prefijo_y_errores(gazetteer):
+    assert gazetteer.autocomplete("Medel")[0]["nombre"] == "Medellín"
+    assert gazetteer.autocomplete("medelin")[0]["nombre"] == "Medellín"
+    assert gazetteer.autocomplete("") == []
@@ -0,0 +1,433 @@
+"""
+Tests del agregador de clima y sus piezas (caché compartida, coalescencia)
+"""
+import time
+import threading
+
+import pytest
+
+from app.services.cache_backend import CacheBackendError, MemoryCacheBackend, SQLiteCacheBackend
+from app.services.provider_health import CircuitBreaker
+from app.services.single_flight import SingleFlight
+from app.services.weather_service import WEATHER_PARTIAL_TTL, WEATHER_TTL, WeatherAggregator
+from app.utils import geohash
+
+
+def _concurrently(n, target):
+    results = [None] * n
+    barrier = threading.Barrier(n)
+
+    def run(i):
+        barrier.wait()
+        results[i] = target()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    return results
+
+
+# --- SingleFlight ---
+
+def test_single_flight_coalesce_hilos():
+    cache = MemoryCacheBackend()
+    flight = SingleFlight(cache, poll_interval=0.01)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        cache.set("k", {"v": 1}, 60)
+        return {"v": 1}
+
+    results = _concurrently(8, lambda: flight.do("k", fetch, lambda: cache.get("k")))
+    assert len(calls) == 1
+    assert results == [{"v": 1}] * 8
+
+
+def test_single_flight_coalesce_entre_workers():
+    # Dos instancias sobre el mismo backend simulan dos workers de gunicorn
+    cache = MemoryCacheBackend()
+    workers = [SingleFlight(cache, poll_interval=0.01) for _ in range(2)]
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        cache.set("k", {"v": 1}, 60)
+        return {"v": 1}
+
+    turn = iter(workers)
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            worker = next(turn)
+        return worker.do("k", fetch, lambda: cache.get("k"))
+
+    assert _concurrently(2, call) == [{"v": 1}] * 2
+    assert len(calls) == 1
+
+
+def test_single_flight_propaga_errores_a_seguidores():
+    cache = MemoryCacheBackend()
+    flight = SingleFlight(cache, poll_interval=0.01)
+
+    def fetch():
+        time.sleep(0.05)
+        raise RuntimeError("proveedor caído")
+
+    def call():
+        try:
+            flight.do("k", fetch, lambda: cache.get("k"))
+        except RuntimeError as e:
+            return str(e)
+
+    assert _concurrently(4, call) == ["proveedor caído"] * 4
+    assert not cache.lock_held("k")
+
+
+def test_single_flight_seguidor_consulta_si_el_lider_no_publica():
+    cache = MemoryCacheBackend()
+    cache.acquire_lock("k", "otro-worker", 0.05)
+    flight = SingleFlight(cache, poll_interval=0.01)
+    calls = []
+
+    result = flight.do("k", lambda: calls.append(1) or {"v": 2}, lambda: cache.get("k"), wait_timeout=1)
+    assert result == {"v": 2}
+    assert len(calls) == 1
+
+
+
+def test_seguidores_compiten_de_nuevo_si_el_lider_no_publica():
+    cache = MemoryCacheBackend()
+    cache.acquire_lock("k", "lider-caido", 5)
+    workers = iter([SingleFlight(cache, poll_interval=0.01) for _ in range(4)])
+    lock = threading.Lock()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        cache.set("k", {"v": 1}, 60)
+        return {"v": 1}
+
+    def call():
+        with lock:
+            worker = next(workers)
+        return worker.do("k", fetch, lambda: cache.get("k"))
+
+    threading.Timer(0.1, cache.release_lock, ("k", "lider-caido")).start()
+    assert _concurrently(4, call) == [{"v": 1}] * 4
+    assert len(calls) == 1
+
+
+class _CandadoInestable(MemoryCacheBackend):
+    """Backend cuyo candado falla las primeras veces (ej. SQLite bloqueado bajo carga)"""
+
+    def __init__(self, fallos):
+        super().__init__()
+        self.fallos = fallos
+
+    def acquire_lock(self, key, token, ttl):
+        with self._lock:
+            if self.fallos > 0:
+                self.fallos -= 1
+                raise CacheBackendError("database is locked")
+        return super().acquire_lock(key, token, ttl)
+
+
+def test_error_del_candado_reintenta_en_vez_de_consultar_todos():
+    cache = _CandadoInestable(fallos=4)
+    workers = iter([SingleFlight(cache, poll_interval=0.01) for _ in range(4)])
+    lock = threading.Lock()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        cache.set("k", {"v": 1}, 60)
+        return {"v": 1}
+
+    def call():
+        with lock:
+            worker = next(workers)
+        return worker.do("k", fetch, lambda: cache.get("k"))
+
+    assert _concurrently(4, call) == [{"v": 1}] * 4
+    assert len(calls) == 1
+
+
+def test_backend_caido_consulta_tras_error_wait():
+    cache = _CandadoInestable(fallos=10 ** 6)
+    flight = SingleFlight(cache, poll_interval=0.01, error_wait=0.1)
+    started = time.monotonic()
+    assert flight.do("k", lambda: {"v": 1}, lambda: None) == {"v": 1}
+    assert 0.1 <= time.monotonic() - started < 1.0
+
+# --- Circuitos y hedging por proveedor ---
+
+def test_circuito_se_abre_tras_fallos_consecutivos():
+    breaker = CircuitBreaker(failures=3, cooldown=60)
+    for _ in range(3):
+        breaker.record(False, breaker.allow())
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow() is None
+
+
+def test_semiabierto_admite_una_sola_prueba():
+    breaker = CircuitBreaker(failures=2, cooldown=0.05)
+    tardios = [breaker.allow() for _ in range(3)]  # admitidas antes de abrirse
+    breaker.record(False, tardios[0])
+    breaker.record(False, tardios[1])
+    time.sleep(0.1)
+
+    prueba = breaker.allow()
+    assert prueba is not None
+    assert breaker.allow() is None
+
+    # El resultado tardío de una llamada anterior no cierra el circuito ni libera otra prueba
+    breaker.record(True, tardios[2])
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow() is None
+
+    breaker.record(True, prueba)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() is not None
+
+
+def test_prueba_fallida_reabre_el_circuito():
+    breaker = CircuitBreaker(failures=1, cooldown=0.05)
+    breaker.record(False, breaker.allow())
+    time.sleep(0.1)
+    breaker.record(False, breaker.allow())
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.fixture
+def aggregator():
+    return WeatherAggregator(cache=MemoryCacheBackend(), deadline=2.0, hedge=True)
+
+
+def test_hedging_respeta_el_plazo_restante(aggregator):
+    health = aggregator.health["open_meteo"]
+    for latency in [0.02] * 18 + [0.2] * 2:
+        health.record(latency, True, health.allow())
+    assert health.hedge_delay(2.0) == 0.25
+
+    started = time.monotonic()
+    result = aggregator._call_provider("open_meteo", health.allow(), started + 0.6,
+                                       lambda: time.sleep(1.5))
+    assert result is None
+    assert time.monotonic() - started < 1.0
+
+
+def test_respuestas_tras_el_plazo_abren_el_circuito(aggregator):
+    health = aggregator.health["meteosource"]
+    lento = lambda: time.sleep(0.06) or {"temperatura": 30.0}
+    for _ in range(health.breaker.failures):
+        aggregator._call_provider("meteosource", health.allow(), time.monotonic() + 0.03, lento)
+    assert health.errors == health.breaker.failures
+    assert health.breaker.state == CircuitBreaker.OPEN
+
+
+def test_proveedor_con_circuito_abierto_se_omite(aggregator, monkeypatch):
+    monkeypatch.setattr(aggregator.owm, "api_key", "clave")
+    monkeypatch.setattr(aggregator.ms, "api_key", "")
+    monkeypatch.setattr(aggregator.owm, "get_weather", lambda *a: None)
+    monkeypatch.setattr(aggregator.owm, "get_air_quality", lambda *a: {"aqi": 1})
+    monkeypatch.setattr(aggregator.om, "get_weather", lambda *a: {"temperatura": 22.0})
+
+    for _ in range(aggregator.health["openweathermap"].breaker.failures):
+        aggregator._fetch_weather("Cali", "d29e")
+    result = aggregator._fetch_weather("Cali", "d29e")
+    assert result["fuentes_omitidas"] == ["openweathermap"]
+    assert result["fuentes_sin_respuesta"] == []
+
+
+# --- Caché por celda geohash ---
+
+def _solo_open_meteo(aggregator, monkeypatch, respuesta=None):
+    """Deja solo Open-Meteo configurado y cuenta sus consultas"""
+    calls = []
+    monkeypatch.setattr(aggregator.owm, "api_key", "")
+    monkeypatch.setattr(aggregator.ms, "api_key", "")
+    monkeypatch.setattr(aggregator.om, "get_weather",
+                        lambda *a: calls.append(a) or dict(respuesta or {"temperatura": 22.0}))
+    return calls
+
+
+def test_puntos_cercanos_comparten_celda(aggregator, monkeypatch):
+    calls = _solo_open_meteo(aggregator, monkeypatch)
+    cell = geohash.encode(6.2442, -75.5812, aggregator.precision)
+    lat_min, lat_max, lon_min, lon_max = geohash.bounds(cell)
+    a = (lat_min + (lat_max - lat_min) * 0.2, lon_min + (lon_max - lon_min) * 0.2)
+    b = (lat_min + (lat_max - lat_min) * 0.8, lon_min + (lon_max - lon_min) * 0.8)
+
+    primero = aggregator.get_all_weather("Medellín", *a)
+    segundo = aggregator.get_all_weather("El Poblado", *b)
+
+    assert len(calls) == 1
+    # Se consulta el centro de la celda, no el punto de la primera solicitud
+    assert calls[0][:2] == geohash.decode(cell)
+    assert primero["celda"] == segundo["celda"] == geohash.cell_info(cell)
+    assert segundo["ciudad"] == "El Poblado"
+    assert segundo["coordenadas"] == {"latitude": b[0], "longitude": b[1]}
+    assert "_guardado" not in segundo
+
+
+def test_celdas_distintas_no_comparten_entrada(aggregator, monkeypatch):
+    calls = _solo_open_meteo(aggregator, monkeypatch)
+    cell = geohash.encode(6.2442, -75.5812, aggregator.precision)
+    vecina = geohash.neighbors(cell)[0]
+
+    aggregator.get_all_weather("Medellín", *geohash.decode(cell))
+    resultado = aggregator.get_all_weather("Vecina", *geohash.decode(vecina))
+    assert len(calls) == 2
+    assert resultado["celda"]["geohash"] == vecina
+
+
+def test_radio_de_vecindad_reutiliza_celda_cacheada(monkeypatch):
+    aggregator = WeatherAggregator(cache=MemoryCacheBackend(), deadline=2.0, neighbor_radius_km=2.0)
+    calls = _solo_open_meteo(aggregator, monkeypatch)
+    cell = geohash.encode(6.2442, -75.5812, aggregator.precision)
+    vecina = geohash.neighbors(cell)[0]
+
+    aggregator.get_all_weather("Medellín", *geohash.decode(cell))
+    resultado = aggregator.get_all_weather("Vecina", *geohash.decode(vecina))
+    assert len(calls) == 1
+    assert resultado["celda"]["geohash"] == cell
+    assert resultado["ciudad"] == "Vecina"
+
+
+# --- Stale-while-revalidate y precalentamiento ---
+
+def _envejecer(aggregator, cell, segundos):
+    key = f"weather:{cell}"
+    entry = aggregator.cache.get(key)
+    aggregator.cache.set(key, dict(entry, _guardado=time.time() - segundos), 60)
+
+
+def _esperar(condicion, timeout=2.0):
+    limite = time.monotonic() + timeout
+    while True:
+        if condicion():
+            return True
+        if time.monotonic() > limite:
+            return False
+        time.sleep(0.01)
+
+
+def test_entrada_obsoleta_se_sirve_y_se_refresca(aggregator, monkeypatch):
+    respuesta = {"temperatura": 22.0}
+    calls = _solo_open_meteo(aggregator, monkeypatch)
+    monkeypatch.setattr(aggregator.om, "get_weather", lambda *a: calls.append(a) or dict(respuesta))
+    punto = (6.2442, -75.5812)
+    cell = geohash.encode(*punto, aggregator.precision)
+
+    aggregator.get_all_weather("Medellín", *punto)
+    _envejecer(aggregator, cell, WEATHER_TTL + 1)
+    respuesta["temperatura"] = 25.0
+
+    # Responde de inmediato con el dato vencido...
+    resultado = aggregator.get_all_weather("Medellín", *punto)
+    assert resultado["fuentes"]["open_meteo"]["temperatura"] == 22.0
+
+    # ...y el refresco en segundo plano deja la entrada nueva en la caché
+    assert _esperar(lambda: aggregator.cache.get(f"weather:{cell}")["fuentes"]["open_meteo"]["temperatura"] == 25.0)
+    assert len(calls) == 2
+    assert aggregator.get_all_weather("Medellín", *punto)["fuentes"]["open_meteo"]["temperatura"] == 25.0
+
+
+def test_un_solo_refresco_por_celda(aggregator, monkeypatch):
+    liberar = threading.Event()
+    calls = _solo_open_meteo(aggregator, monkeypatch)
+    monkeypatch.setattr(aggregator.om, "get_weather",
+                        lambda *a: calls.append(a) or liberar.wait(1) and {"temperatura": 22.0})
+    cell = geohash.encode(6.2442, -75.5812, aggregator.precision)
+
+    assert aggregator.refresh_async("Medellín", cell)
+    assert not aggregator.refresh_async("Medellín", cell)
+    liberar.set()
+    assert _esperar(lambda: aggregator.cache.get(f"weather:{cell}") is not None)
+    assert len(calls) == 1
+    assert _esperar(lambda: aggregator.refresh_async("Medellín", cell))
+
+
+def test_precalentamiento_solo_celdas_por_vencer(aggregator, monkeypatch):
+    _solo_open_meteo(aggregator, monkeypatch)
+    fresca = (6.2442, -75.5812)
+    por_vencer = (3.4516, -76.532)
+    for ciudad, punto in (("Medellín", fresca), ("Cali", por_vencer)):
+        aggregator.get_all_weather(ciudad, *punto)
+    _envejecer(aggregator, geohash.encode(*por_vencer, aggregator.precision), WEATHER_TTL - 30)
+
+    lugares = [
+        {"ciudad": "Medellín", "lat": fresca[0], "lon": fresca[1]},
+        {"ciudad": "Cali", "lat": por_vencer[0], "lon": por_vencer[1]},
+        {"ciudad": "Cali centro", "lat": por_vencer[0], "lon": por_vencer[1]},  # misma celda
+        {"ciudad": "Bogotá", "lat": 4.711, "lon": -74.0721},  # sin entrada
+    ]
+    assert aggregator.prewarm(lugares, horizon=60) == 2
+
+
+
+@pytest.mark.parametrize("compartida", [False, True])
+def test_precalentamiento_solo_con_cache_compartida(app, monkeypatch, tmp_path, compartida):
+    from app import start_prewarmer
+    from app.routes import consultas
+
+    cache = SQLiteCacheBackend(str(tmp_path / "cache.sqlite")) if compartida else MemoryCacheBackend()
+    monkeypatch.setattr(consultas.aggregator, "cache", cache)
+    monkeypatch.setitem(app.config, "WEATHER_PREWARM_ENABLED", True)
+    monkeypatch.setitem(app.config, "WEATHER_PREWARM_INTERVAL", 3600)
+
+    start_prewarmer(app)
+    prewarmer = app.extensions.pop("favorites_prewarmer", None)
+    if prewarmer:
+        prewarmer.stop()
+    assert (prewarmer is not None) == compartida
+
+# --- Plazo total de la consulta ---
+
+def test_plazo_devuelve_y_cachea_resultado_parcial(monkeypatch):
+    aggregator = WeatherAggregator(cache=MemoryCacheBackend(), deadline=0.3)
+    calls = _solo_open_meteo(aggregator, monkeypatch)
+    bloqueado = threading.Event()
+    monkeypatch.setattr(aggregator.ms, "api_key", "clave")
+    monkeypatch.setattr(aggregator.ms, "get_weather", lambda *a: bloqueado.wait(2) and {"temperatura": 30.0})
+    punto = (6.2442, -75.5812)
+    cell = geohash.encode(*punto, aggregator.precision)
+
+    try:
+        started = time.monotonic()
+        resultado = aggregator.get_all_weather("Medellín", *punto)
+        assert time.monotonic() - started < 0.8
+        assert resultado["fuentes_sin_respuesta"] == ["meteosource"]
+        assert list(resultado["fuentes"]) == ["open_meteo"]
+
+        # La segunda consulta no vuelve a esperar el plazo: sale de la caché
+        started = time.monotonic()
+        segundo = aggregator.get_all_weather("Medellín", *punto)
+        assert time.monotonic() - started < 0.1
+        assert segundo["fuentes_sin_respuesta"] == ["meteosource"]
+        assert len(calls) == 1
+
+        # Vence antes que una entrada completa y entonces se refresca en segundo plano
+        _envejecer(aggregator, cell, WEATHER_PARTIAL_TTL + 1)
+        aggregator.get_all_weather("Medellín", *punto)
+        assert _esperar(lambda: len(calls) == 2)
+    finally:
+        bloqueado.set()
+
+
+def test_resultado_completo_se_cachea(aggregator, monkeypatch):
+    calls = _solo_open_meteo(aggregator, monkeypatch)
+    punto = (6.2442, -75.5812)
+    assert aggregator.get_all_weather("Medellín", *punto)["fuentes_sin_respuesta"] == []
+    aggregator.get_all_weather("Medellín", *punto)
+    assert len(calls) == 1
+    entry = aggregator.cache.get(f"weather:{geohash.encode(*punto, aggregator.precision)}")
+    assert entry["_vigencia"] == WEATHER_TTL
@@ -39,7 +39,7 @@ function MapRecenter({ center, zoom }) {
 // Read OWM key from env, fallback to empty string (tile layer just won't show)
 const OWM_KEY = import.meta.env.VITE_OWM_API_KEY || '';
 
-export default function WeatherMap({ weather, radares, mapCenter, mapZoom, showRadarCoverage, onToggleCoverage }) {
+export default function WeatherMap({ weather, radares, radarTiles, mapCenter, mapZoom, showRadarCoverage, onToggleCoverage }) {
     return (
         <div className="right-panel">
             <div className="map-header">
@@ -66,6 +66,16 @@ export default function WeatherMap({ weather, radares, mapCenter, mapZoom, showR
                         />
                     )}
 
+                    {radarTiles && (
+                        <TileLayer
+                            key={`${radarTiles.producto}-${radarTiles.marca}`}
+                            url={`/api/datos/radar/teselas/${radarTiles.producto}/${radarTiles.marca}/{z}/{x}/{y}.${radarTiles.formato}`}
+                            minNativeZoom={radarTiles.zoom_min}
+                            maxNativeZoom={radarTiles.zoom_max}
+                            opacity={0.7}
+                        />
+                    )}
+
                     {weather?.coordenadas && (
                         <Marker
                             position={[weather.coordenadas.latitude, weather.coordenadas.longitude]}
@@ -111,6 +121,9 @@ export default function WeatherMap({ weather, radares, mapCenter, mapZoom, showR
                 <div className="legend-item"><span className="legend-dot" style={{ background: '#10b981' }}></span> Radar IDEAM</div>
                 <div className="legend-item"><span className="legend-dot" style={{ background: '#3b82f6' }}></span> Ciudad consultada</div>
                 <div className="legend-item"><span className="legend-dot" style={{ background: 'rgba(0,100,255,0.4)' }}></span> Precipitación OWM</div>
+                {radarTiles && (
+                    <div className="legend-item"><span className="legend-dot" style={{ background: '#f59e0b' }}></span> Mosaico radar {radarTiles.marca}</div>
+                )}
             </div>
         </div>
     );
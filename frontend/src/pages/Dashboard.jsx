@@ -17,6 +17,7 @@ function Dashboard() {
   const [mapCenter, setMapCenter] = useState([4.7110, -74.0721]); // Bogotá default
   const [mapZoom, setMapZoom] = useState(6);
   const [showRadarCoverage, setShowRadarCoverage] = useState(true);
+  const [radarTiles, setRadarTiles] = useState(null);
 
   // Autocomplete states
   const [suggestions, setSuggestions] = useState([]);
@@ -36,6 +37,12 @@ function Dashboard() {
       .then(res => res.json())
       .then(data => setRadares(data.radares || []))
       .catch(err => console.error('Error loading radars:', err));
+
+    // Latest pre-rendered radar mosaic tiles (public, cached)
+    fetch('/api/datos/radar/teselas/mosaico')
+      .then(res => (res.ok ? res.json() : null))
+      .then(data => setRadarTiles(data?.ultima || null))
+      .catch(() => setRadarTiles(null));
   }, [token]);
 
   // Improvement 8: City Autocomplete with Debounce logic
@@ -47,27 +54,48 @@ function Dashboard() {
 
     const timer = setTimeout(async () => {
       try {
-        const res = await fetch(`https://geocoding-api.open-meteo.com/v1/search?name=${city}&count=5&language=es&format=json`);
-        const data = await res.json();
-        if (data.results) {
-          setSuggestions(data.results.map(r => ({
-            name: r.name,
-            admin1: r.admin1,
-            country: r.country,
-            lat: r.latitude,
-            lon: r.longitude
-          })));
+        // Municipios colombianos desde el nomenclátor del backend (sin red externa) y
+        // geocodificación de Open-Meteo en paralelo: las sugerencias locales aproximadas
+        // no deben ocultar ciudades de fuera de Colombia (ej. "Santiago")
+        const [local, remote] = await Promise.allSettled([
+          fetch(`/api/datos/ciudades/autocompletar?q=${encodeURIComponent(city)}&limit=5`)
+            .then(res => (res.ok ? res.json() : { resultados: [] })),
+          fetch(`https://geocoding-api.open-meteo.com/v1/search?name=${encodeURIComponent(city)}&count=5&language=es&format=json`)
+            .then(res => res.json())
+        ]);
+
+        const localResults = (local.status === 'fulfilled' ? local.value.resultados : []).map(r => ({
+          name: r.nombre,
+          admin1: r.departamento,
+          country: 'Colombia',
+          lat: r.latitud,
+          lon: r.longitud
+        }));
+        const remoteResults = ((remote.status === 'fulfilled' && remote.value.results) || []).map(r => ({
+          name: r.name,
+          admin1: r.admin1,
+          country: r.country,
+          lat: r.latitude,
+          lon: r.longitude
+        }));
+
+        // Las coincidencias locales primero; se omiten los municipios que Open-Meteo repite
+        const key = s => `${s.name}|${s.country}`.normalize('NFD').replace(/[\u0300-\u036f]/g, '').toLowerCase();
+        const seen = new Set(localResults.map(key));
+        const merged = [...localResults, ...remoteResults.filter(s => !seen.has(key(s)))].slice(0, 8);
+        if (merged.length > 0) {
+          setSuggestions(merged);
           setShowSuggestions(true);
         }
       } catch (err) {
         console.error("Geocoding error:", err);
       }
-    }, 500);
+    }, 250);
 
     return () => clearTimeout(timer);
   }, [city]);
 
-  const handleSearch = async (cityToSearch) => {
+  const handleSearch = async (cityToSearch, coords = null) => {
     const searchVal = typeof cityToSearch === 'string' ? cityToSearch : city;
     if (!searchVal.trim()) return;
 
@@ -83,7 +111,9 @@ function Dashboard() {
           'Content-Type': 'application/json',
           'Authorization': `Bearer ${token}`
         },
-        body: JSON.stringify({ ciudad: searchVal }),
+        body: JSON.stringify(coords
+          ? { ciudad: searchVal, latitud: coords.lat, longitud: coords.lon }
+          : { ciudad: searchVal }),
       });
 
       if (!response.ok) {
@@ -93,6 +123,10 @@ function Dashboard() {
 
       const data = await response.json();
       setWeather(data);
+      // 207: hay datos, pero la consulta no quedó en el historial
+      if (data.error_registro) {
+        setError(data.error_registro);
+      }
 
       if (data.coordenadas) {
         setMapCenter([data.coordenadas.latitude, data.coordenadas.longitude]);
@@ -109,7 +143,7 @@ function Dashboard() {
     setCity(s.name);
     setSuggestions([]);
     setShowSuggestions(false);
-    handleSearch(s.name);
+    handleSearch(s.name, { lat: s.lat, lon: s.lon });
   };
 
   return (
@@ -185,6 +219,7 @@ function Dashboard() {
         <WeatherMap
           weather={weather}
           radares={radares}
+          radarTiles={radarTiles}
           mapCenter={mapCenter}
           mapZoom={mapZoom}
           showRadarCoverage={showRadarCoverage}
@@ -19,100 +19,152 @@ from pathlib import Path
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 import json
+import importlib
 
 # Añadir el directorio raíz al path
 sys.path.insert(0, str(Path(__file__).parent))
 
-# Importar clientes
-from src.data_sources.meteoblue import MeteoblueClient
-from src.data_sources.open_meteo import OpenMeteoClient
-from src.data_sources.openweather import OpenWeatherMapClient
-from src.data_sources.Meteosource import MeteosourceAPI
-from src.data_sources.ideam_radar_downloader import IDEAMRadarDownloader
-from src.data_sources.siata_cliente import SIATADownloader
-from src.processors.radar_processor import RadarDataProcessor
+# Los clientes se importan al primer uso: una consulta puntual a Open-Meteo
+# no debe pagar la importación de boto3, pandas, plotly o PyART.
+# nombre -> (módulo, clase)
+CLIENTES = {
+    'meteoblue': ('src.data_sources.meteoblue', 'MeteoblueClient'),
+    'openmeteo': ('src.data_sources.open_meteo', 'OpenMeteoClient'),
+    'openweather': ('src.data_sources.openweather', 'OpenWeatherMapClient'),
+    'meteosource': ('src.data_sources.Meteosource', 'MeteosourceAPI'),
+    'ideam_radar': ('src.data_sources.ideam_radar_downloader', 'IDEAMRadarDownloader'),
+    'siata': ('src.data_sources.siata_cliente', 'SIATADownloader'),
+    'radar_processor': ('src.processors.radar_processor', 'RadarDataProcessor'),
+}
+
+
+def _clase_cliente(nombre):
+    """Importa y retorna la clase de un cliente"""
+    modulo, clase = CLIENTES[nombre]
+    return getattr(importlib.import_module(modulo), clase)
+
+
+def _propiedad_cliente(nombre):
+    """Propiedad que crea el cliente en el primer acceso"""
+    return property(lambda self: self._cliente(nombre))
 
 
 class ClimAPIManager:
     """Gestor central de todas las APIs climáticas"""
     
-    def __init__(self):
-        """Inicializa todos los clientes disponibles"""
+    meteoblue = _propiedad_cliente('meteoblue')
+    openmeteo = _propiedad_cliente('openmeteo')
+    openweather = _propiedad_cliente('openweather')
+    meteosource = _propiedad_cliente('meteosource')
+    ideam_radar = _propiedad_cliente('ideam_radar')
+    siata = _propiedad_cliente('siata')
+    radar_processor = _propiedad_cliente('radar_processor')
+    
+    def __init__(self, perezoso=True):
+        """
+        Prepara el gestor de clientes
+        
+        Args:
+            perezoso: si es True cada cliente se importa y crea en su primer uso;
+                      si es False se inicializan todos de inmediato
+        """
         load_dotenv()
         
         # Directorio de datos
         self.data_dir = Path("data")
         self.data_dir.mkdir(exist_ok=True)
         
-        # Inicializar clientes
-        self.meteoblue = None
-        self.openmeteo = None
-        self.openweather = None
-        self.meteosource = None
-        self.ideam_radar = None
-        self.siata = None
-        self.radar_processor = None
+        # Clientes ya creados (None si no está configurado o falló)
+        self._clientes = {}
         
-        self._initialize_clients()
+        if not perezoso:
+            self._initialize_clients()
     
-    def _initialize_clients(self):
-        """Inicializa los clientes de APIs"""
+    def _cliente(self, nombre):
+        """Retorna el cliente, creándolo en el primer acceso"""
+        if nombre not in self._clientes:
+            self._clientes[nombre] = self._crear_cliente(nombre)
+        return self._clientes[nombre]
+    
+    def _crear_cliente(self, nombre):
+        """Importa y crea un cliente; None si no está configurado o falla"""
         
         # Meteoblue (requiere API key y secret)
-        try:
-            meteoblue_key = os.getenv("METEOBLUE_API_KEY")
-            meteoblue_secret = os.getenv("METEOBLUE_SHARED_SECRET")
-            if meteoblue_key and meteoblue_secret:
-                self.meteoblue = MeteoblueClient(meteoblue_key, meteoblue_secret)
-                print("✅ Meteoblue inicializado")
-            else:
+        if nombre == 'meteoblue':
+            try:
+                meteoblue_key = os.getenv("METEOBLUE_API_KEY")
+                meteoblue_secret = os.getenv("METEOBLUE_SHARED_SECRET")
+                if meteoblue_key and meteoblue_secret:
+                    cliente = _clase_cliente(nombre)(meteoblue_key, meteoblue_secret)
+                    print("✅ Meteoblue inicializado")
+                    return cliente
                 print("⚠️  Meteoblue: No configurado (requiere API key y secret)")
-        except Exception as e:
-            print(f"⚠️  Meteoblue: Error al inicializar - {e}")
+            except Exception as e:
+                print(f"⚠️  Meteoblue: Error al inicializar - {e}")
+            return None
         
         # Open-Meteo (gratuito, sin API key)
-        try:
-            self.openmeteo = OpenMeteoClient()
-            print("✅ Open-Meteo inicializado")
-        except Exception as e:
-            print(f"⚠️  Open-Meteo: Error al inicializar - {e}")
+        if nombre == 'openmeteo':
+            try:
+                cliente = _clase_cliente(nombre)()
+                print("✅ Open-Meteo inicializado")
+                return cliente
+            except Exception as e:
+                print(f"⚠️  Open-Meteo: Error al inicializar - {e}")
+            return None
         
         # OpenWeatherMap (requiere API key)
-        try:
-            openweather_key = os.getenv("OPENWEATHER_API_KEY")
-            if openweather_key:
-                self.openweather = OpenWeatherMapClient(openweather_key)
-                print("✅ OpenWeatherMap inicializado")
-            else:
+        if nombre == 'openweather':
+            try:
+                openweather_key = os.getenv("OPENWEATHER_API_KEY")
+                if openweather_key:
+                    cliente = _clase_cliente(nombre)(openweather_key)
+                    print("✅ OpenWeatherMap inicializado")
+                    return cliente
                 print("⚠️  OpenWeatherMap: No configurado (requiere API key)")
-        except Exception as e:
-            print(f"⚠️  OpenWeatherMap: Error al inicializar - {e}")
+            except Exception as e:
+                print(f"⚠️  OpenWeatherMap: Error al inicializar - {e}")
+            return None
         
         # Meteosource (requiere API key)
-        try:
-            meteosource_key = os.getenv("METEOSOURCE_API_KEY")
-            if meteosource_key:
-                self.meteosource = MeteosourceAPI()
-                print("✅ Meteosource inicializado")
-            else:
+        if nombre == 'meteosource':
+            try:
+                if os.getenv("METEOSOURCE_API_KEY"):
+                    cliente = _clase_cliente(nombre)()
+                    print("✅ Meteosource inicializado")
+                    return cliente
                 print("⚠️  Meteosource: No configurado (requiere API key)")
-        except Exception as e:
-            print(f"⚠️  Meteosource: Error al inicializar - {e}")
+            except Exception as e:
+                print(f"⚠️  Meteosource: Error al inicializar - {e}")
+            return None
         
-        # IDEAM Radar (AWS público, no requiere credenciales)
-        try:
-            self.ideam_radar = IDEAMRadarDownloader()
-            self.radar_processor = RadarDataProcessor()
-            print("✅ IDEAM Radar inicializado")
-        except Exception as e:
-            print(f"⚠️  IDEAM Radar: Error al inicializar - {e}")
+        # IDEAM Radar (AWS público, no requiere credenciales) y su procesador
+        if nombre in ('ideam_radar', 'radar_processor'):
+            try:
+                cliente = _clase_cliente(nombre)()
+                if nombre == 'ideam_radar':
+                    print("✅ IDEAM Radar inicializado")
+                return cliente
+            except Exception as e:
+                print(f"⚠️  IDEAM Radar: Error al inicializar - {e}")
+            return None
         
         # SIATA (público, no requiere credenciales)
-        try:
-            self.siata = SIATADownloader()
-            print("✅ SIATA inicializado")
-        except Exception as e:
-            print(f"⚠️  SIATA: Error al inicializar - {e}")
+        if nombre == 'siata':
+            try:
+                cliente = _clase_cliente(nombre)()
+                print("✅ SIATA inicializado")
+                return cliente
+            except Exception as e:
+                print(f"⚠️  SIATA: Error al inicializar - {e}")
+            return None
+        
+        raise KeyError(f"Cliente desconocido: {nombre}")
+    
+    def _initialize_clients(self):
+        """Inicializa de inmediato todos los clientes de APIs"""
+        for nombre in CLIENTES:
+            self._cliente(nombre)
     
     def consultar_meteoblue(self, lat, lon, location_name, asl=0):
         """Consulta Meteoblue para una ubicación"""
@@ -448,6 +500,12 @@ def menu_principal():
 
 
 if __name__ == "__main__":
+    # python main.py --reporte-importacion [objetivo_ms]
+    if len(sys.argv) > 1 and sys.argv[1] == "--reporte-importacion":
+        from src.import_report import reporte_importacion
+        objetivo = float(sys.argv[2]) if len(sys.argv) > 2 else None
+        sys.exit(0 if reporte_importacion(objetivo_ms=objetivo) else 1)
+    
     print("""
     ╔═══════════════════════════════════════════════════════════════╗
     ║                          CLIMAPI                              ║
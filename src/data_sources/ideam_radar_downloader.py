@@ -3,32 +3,42 @@ Script para descargar datos de radares meteorológicos IDEAM desde AWS Open Data
 Guarda datos en data/Radar_IDEAM y logs en logs/ideam
 """
 import os
-import boto3
-import gzip
-import numpy as np
-import pandas as pd
+import hashlib
 from pathlib import Path
 from datetime import datetime, timedelta
 import logging
-from botocore import UNSIGNED
-from botocore.config import Config
 import json
 
-# Configuración de logging
-log_dir = Path("logs/ideam")
-log_dir.mkdir(parents=True, exist_ok=True)
+from src.data_sources.radar_inventory import InventarioRadar
+from src.data_sources.radar_s3_mirror import EspejoS3Radar
+from src.data_sources.radar_range_reader import LectorParcialS3
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_dir / f'radar_ideam_{datetime.now().strftime("%Y%m%d")}.log'),
-        logging.StreamHandler()
-    ]
-)
+# boto3 se importa al crear el descargador
 
 logger = logging.getLogger(__name__)
 
+_LOGGING_CONFIGURADO = False
+
+
+def configurar_logging(log_dir="logs/ideam"):
+    """Configura el log a archivo y consola (solo la primera vez)"""
+    global _LOGGING_CONFIGURADO
+    if _LOGGING_CONFIGURADO:
+        return
+    
+    log_dir = Path(log_dir)
+    log_dir.mkdir(parents=True, exist_ok=True)
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_dir / f'radar_ideam_{datetime.now().strftime("%Y%m%d")}.log'),
+            logging.StreamHandler()
+        ]
+    )
+    _LOGGING_CONFIGURADO = True
+
 
 class IDEAMRadarDownloader:
     """Clase para descargar y procesar datos de radares IDEAM"""
@@ -73,7 +83,13 @@ class IDEAMRadarDownloader:
         }
     }
     
-    def __init__(self, base_dir="data/Radar_IDEAM"):
+    def __init__(self, base_dir="data/Radar_IDEAM", usar_espejo=True):
+        import boto3
+        from botocore import UNSIGNED
+        from botocore.config import Config
+        
+        configurar_logging()
+        
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(parents=True, exist_ok=True)
         
@@ -87,6 +103,16 @@ class IDEAMRadarDownloader:
         # Bucket correcto según documentación oficial
         self.bucket_name = 's3-radaresideam'
         
+        # Índice incremental de archivos descargados
+        self.inventario = InventarioRadar(self.base_dir, self.RADARES_DISPONIBLES)
+        
+        # Espejo local del listado del bucket (responde sin consultar S3 las fechas que cubre)
+        self.espejo = EspejoS3Radar(self.s3_client, self.bucket_name, self.base_dir)
+        self.usar_espejo = usar_espejo
+        
+        # Lecturas parciales (encabezados y sweeps sueltos) por HTTP Range
+        self.lector_parcial = LectorParcialS3(self.s3_client, self.bucket_name)
+        
         logger.info("IDEAMRadarDownloader inicializado")
         logger.info(f"Bucket AWS: s3://{self.bucket_name}")
         logger.info(f"Directorio de datos: {self.base_dir}")
@@ -161,6 +187,11 @@ class IDEAMRadarDownloader:
             # Por defecto, buscar ayer (los datos tienen 24h de delay)
             fecha = datetime.now() - timedelta(days=1)
         
+        if self.usar_espejo and self.espejo.cubre(fecha):
+            archivos = self.espejo.archivos(radar, fecha, limite)
+            logger.info(f"✅ Espejo local: {len(archivos)} archivos para {radar} en {fecha.date()}")
+            return archivos
+        
         prefix = self.crear_query_prefix(radar, fecha)
         
         logger.info(f"Buscando archivos en: s3://{self.bucket_name}/{prefix}")
@@ -179,6 +210,7 @@ class IDEAMRadarDownloader:
                         'key': obj['Key'],
                         'size': obj['Size'],
                         'last_modified': obj['LastModified'],
+                        'etag': obj.get('ETag', '').strip('"'),
                         'filename': os.path.basename(obj['Key'])
                     })
                 
@@ -193,8 +225,98 @@ class IDEAMRadarDownloader:
             logger.error(f"❌ Error listando archivos: {e}")
             return []
     
-    def descargar_archivo(self, radar, archivo_key, fecha=None):
-        """Descarga un archivo específico del radar"""
+    def _metadatos_objeto(self, archivo_key, objeto=None):
+        """Tamaño y ETag esperados de un objeto (listado, espejo local o HEAD)"""
+        if objeto and objeto.get('size') is not None and objeto.get('etag'):
+            return {'size': objeto['size'], 'etag': objeto['etag']}
+        
+        esperado = self.espejo.objeto(archivo_key)
+        if esperado and esperado.get('etag'):
+            return esperado
+        
+        respuesta = self.s3_client.head_object(Bucket=self.bucket_name, Key=archivo_key)
+        return {'size': respuesta['ContentLength'], 'etag': respuesta['ETag'].strip('"')}
+    
+    def _verificar_md5(self, ruta, etag):
+        """Compara el MD5 del archivo con el ETag (solo válido para objetos no multiparte)"""
+        if not etag or '-' in etag:
+            return True
+        
+        md5 = hashlib.md5()
+        with open(ruta, 'rb') as f:
+            for bloque in iter(lambda: f.read(1024 * 1024), b''):
+                md5.update(bloque)
+        return md5.hexdigest() == etag
+    
+    def _descargar_verificado(self, archivo_key, local_path, esperado, intentos=3):
+        """
+        Descarga a un archivo .part reanudando con Range y renombra al verificar
+        
+        IfMatch asegura que todas las partes provienen de la misma versión del
+        objeto; si cambió en S3 la descarga se reinicia desde cero.
+        """
+        from botocore.exceptions import ClientError
+        
+        parcial = local_path.with_name(local_path.name + '.part')
+        
+        for intento in range(1, intentos + 1):
+            offset = parcial.stat().st_size if parcial.exists() else 0
+            if offset > esperado['size']:
+                parcial.unlink()
+                offset = 0
+            # Un objeto de 0 bytes no necesita GET, pero el .part debe existir para verificarlo
+            parcial.touch(exist_ok=True)
+            
+            try:
+                if offset < esperado['size']:
+                    if offset:
+                        logger.info(f"↪️  Reanudando {local_path.name} desde {offset / (1024 * 1024):.2f} MB")
+                    respuesta = self.s3_client.get_object(
+                        Bucket=self.bucket_name, Key=archivo_key,
+                        Range=f"bytes={offset}-", IfMatch=f'"{esperado["etag"]}"'
+                    )
+                    with open(parcial, 'ab') as f:
+                        for bloque in respuesta['Body'].iter_chunks(1024 * 1024):
+                            f.write(bloque)
+            except ClientError as e:
+                codigo = e.response.get('Error', {}).get('Code')
+                if codigo in ('PreconditionFailed', '412'):
+                    logger.warning(f"⚠️  {local_path.name} cambió en S3; se reinicia la descarga")
+                    parcial.unlink(missing_ok=True)
+                    esperado.update(self._metadatos_objeto(archivo_key))
+                    continue
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️  Descarga interrumpida de {local_path.name} "
+                               f"(intento {intento}/{intentos}): {e}")
+                continue
+            
+            # Verificación de integridad antes de publicar el archivo
+            if parcial.stat().st_size != esperado['size']:
+                logger.warning(f"⚠️  Tamaño incorrecto en {local_path.name}, reintentando")
+                continue
+            if not self._verificar_md5(parcial, esperado['etag']):
+                logger.warning(f"⚠️  MD5 no coincide en {local_path.name}; se descarta")
+                parcial.unlink()
+                continue
+            
+            os.replace(parcial, local_path)
+            return True
+        
+        return False
+    
+    def descargar_archivo(self, radar, archivo_key, fecha=None, objeto=None, verificar=True):
+        """
+        Descarga un archivo específico del radar
+        
+        Args:
+            radar: nombre del radar
+            archivo_key: llave del objeto en S3
+            fecha: fecha del directorio local (por defecto ayer)
+            objeto: entrada del listado con 'size' y 'etag' (evita un HEAD)
+            verificar: descarga reanudable vía .part con verificación de tamaño y
+                ETag/MD5; si es False se descarga directo como antes
+        """
         if fecha is None:
             fecha = datetime.now() - timedelta(days=1)
         
@@ -205,25 +327,54 @@ class IDEAMRadarDownloader:
         filename = os.path.basename(archivo_key)
         local_path = radar_dir / filename
         
-        # Verificar si ya existe
-        if local_path.exists():
-            logger.info(f"⏭️  Archivo ya existe: {filename}")
-            return local_path
+        if not verificar:
+            # Verificar si ya existe
+            if local_path.exists():
+                logger.info(f"⏭️  Archivo ya existe: {filename}")
+                return local_path
+            
+            try:
+                logger.info(f"⬇️  Descargando: {filename}")
+                self.s3_client.download_file(
+                    self.bucket_name,
+                    archivo_key,
+                    str(local_path)
+                )
+                file_size_mb = local_path.stat().st_size / (1024 * 1024)
+                self.inventario.registrar(radar, local_path)
+                logger.info(f"✅ Descargado: {filename} ({file_size_mb:.2f} MB)")
+                return local_path
+                
+            except Exception as e:
+                logger.error(f"❌ Error descargando {filename}: {e}")
+                return None
         
         try:
-            logger.info(f"⬇️  Descargando: {filename}")
-            self.s3_client.download_file(
-                self.bucket_name,
-                archivo_key,
-                str(local_path)
-            )
-            file_size_mb = local_path.stat().st_size / (1024 * 1024)
-            logger.info(f"✅ Descargado: {filename} ({file_size_mb:.2f} MB)")
-            return local_path
-            
+            esperado = self._metadatos_objeto(archivo_key, objeto)
         except Exception as e:
-            logger.error(f"❌ Error descargando {filename}: {e}")
+            logger.error(f"❌ No se pudo consultar {filename} en S3: {e}")
+            return None
+        
+        # Un archivo existente solo se da por completo si coincide el tamaño
+        if local_path.exists():
+            tamaño_local = local_path.stat().st_size
+            if tamaño_local == esperado['size']:
+                logger.info(f"⏭️  Archivo ya existe: {filename}")
+                return local_path
+            
+            logger.warning(f"⚠️  {filename} incompleto ({tamaño_local} de {esperado['size']} bytes); "
+                           f"se reanuda")
+            os.replace(local_path, local_path.with_name(filename + '.part'))
+        
+        logger.info(f"⬇️  Descargando: {filename}")
+        if not self._descargar_verificado(archivo_key, local_path, esperado):
+            logger.error(f"❌ Error descargando {filename}: no se pudo completar ni verificar")
             return None
+        
+        file_size_mb = local_path.stat().st_size / (1024 * 1024)
+        self.inventario.registrar(radar, local_path)
+        logger.info(f"✅ Descargado y verificado: {filename} ({file_size_mb:.2f} MB)")
+        return local_path
     
     def descargar_rango_fechas(self, radar, fecha_inicio, fecha_fin, max_archivos=None):
         """Descarga archivos de un radar en un rango de fechas"""
@@ -253,7 +404,8 @@ class IDEAMRadarDownloader:
                         return archivos_descargados
                     
                     # Descargar archivo
-                    local_path = self.descargar_archivo(radar, archivo['key'], fecha_actual)
+                    local_path = self.descargar_archivo(radar, archivo['key'], fecha_actual,
+                                                        objeto=archivo)
                     if local_path:
                         archivos_descargados.append({
                             'radar': radar,
@@ -269,47 +421,33 @@ class IDEAMRadarDownloader:
         logger.info(f"✅ Descarga completada. Total archivos: {len(archivos_descargados)}")
         return archivos_descargados
     
-    def generar_inventario(self, radar=None):
-        """Genera un inventario de todos los archivos descargados"""
-        logger.info("📋 Generando inventario de archivos descargados")
-        
-        inventario = []
-        
-        # Si se especifica radar, solo ese
-        if radar:
-            radares_a_inventariar = [radar]
-        else:
-            radares_a_inventariar = [d.name for d in self.base_dir.iterdir() if d.is_dir()]
-        
-        for radar_nombre in radares_a_inventariar:
-            radar_path = self.base_dir / radar_nombre
-            
-            if not radar_path.exists():
-                continue
+    def generar_inventario(self, radar=None, exportar_csv=False):
+        """
+        Actualiza el inventario de archivos descargados
+        
+        Las descargas se registran en el índice SQLite a medida que ocurren; aquí
+        solo se reconcilian los directorios de fecha que cambiaron en disco.
+        
+        Args:
+            radar: radar a reconciliar (None para todos)
+            exportar_csv: escribir también inventario_radares.csv completo
+        """
+        logger.info("📋 Actualizando inventario de archivos descargados")
+        
+        self.inventario.reconciliar(radar)
+        df_inventario = self.inventario.como_dataframe(radar)
+        resumen_radar = self.inventario.resumen_por_radar()
+        
+        if resumen_radar:
+            if exportar_csv:
+                self.inventario.exportar_csv()
             
-            for fecha_dir in radar_path.iterdir():
-                if fecha_dir.is_dir():
-                    for archivo in fecha_dir.iterdir():
-                        if archivo.is_file() and not archivo.name.endswith('.txt'):
-                            info_radar = self.RADARES_DISPONIBLES.get(radar_nombre, {})
-                            inventario.append({
-                                'radar': radar_nombre,
-                                'ubicacion': info_radar.get('ubicacion', 'N/A'),
-                                'distancia_medellin_km': info_radar.get('distancia_medellin_km', 0),
-                                'fecha_directorio': fecha_dir.name,
-                                'archivo': archivo.name,
-                                'ruta_completa': str(archivo),
-                                'tamaño_mb': archivo.stat().st_size / (1024 * 1024),
-                                'fecha_modificacion': datetime.fromtimestamp(archivo.stat().st_mtime)
-                            })
-        
-        df_inventario = pd.DataFrame(inventario)
-        
-        if not df_inventario.empty:
-            # Guardar inventario
-            inventario_path = self.base_dir / 'inventario_radares.csv'
-            df_inventario.to_csv(inventario_path, index=False)
-            logger.info(f"💾 Inventario guardado en: {inventario_path}")
+            total_archivos = sum(r['archivos'] for r in resumen_radar.values())
+            total_mb = sum(r['tamaño_mb'] for r in resumen_radar.values())
+            tabla = "\n".join(
+                f"{nombre:<20} {r['archivos']:>10} {r['tamaño_mb']:>12.2f}"
+                for nombre, r in resumen_radar.items()
+            )
             
             # Generar resumen
             resumen_path = self.base_dir / 'resumen_radares.txt'
@@ -318,32 +456,27 @@ class IDEAMRadarDownloader:
                 f.write("RESUMEN DE DATOS DE RADARES IDEAM\n")
                 f.write("="*80 + "\n\n")
                 f.write(f"Generado: {datetime.now()}\n")
-                f.write(f"Total de archivos: {len(df_inventario)}\n")
-                f.write(f"Espacio total: {df_inventario['tamaño_mb'].sum():.2f} MB\n\n")
+                f.write(f"Total de archivos: {total_archivos}\n")
+                f.write(f"Espacio total: {total_mb:.2f} MB\n\n")
                 
                 f.write("Archivos por radar:\n")
                 f.write("-" * 80 + "\n")
-                resumen_radar = df_inventario.groupby('radar').agg({
-                    'archivo': 'count',
-                    'tamaño_mb': 'sum'
-                }).round(2)
-                resumen_radar.columns = ['Archivos', 'Tamaño_MB']
-                f.write(resumen_radar.to_string())
+                f.write(f"{'Radar':<20} {'Archivos':>10} {'Tamaño_MB':>12}\n")
+                f.write(tabla)
                 f.write("\n\n")
                 
                 f.write("Información de radares disponibles en AWS:\n")
                 f.write("-" * 80 + "\n")
-                for radar, info in sorted(self.RADARES_DISPONIBLES.items(), 
+                for nombre, info in sorted(self.RADARES_DISPONIBLES.items(), 
                                         key=lambda x: x[1]['distancia_medellin_km']):
-                    tiene_datos = radar in df_inventario['radar'].values
-                    f.write(f"\n{radar} {'✓' if tiene_datos else '✗'}:\n")
+                    tiene_datos = nombre in resumen_radar
+                    f.write(f"\n{nombre} {'✓' if tiene_datos else '✗'}:\n")
                     f.write(f"  Ubicación: {info['ubicacion']}\n")
                     f.write(f"  Coordenadas: {info['lat']:.4f}°N, {info['lon']:.4f}°W\n")
                     f.write(f"  Distancia a Medellín: {info['distancia_medellin_km']} km\n")
                     f.write(f"  Prefijo: {info['prefijo']}\n")
                     if tiene_datos:
-                        n_archivos = len(df_inventario[df_inventario['radar'] == radar])
-                        f.write(f"  Archivos descargados: {n_archivos}\n")
+                        f.write(f"  Archivos descargados: {resumen_radar[nombre]['archivos']}\n")
             
             logger.info(f"📄 Resumen guardado en: {resumen_path}")
             
@@ -352,8 +485,8 @@ class IDEAMRadarDownloader:
             print("📊 RESUMEN DE DESCARGA")
             print("="*80)
             print(f"\nArchivos por radar:")
-            print(resumen_radar.to_string())
-            print(f"\nEspacio total: {df_inventario['tamaño_mb'].sum():.2f} MB")
+            print(tabla)
+            print(f"\nEspacio total: {total_mb:.2f} MB")
         
         return df_inventario
     
@@ -380,6 +513,33 @@ class IDEAMRadarDownloader:
         """Verifica si hay datos disponibles para una fecha específica"""
         archivos = self.listar_archivos_disponibles(radar, fecha)
         return len(archivos) > 0
+    
+    def leer_sweeps_remotos(self, archivo_key, sweeps=(0,)):
+        """
+        Descarga solo los sweeps indicados de un volumen (por defecto el más bajo)
+        
+        Returns:
+            bytes de un volumen IRIS reducido, legible con pyart.io.read_sigmet
+        """
+        objeto = self.espejo.objeto(archivo_key)
+        datos, _ = self.lector_parcial.leer_sweeps(
+            archivo_key, sweeps, tamaño=objeto['size'] if objeto else None
+        )
+        return datos
+    
+    def sincronizar_espejo(self, desde=None):
+        """Llena o actualiza el espejo local del listado del bucket"""
+        return self.espejo.sincronizar(desde=desde)
+    
+    def planificar_descarga(self, radar, fecha_inicio, fecha_fin):
+        """
+        Objetos del rango que aún no están descargados, según el espejo y el inventario
+        
+        No consulta S3: sincronice antes el espejo para incluir datos recientes.
+        """
+        self.inventario.reconciliar(radar)
+        descargados = self.inventario.como_dataframe(radar)['archivo']
+        return self.espejo.planificar_descarga(radar, fecha_inicio, fecha_fin, descargados)
 
 
 def menu_interactivo():
@@ -0,0 +1,246 @@
+"""
+Inventario incremental de archivos de radar IDEAM descargados
+Índice SQLite que se actualiza al descargar y se reconcilia con os.scandir
+revisando solo los directorios de fecha que cambiaron
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+import logging
+
+logger = logging.getLogger(__name__)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS archivos (
+    ruta TEXT PRIMARY KEY,
+    radar TEXT NOT NULL,
+    fecha_directorio TEXT NOT NULL,
+    archivo TEXT NOT NULL,
+    tamaño_bytes INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_archivos_radar ON archivos (radar, fecha_directorio);
+CREATE TABLE IF NOT EXISTS directorios (
+    ruta TEXT PRIMARY KEY,
+    radar TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    clave TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+"""
+
+COLUMNAS = ['radar', 'ubicacion', 'distancia_medellin_km', 'fecha_directorio', 'archivo',
+            'ruta_completa', 'tamaño_mb', 'fecha_modificacion']
+
+
+def _es_volumen(nombre):
+    """Descarta resúmenes, índices y descargas parciales"""
+    return not nombre.endswith(('.txt', '.part', '.csv', '.sqlite', '.sqlite-wal', '.sqlite-shm'))
+
+
+class InventarioRadar:
+    """Índice SQLite de los volúmenes descargados en data/Radar_IDEAM"""
+
+    def __init__(self, base_dir="data/Radar_IDEAM", info_radares=None):
+        """
+        Args:
+            base_dir: directorio raíz de los datos de radar
+            info_radares: dict radar -> info (ubicación, distancia) para enriquecer consultas
+        """
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.base_dir / 'inventario_radares.sqlite'
+        self.info_radares = info_radares or {}
+        self._lock = threading.Lock()
+
+        with self._conectar() as conn:
+            conn.executescript(ESQUEMA)
+            conn.execute("INSERT OR IGNORE INTO meta (clave, valor) VALUES ('version', 0)")
+
+    @contextmanager
+    def _conectar(self):
+        """Conexión por operación (segura entre hilos); confirma al salir sin error"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _incrementar_version(self, conn):
+        conn.execute("UPDATE meta SET valor = valor + 1 WHERE clave = 'version'")
+
+    def version(self):
+        """Contador que cambia con cada modificación del inventario"""
+        with self._conectar() as conn:
+            return conn.execute("SELECT valor FROM meta WHERE clave = 'version'").fetchone()[0]
+
+    def reconciliado(self):
+        """True si ya se hizo al menos una reconciliación completa (todos los radares)"""
+        with self._conectar() as conn:
+            return conn.execute("SELECT 1 FROM meta WHERE clave = 'reconciliado'").fetchone() is not None
+
+    def vacio(self):
+        """True si nunca se ha reconciliado ni registrado ningún archivo"""
+        with self._conectar() as conn:
+            return conn.execute("SELECT 1 FROM directorios LIMIT 1").fetchone() is None and \
+                conn.execute("SELECT 1 FROM archivos LIMIT 1").fetchone() is None
+
+    def registrar(self, radar, ruta):
+        """Agrega (o actualiza) un archivo recién descargado"""
+        ruta = Path(ruta)
+        try:
+            st = ruta.stat()
+        except OSError:
+            logger.warning(f"No se puede registrar {ruta}: no existe")
+            return False
+
+        with self._lock, self._conectar() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO archivos VALUES (?, ?, ?, ?, ?, ?)",
+                (str(ruta), radar, ruta.parent.name, ruta.name, st.st_size, st.st_mtime)
+            )
+            self._incrementar_version(conn)
+        return True
+
+    def _escanear_fecha(self, conn, radar, dir_fecha):
+        """Sincroniza los archivos de un directorio de fecha; retorna (nuevos, eliminados)"""
+        en_disco = {}
+        with os.scandir(dir_fecha.path) as archivos:
+            for archivo in archivos:
+                if archivo.is_file() and _es_volumen(archivo.name):
+                    st = archivo.stat()
+                    en_disco[archivo.path] = (st.st_size, st.st_mtime)
+
+        registrados = {
+            ruta: (tamaño, mtime) for ruta, tamaño, mtime in conn.execute(
+                "SELECT ruta, tamaño_bytes, mtime FROM archivos WHERE radar = ? AND fecha_directorio = ?",
+                (radar, dir_fecha.name)
+            )
+        }
+
+        nuevos = [
+            (ruta, radar, dir_fecha.name, os.path.basename(ruta), tamaño, mtime)
+            for ruta, (tamaño, mtime) in en_disco.items()
+            if registrados.get(ruta) != (tamaño, mtime)
+        ]
+        eliminados = [(ruta,) for ruta in registrados if ruta not in en_disco]
+
+        conn.executemany("INSERT OR REPLACE INTO archivos VALUES (?, ?, ?, ?, ?, ?)", nuevos)
+        conn.executemany("DELETE FROM archivos WHERE ruta = ?", eliminados)
+        conn.execute("INSERT OR REPLACE INTO directorios VALUES (?, ?, ?)",
+                     (dir_fecha.path, radar, dir_fecha.stat().st_mtime_ns))
+        return len(nuevos), len(eliminados)
+
+    def reconciliar(self, radar=None):
+        """
+        Sincroniza el índice con el disco
+
+        Solo se recorren los directorios de fecha cuyo mtime cambió desde la
+        última reconciliación (archivos agregados o borrados), así el costo
+        depende de los cambios del día y no del tamaño del archivo histórico.
+
+        Returns:
+            dict con directorios revisados, archivos nuevos y eliminados
+        """
+        resumen = {'directorios_revisados': 0, 'nuevos': 0, 'eliminados': 0}
+
+        if radar:
+            radares = [radar]
+        else:
+            with os.scandir(self.base_dir) as entradas:
+                radares = [e.name for e in entradas if e.is_dir()]
+
+        with self._lock, self._conectar() as conn:
+            for radar_nombre in radares:
+                radar_path = self.base_dir / radar_nombre
+                conocidos = dict(conn.execute(
+                    "SELECT ruta, mtime_ns FROM directorios WHERE radar = ?", (radar_nombre,)
+                ))
+
+                presentes = set()
+                if radar_path.is_dir():
+                    with os.scandir(radar_path) as dirs_fecha:
+                        for dir_fecha in dirs_fecha:
+                            if not dir_fecha.is_dir():
+                                continue
+                            presentes.add(dir_fecha.path)
+                            if conocidos.get(dir_fecha.path) == dir_fecha.stat().st_mtime_ns:
+                                continue
+
+                            nuevos, eliminados = self._escanear_fecha(conn, radar_nombre, dir_fecha)
+                            resumen['directorios_revisados'] += 1
+                            resumen['nuevos'] += nuevos
+                            resumen['eliminados'] += eliminados
+
+                # Directorios de fecha borrados por completo
+                for ruta in set(conocidos) - presentes:
+                    cursor = conn.execute(
+                        "DELETE FROM archivos WHERE radar = ? AND fecha_directorio = ?",
+                        (radar_nombre, os.path.basename(ruta))
+                    )
+                    conn.execute("DELETE FROM directorios WHERE ruta = ?", (ruta,))
+                    resumen['eliminados'] += cursor.rowcount
+
+            if resumen['nuevos'] or resumen['eliminados']:
+                self._incrementar_version(conn)
+            if not radar:
+                # registrar() agrega archivos sueltos sin recorrer el disco: hasta que haya
+                # una reconciliación completa el índice puede omitir el archivo histórico
+                conn.execute("INSERT OR IGNORE INTO meta (clave, valor) VALUES ('reconciliado', 1)")
+
+        logger.info(f"📋 Inventario reconciliado: {resumen['directorios_revisados']} directorios "
+                    f"revisados, {resumen['nuevos']} nuevos, {resumen['eliminados']} eliminados")
+        return resumen
+
+    def como_dataframe(self, radar=None):
+        """Inventario como DataFrame (mismas columnas que inventario_radares.csv)"""
+        import pandas as pd
+
+        consulta = ("SELECT radar, fecha_directorio, archivo, ruta, tamaño_bytes, mtime "
+                    "FROM archivos")
+        parametros = ()
+        if radar:
+            consulta += " WHERE radar = ?"
+            parametros = (radar,)
+        consulta += " ORDER BY radar, fecha_directorio, archivo"
+
+        with self._conectar() as conn:
+            filas = conn.execute(consulta, parametros).fetchall()
+
+        if not filas:
+            return pd.DataFrame(columns=COLUMNAS)
+
+        df = pd.DataFrame(filas, columns=['radar', 'fecha_directorio', 'archivo', 'ruta_completa',
+                                          'tamaño_bytes', 'mtime'])
+        df['ubicacion'] = df['radar'].map(lambda r: self.info_radares.get(r, {}).get('ubicacion', 'N/A'))
+        df['distancia_medellin_km'] = df['radar'].map(
+            lambda r: self.info_radares.get(r, {}).get('distancia_medellin_km', 0))
+        df['tamaño_mb'] = df['tamaño_bytes'] / (1024 * 1024)
+        df['fecha_modificacion'] = pd.to_datetime(df['mtime'], unit='s')
+        return df[COLUMNAS]
+
+    def resumen_por_radar(self):
+        """Número de archivos y MB por radar calculados en SQLite"""
+        with self._conectar() as conn:
+            return {
+                radar: {'archivos': n, 'tamaño_mb': total / (1024 * 1024)}
+                for radar, n, total in conn.execute(
+                    "SELECT radar, COUNT(*), SUM(tamaño_bytes) FROM archivos GROUP BY radar ORDER BY radar"
+                )
+            }
+
+    def exportar_csv(self, ruta=None):
+        """Exporta el inventario completo a CSV (compatibilidad con herramientas externas)"""
+        ruta = Path(ruta or self.base_dir / 'inventario_radares.csv')
+        df = self.como_dataframe()
+        df.to_csv(ruta, index=False)
+        logger.info(f"💾 Inventario exportado a: {ruta}")
+        return ruta
@@ -0,0 +1,184 @@
+"""
+Lectura parcial de volúmenes IRIS/Sigmet en S3 mediante HTTP Range
+Descarga solo los encabezados o los registros de los sweeps solicitados
+"""
+
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Los archivos IRIS RAW se organizan en registros de tamaño fijo:
+# registro 0 = product_hdr, registro 1 = ingest_header, luego datos
+TAMAÑO_REGISTRO = 6144
+REGISTROS_ENCABEZADO = 2
+
+# Desplazamientos dentro del registro 1 (ingest_header, little-endian)
+OFFSET_SWEEPS_COMPLETOS = 12 + 82
+OFFSET_TAMAÑO_TOTAL = 12 + 84
+OFFSET_INICIO_VOLUMEN = 12 + 88
+OFFSET_VERSION_IRIS = 12 + 124
+OFFSET_SITIO_HARDWARE = 12 + 132
+OFFSET_NOMBRE_SITIO = 12 + 150
+
+MAGIA_GZIP = b'\x1f\x8b'
+
+
+def _texto(datos, inicio, longitud):
+    return datos[inicio:inicio + longitud].split(b'\x00')[0].decode('ascii', errors='ignore').strip()
+
+
+def parsear_encabezado(datos):
+    """Metadatos básicos de los dos registros de encabezado de un volumen IRIS"""
+    ingest = datos[TAMAÑO_REGISTRO:2 * TAMAÑO_REGISTRO]
+    if len(ingest) < OFFSET_NOMBRE_SITIO + 16:
+        raise ValueError("Encabezado IRIS incompleto")
+
+    sweeps, = struct.unpack_from('<h', ingest, OFFSET_SWEEPS_COMPLETOS)
+    tamaño_total, = struct.unpack_from('<i', ingest, OFFSET_TAMAÑO_TOTAL)
+    segundos, milisegundos, año, mes, dia = struct.unpack_from('<iHhhh', ingest, OFFSET_INICIO_VOLUMEN)
+
+    try:
+        inicio = datetime(año, mes, dia) + timedelta(seconds=segundos, milliseconds=milisegundos & 0x3FF)
+    except ValueError:
+        inicio = None
+
+    return {
+        'sweeps': int(sweeps),
+        'tamaño_total': int(tamaño_total),
+        'inicio_volumen': inicio,
+        'version_iris': _texto(ingest, OFFSET_VERSION_IRIS, 8),
+        'sitio_hardware': _texto(ingest, OFFSET_SITIO_HARDWARE, 16),
+        'sitio': _texto(ingest, OFFSET_NOMBRE_SITIO, 16),
+    }
+
+
+class LectorParcialS3:
+    """Lee encabezados y sweeps individuales de volúmenes IRIS sin descargarlos completos"""
+
+    def __init__(self, s3_client, bucket_name):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+
+    def _rango(self, key, inicio, fin):
+        """Bytes [inicio, fin] (inclusivo) de un objeto"""
+        respuesta = self.s3_client.get_object(Bucket=self.bucket_name, Key=key,
+                                              Range=f"bytes={inicio}-{fin}")
+        return respuesta['Body'].read()
+
+    def _tamaño(self, key):
+        return self.s3_client.head_object(Bucket=self.bucket_name, Key=key)['ContentLength']
+
+    def leer_encabezado(self, key):
+        """
+        Metadatos de un volumen leyendo solo sus dos registros de encabezado
+
+        Returns:
+            dict con sweeps, inicio del volumen y sitio; 'comprimido' si el objeto es gzip
+        """
+        datos = self._rango(key, 0, REGISTROS_ENCABEZADO * TAMAÑO_REGISTRO - 1)
+        if datos[:2] == MAGIA_GZIP:
+            return {'key': key, 'comprimido': True}
+
+        encabezado = parsear_encabezado(datos)
+        encabezado.update({'key': key, 'comprimido': False})
+        return encabezado
+
+    def escanear_encabezados(self, keys, max_hilos=8):
+        """Lee en paralelo los encabezados de muchos volúmenes remotos"""
+        def leer(key):
+            try:
+                return self.leer_encabezado(key)
+            except Exception as e:
+                logger.warning(f"No se pudo leer el encabezado de {key}: {e}")
+                return {'key': key, 'error': str(e)}
+
+        with ThreadPoolExecutor(max_workers=max_hilos) as executor:
+            return list(executor.map(leer, keys))
+
+    def localizar_sweeps(self, key, sweeps, tamaño=None):
+        """
+        Rangos de bytes de los sweeps solicitados (índices desde 0)
+
+        Cada registro de datos empieza con raw_prod_bhdr, cuyo segundo campo es
+        el número de sweep (desde 1). Los registros están ordenados por sweep,
+        así que los límites se hallan por búsqueda binaria leyendo 4 bytes por
+        registro consultado.
+
+        Returns:
+            dict sweep -> (byte_inicio, byte_fin_exclusivo)
+        """
+        tamaño = tamaño or self._tamaño(key)
+        num_registros = tamaño // TAMAÑO_REGISTRO
+        sondeos = {}
+
+        def sweep_de(registro):
+            if registro not in sondeos:
+                bhdr = self._rango(key, registro * TAMAÑO_REGISTRO, registro * TAMAÑO_REGISTRO + 3)
+                sondeos[registro] = struct.unpack('<hh', bhdr)[1]
+            return sondeos[registro]
+
+        def primer_registro(numero_sweep):
+            bajo, alto = REGISTROS_ENCABEZADO, num_registros
+            while bajo < alto:
+                medio = (bajo + alto) // 2
+                if sweep_de(medio) < numero_sweep:
+                    bajo = medio + 1
+                else:
+                    alto = medio
+            return bajo
+
+        rangos = {}
+        for sweep in sorted(set(sweeps)):
+            inicio = primer_registro(sweep + 1)
+            fin = primer_registro(sweep + 2)
+            if fin > inicio:
+                rangos[sweep] = (inicio * TAMAÑO_REGISTRO, fin * TAMAÑO_REGISTRO)
+
+        logger.debug(f"{key}: {len(sondeos)} sondeos para localizar sweeps {sorted(rangos)}")
+        return rangos
+
+    def leer_sweeps(self, key, sweeps=(0,), tamaño=None):
+        """
+        Volumen IRIS reducido con los encabezados y solo los sweeps solicitados
+
+        El número de sweeps completos del ingest_header se ajusta para que el
+        lector de PyART (pyart.io.read_sigmet) acepte el volumen truncado; los
+        sweeps conservan su orden. Los volúmenes comprimidos no admiten lectura
+        por rangos y se descargan completos.
+
+        Returns:
+            (bytes del volumen, bytes transferidos)
+        """
+        encabezado = self._rango(key, 0, REGISTROS_ENCABEZADO * TAMAÑO_REGISTRO - 1)
+
+        if encabezado[:2] == MAGIA_GZIP:
+            logger.info(f"{key} está comprimido; se descarga completo")
+            datos = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)['Body'].read()
+            return datos, len(datos)
+
+        tamaño = tamaño or self._tamaño(key)
+        rangos = self.localizar_sweeps(key, sweeps, tamaño)
+        if not rangos:
+            raise ValueError(f"Sweeps {list(sweeps)} no encontrados en {key}")
+
+        # Unir rangos contiguos para minimizar peticiones
+        unidos = []
+        for inicio, fin in sorted(rangos.values()):
+            if unidos and unidos[-1][1] == inicio:
+                unidos[-1][1] = fin
+            else:
+                unidos.append([inicio, fin])
+
+        partes = [bytearray(encabezado)]
+        for inicio, fin in unidos:
+            partes.append(self._rango(key, inicio, fin - 1))
+
+        struct.pack_into('<h', partes[0], TAMAÑO_REGISTRO + OFFSET_SWEEPS_COMPLETOS, len(rangos))
+        datos = b''.join(bytes(p) for p in partes)
+
+        logger.info(f"📦 {key}: {len(rangos)} sweeps, {len(datos) / 1024:.0f} KB de "
+                    f"{tamaño / 1024:.0f} KB ({100.0 * len(datos) / tamaño:.0f}%)")
+        return datos, len(datos)
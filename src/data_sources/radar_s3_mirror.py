@@ -0,0 +1,302 @@
+"""
+Espejo local del listado de llaves del bucket s3-radaresideam
+Guarda (radar, timestamp, tamaño, ETag) en SQLite y se mantiene al día listando
+solo las llaves posteriores a la última sincronización
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from datetime import datetime, date, timedelta
+import logging
+
+from src.processors.radar_volumes import parsear_timestamp
+
+logger = logging.getLogger(__name__)
+
+PREFIJO_DATOS = 'l2_data/'
+
+# Los volúmenes de un día siguen llegando al bucket hasta ~24 h después
+RETRASO_DATOS = timedelta(days=1)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS objetos (
+    key TEXT PRIMARY KEY,
+    radar TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    timestamp TEXT,
+    tamaño INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_objetos_radar ON objetos (radar, fecha, timestamp);
+CREATE TABLE IF NOT EXISTS sincronizacion (
+    clave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL
+);
+"""
+
+
+def _fecha_de_key(key):
+    """Fecha (date) y radar de una llave l2_data/YYYY/MM/DD/Radar/...; None si no coincide"""
+    partes = key.split('/')
+    if len(partes) < 6:
+        return None, None
+    try:
+        return date(int(partes[1]), int(partes[2]), int(partes[3])), partes[4]
+    except ValueError:
+        return None, None
+
+
+def _rango_horario(inicio, fin):
+    """Extiende fechas (date) a datetime: inicio al comienzo del día y fin al final"""
+    if not isinstance(inicio, datetime):
+        inicio = datetime.combine(inicio, datetime.min.time())
+    if not isinstance(fin, datetime):
+        fin = datetime.combine(fin, datetime.max.time())
+    return inicio, fin
+
+
+class EspejoS3Radar:
+    """Réplica SQLite del listado de objetos de radar en S3"""
+
+    def __init__(self, s3_client, bucket_name, base_dir="data/Radar_IDEAM"):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.base_dir / 'espejo_s3.sqlite'
+        self._lock = threading.Lock()
+
+        with self._conectar() as conn:
+            conn.executescript(ESQUEMA)
+
+    @contextmanager
+    def _conectar(self):
+        """Conexión por operación (segura entre hilos); confirma al salir sin error"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _estado(self, conn, clave):
+        fila = conn.execute("SELECT valor FROM sincronizacion WHERE clave = ?", (clave,)).fetchone()
+        return fila[0] if fila else None
+
+    def _guardar_estado(self, conn, clave, valor):
+        conn.execute("INSERT OR REPLACE INTO sincronizacion VALUES (?, ?)", (clave, valor))
+
+    def cobertura(self):
+        """
+        Rango de fechas (desde, hasta) cuyo listado en el espejo está completo
+
+        Un día se considera completo si se sincronizó después de que terminara
+        el retraso de publicación de sus datos; (None, None) si nunca se sincronizó.
+        """
+        with self._conectar() as conn:
+            desde = self._estado(conn, 'desde')
+            actualizado = self._estado(conn, 'actualizado')
+            listado_hasta = self._estado(conn, 'listado_hasta')
+        if not desde or not actualizado or not listado_hasta:
+            return None, None
+
+        completo = (datetime.fromisoformat(actualizado) - RETRASO_DATOS).date() - timedelta(days=1)
+        return date.fromisoformat(desde), min(completo, date.fromisoformat(listado_hasta))
+
+    def cubre(self, fecha):
+        """True si el espejo puede responder por esa fecha sin consultar S3"""
+        desde, hasta = self.cobertura()
+        if desde is None:
+            return False
+        dia = fecha.date() if isinstance(fecha, datetime) else fecha
+        return desde <= dia <= hasta
+
+    def sincronizar(self, desde=None, hasta=None):
+        """
+        Llena o actualiza el espejo
+
+        La primera vez lista desde `desde` (por defecto hace un año); después
+        solo lista las llaves a partir del último día sincronizado, que se
+        vuelve a listar porque pudo quedar incompleto. Las llaves de S3 están
+        ordenadas por fecha, así que basta con StartAfter.
+
+        Las llaves del espejo dentro del tramo listado que ya no aparecen en S3
+        (borradas en origen) se eliminan. Los borrados en días anteriores al
+        tramo solo se detectan volviendo a listar desde una fecha más antigua.
+
+        Returns:
+            dict con objetos nuevos, objetos eliminados y páginas listadas
+        """
+        if isinstance(desde, datetime):
+            desde = desde.date()
+        if isinstance(hasta, datetime):
+            hasta = hasta.date()
+
+        with self._conectar() as conn:
+            desde_previo = self._estado(conn, 'desde')
+            ultima = self._estado(conn, 'ultima_fecha')
+
+        if ultima and (desde is None or desde >= date.fromisoformat(desde_previo)):
+            inicio = date.fromisoformat(ultima)
+            desde_registro = date.fromisoformat(desde_previo)
+        else:
+            inicio = desde or (date.today() - timedelta(days=365))
+            desde_registro = inicio
+
+        # 'l2_data/YYYY/MM/DD' ordena justo antes de todas las llaves de ese día
+        start_after = f"{PREFIJO_DATOS}{inicio:%Y/%m/%d}"
+        logger.info(f"🔄 Sincronizando espejo S3 desde {inicio}")
+
+        paginador = self.s3_client.get_paginator('list_objects_v2')
+        resumen = {'objetos': 0, 'eliminados': 0, 'paginas': 0}
+        ultima_fecha = inicio
+        # Última llave cubierta por el listado: lo que el espejo tenga entre ella y la
+        # siguiente página y S3 no haya devuelto fue borrado en origen
+        cubierto_hasta = start_after
+        terminado = False
+
+        for pagina in paginador.paginate(Bucket=self.bucket_name, Prefix=PREFIJO_DATOS,
+                                         StartAfter=start_after):
+            filas = []
+            desde_key = cubierto_hasta
+            for obj in pagina.get('Contents', []):
+                dia, radar = _fecha_de_key(obj['Key'])
+                if dia is not None and hasta and dia > hasta:
+                    terminado = True
+                    break
+                cubierto_hasta = obj['Key']
+                if dia is None:
+                    continue
+
+                timestamp = parsear_timestamp(obj['Key'])
+                filas.append((
+                    obj['Key'], radar, dia.isoformat(),
+                    timestamp.isoformat() if timestamp else None,
+                    obj['Size'], obj.get('ETag', '').strip('"'),
+                    obj['LastModified'].isoformat() if obj.get('LastModified') else None
+                ))
+                ultima_fecha = max(ultima_fecha, dia)
+
+            # Se guarda el avance por página para poder reanudar una sincronización interrumpida
+            with self._lock, self._conectar() as conn:
+                conn.executemany("INSERT OR REPLACE INTO objetos VALUES (?, ?, ?, ?, ?, ?, ?)", filas)
+                resumen['eliminados'] += self._eliminar_ausentes(conn, desde_key, cubierto_hasta,
+                                                                 {fila[0] for fila in filas})
+                self._guardar_estado(conn, 'desde', desde_registro.isoformat())
+                self._guardar_estado(conn, 'ultima_fecha', ultima_fecha.isoformat())
+
+            resumen['objetos'] += len(filas)
+            resumen['paginas'] += 1
+            if terminado:
+                break
+
+        # Hasta dónde quedó listado el bucket (el último día puede seguir creciendo)
+        with self._lock, self._conectar() as conn:
+            if not terminado:
+                # El listado llegó al final del prefijo: nada posterior sigue en S3
+                resumen['eliminados'] += self._eliminar_ausentes(conn, cubierto_hasta, None, set())
+            listado_hasta = hasta if hasta and hasta < date.today() else date.today()
+            self._guardar_estado(conn, 'listado_hasta', listado_hasta.isoformat())
+            self._guardar_estado(conn, 'actualizado', datetime.now().isoformat())
+
+        logger.info(f"✅ Espejo S3 sincronizado: {resumen['objetos']} objetos en "
+                     f"{resumen['paginas']} páginas (hasta {ultima_fecha}), "
+                     f"{resumen['eliminados']} eliminados en origen")
+        return resumen
+
+    def _eliminar_ausentes(self, conn, despues_de, hasta_key, vistas):
+        """Borra las llaves del tramo (despues_de, hasta_key] que S3 no devolvió; retorna cuántas"""
+        if hasta_key is None:
+            filas = conn.execute("SELECT key FROM objetos WHERE key > ?", (despues_de,))
+        else:
+            filas = conn.execute("SELECT key FROM objetos WHERE key > ? AND key <= ?",
+                                 (despues_de, hasta_key))
+        ausentes = [(key,) for (key,) in filas.fetchall() if key not in vistas]
+        conn.executemany("DELETE FROM objetos WHERE key = ?", ausentes)
+        return len(ausentes)
+
+    def archivos(self, radar, fecha, limite=None):
+        """Objetos de un radar en una fecha (mismo formato que listar_archivos_disponibles)"""
+        dia = fecha.date() if isinstance(fecha, datetime) else fecha
+        consulta = ("SELECT key, tamaño, last_modified, etag FROM objetos "
+                    "WHERE radar = ? AND fecha = ? ORDER BY key")
+        parametros = [radar, dia.isoformat()]
+        if limite:
+            consulta += " LIMIT ?"
+            parametros.append(limite)
+
+        with self._conectar() as conn:
+            filas = conn.execute(consulta, parametros).fetchall()
+
+        return [{
+            'key': key,
+            'size': tamaño,
+            'last_modified': datetime.fromisoformat(last_modified) if last_modified else None,
+            'etag': etag,
+            'filename': key.rsplit('/', 1)[-1]
+        } for key, tamaño, last_modified, etag in filas]
+
+    def objeto(self, key):
+        """Tamaño y ETag de una llave; None si no está en el espejo"""
+        with self._conectar() as conn:
+            fila = conn.execute("SELECT tamaño, etag FROM objetos WHERE key = ?", (key,)).fetchone()
+        return {'size': fila[0], 'etag': fila[1]} if fila else None
+
+    def disponibilidad(self, radar, inicio, fin):
+        """Número de volúmenes y MB por día entre dos fechas"""
+        inicio = inicio.date() if isinstance(inicio, datetime) else inicio
+        fin = fin.date() if isinstance(fin, datetime) else fin
+
+        with self._conectar() as conn:
+            filas = conn.execute(
+                "SELECT fecha, COUNT(*), SUM(tamaño) FROM objetos "
+                "WHERE radar = ? AND fecha BETWEEN ? AND ? GROUP BY fecha ORDER BY fecha",
+                (radar, inicio.isoformat(), fin.isoformat())
+            ).fetchall()
+
+        return {date.fromisoformat(f): {'archivos': n, 'tamaño_mb': total / (1024 * 1024)}
+                for f, n, total in filas}
+
+    def huecos(self, radar, inicio, fin, max_intervalo=timedelta(minutes=15)):
+        """
+        Reporte de huecos en la serie de volúmenes de un radar
+
+        Fechas sin hora se toman como el día completo (00:00 de inicio a 23:59:59 de fin).
+
+        Returns:
+            Lista de tuplas (desde, hasta, duración) con separaciones mayores a max_intervalo
+        """
+        inicio, fin = _rango_horario(inicio, fin)
+        with self._conectar() as conn:
+            filas = conn.execute(
+                "SELECT timestamp FROM objetos WHERE radar = ? AND timestamp BETWEEN ? AND ? "
+                "ORDER BY timestamp",
+                (radar, inicio.isoformat(), fin.isoformat())
+            ).fetchall()
+
+        tiempos = [inicio] + [datetime.fromisoformat(t) for (t,) in filas] + [fin]
+        return [(a, b, b - a) for a, b in zip(tiempos, tiempos[1:]) if b - a > max_intervalo]
+
+    def planificar_descarga(self, radar, inicio, fin, descargados=()):
+        """
+        Objetos del rango que faltan localmente
+
+        Args:
+            descargados: nombres de archivo ya presentes (ej. del InventarioRadar)
+        """
+        descargados = set(descargados)
+        inicio, fin = _rango_horario(inicio, fin)
+        with self._conectar() as conn:
+            filas = conn.execute(
+                "SELECT key, tamaño, etag FROM objetos WHERE radar = ? AND timestamp BETWEEN ? AND ? "
+                "ORDER BY timestamp",
+                (radar, inicio.isoformat(), fin.isoformat())
+            ).fetchall()
+
+        return [{'key': key, 'size': tamaño, 'etag': etag, 'filename': key.rsplit('/', 1)[-1]}
+                for key, tamaño, etag in filas if key.rsplit('/', 1)[-1] not in descargados]
@@ -0,0 +1,104 @@
+"""
+Reporte de tiempos de importación de los módulos del proyecto
+Permite vigilar el arranque del CLI y de las ejecuciones puntuales (cron)
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ_PROYECTO = Path(__file__).resolve().parent.parent
+
+# Módulos medidos por defecto en el reporte de importación
+MODULOS_REPORTE = [
+    'main',
+    'src.data_sources.open_meteo',
+    'src.data_sources.openweather',
+    'src.data_sources.ideam_radar_downloader',
+    'src.processors.radar_processor',
+    'src.processors.radar_advanced_processor',
+]
+
+
+def _tiempos_importacion(codigo, python=sys.executable):
+    """Ejecuta código con -X importtime y retorna (proceso, {módulo: acumulado_us})"""
+    proc = subprocess.run(
+        [python, '-X', 'importtime', '-c', codigo],
+        capture_output=True, text=True, cwd=RAIZ_PROYECTO
+    )
+
+    tiempos = {}
+    for linea in proc.stderr.splitlines():
+        if not linea.startswith('import time:') or '|' not in linea:
+            continue
+        partes = linea[len('import time:'):].split('|')
+        if len(partes) != 3 or not partes[1].strip().isdigit():
+            continue
+        tiempos[partes[2].strip()] = int(partes[1])
+
+    return proc, tiempos
+
+
+def medir_importacion(modulo, python=sys.executable):
+    """
+    Mide en un proceso limpio el costo de importar un módulo (python -X importtime)
+
+    Los módulos que el intérprete importa al arrancar no se atribuyen al módulo.
+
+    Returns:
+        dict con el total en ms y los paquetes de primer nivel más costosos
+    """
+    _, arranque = _tiempos_importacion('pass', python)
+    proc, tiempos = _tiempos_importacion(f'import {modulo}', python)
+
+    por_paquete = {}
+    for nombre, acumulado in tiempos.items():
+        if nombre in arranque:
+            continue
+        paquete = nombre.split('.')[0]
+        por_paquete[paquete] = max(por_paquete.get(paquete, 0), acumulado)
+
+    propio = modulo.split('.')[0]
+    pesados = sorted(por_paquete.items(), key=lambda p: p[1], reverse=True)
+    return {
+        'modulo': modulo,
+        'ok': proc.returncode == 0,
+        'total_ms': tiempos.get(modulo, 0) / 1000.0,
+        'mas_pesados': [(p, us / 1000.0) for p, us in pesados if p != propio][:5],
+        'error': proc.stderr.strip().splitlines()[-1] if proc.returncode != 0 and proc.stderr else None
+    }
+
+
+def reporte_importacion(modulos=None, objetivo_ms=None):
+    """
+    Imprime el tiempo de importación de cada módulo y los paquetes más costosos
+
+    Returns:
+        True si todos los módulos se importan por debajo de objetivo_ms
+    """
+    modulos = modulos or MODULOS_REPORTE
+    cumple = True
+
+    print("\n" + "=" * 70)
+    print("⏱️  REPORTE DE TIEMPOS DE IMPORTACIÓN")
+    print("=" * 70)
+
+    for modulo in modulos:
+        resultado = medir_importacion(modulo)
+
+        if not resultado['ok']:
+            print(f"\n❌ {modulo}: no se pudo importar ({resultado['error']})")
+            cumple = False
+            continue
+
+        excede = objetivo_ms is not None and resultado['total_ms'] > objetivo_ms
+        cumple = cumple and not excede
+        marca = '⚠️ ' if excede else '✅'
+        print(f"\n{marca} {modulo}: {resultado['total_ms']:.0f} ms")
+        for paquete, ms in resultado['mas_pesados']:
+            print(f"     {paquete:<25} {ms:>8.0f} ms")
+
+    if objetivo_ms is not None:
+        print(f"\nObjetivo: {objetivo_ms:.0f} ms → {'cumple' if cumple else 'NO cumple'}")
+
+    return cumple
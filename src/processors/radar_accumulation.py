@@ -0,0 +1,271 @@
+"""
+Acumulado de precipitación (QPE) en un solo recorrido sobre volúmenes de radar
+Convierte cada volumen a tasa de lluvia sobre una rejilla fija e integra en el tiempo
+"""
+
+import numpy as np
+from pathlib import Path
+from datetime import datetime, timedelta
+import logging
+
+from src.processors.radar_geometry import RejillaCartesiana, tabla_para_sweep
+from src.processors.radar_volumes import listar_volumenes, leer_volumen, datos_sweep
+
+logger = logging.getLogger(__name__)
+
+
+def reflectividad_a_lluvia(dbz, a=200.0, b=1.6, dbz_min=5.0, dbz_max=55.0):
+    """
+    Tasa de lluvia (mm/h) a partir de reflectividad usando Z = aR^b
+
+    Valores por debajo de dbz_min se consideran sin lluvia y los superiores a
+    dbz_max se recortan para limitar la contaminación por granizo.
+    """
+    dbz = np.asarray(dbz, dtype=np.float32)
+    z_lineal = 10.0 ** (np.minimum(dbz, dbz_max) / 10.0)
+    tasa = (z_lineal / a) ** (1.0 / b)
+    return np.where(dbz >= dbz_min, tasa, 0.0).astype(np.float32)
+
+
+class AcumuladorPrecipitacion:
+    """Integra tasas de lluvia en ventanas horarias, diarias o personalizadas"""
+
+    VENTANAS_DEFECTO = {
+        'horario': timedelta(hours=1),
+        'diario': timedelta(days=1)
+    }
+
+    def __init__(self, radar='Barrancabermeja', data_dir="data/Radar_IDEAM",
+                 alcance_m=240000, resolucion_m=1000, campo='reflectivity', sweep=0,
+                 zr_a=200.0, zr_b=1.6, max_hueco=timedelta(minutes=15),
+                 ventanas=None, origen=datetime(1970, 1, 1)):
+        """
+        Args:
+            radar: nombre del radar IDEAM
+            data_dir: directorio base de datos descargados
+            alcance_m, resolucion_m: definición de la rejilla fija
+            campo, sweep: campo de reflectividad y sweep a usar
+            zr_a, zr_b: coeficientes de la relación Z-R
+            max_hueco: separación máxima entre volúmenes que se interpola;
+                en huecos mayores cada volumen cubre solo max_hueco / 2
+            ventanas: dict nombre -> timedelta (por defecto horario y diario)
+            origen: instante de alineación de las ventanas (ej. 05:00 UTC
+                para días en hora local de Colombia)
+        """
+        self.radar = radar
+        self.data_dir = Path(data_dir)
+        self.rejilla = RejillaCartesiana(alcance_m, resolucion_m)
+        self.campo = campo
+        self.sweep = sweep
+        self.zr_a = zr_a
+        self.zr_b = zr_b
+        self.max_hueco = max_hueco
+        self.ventanas = dict(ventanas or self.VENTANAS_DEFECTO)
+        self.origen = origen
+
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Descarta el estado acumulado"""
+        self._t_prev = None
+        self._tasa_prev = None
+        self._cobertura = None
+        self._abiertas = {}   # nombre -> estado de la ventana en curso
+
+    # ------------------------------------------------------------------
+    # Conversión de volúmenes
+    # ------------------------------------------------------------------
+
+    def tasa_desde_volumen(self, radar_obj):
+        """Convierte un volumen PyART en tasa de lluvia (mm/h) sobre la rejilla"""
+        sweep = datos_sweep(radar_obj, self.campo, self.sweep)
+        if sweep is None:
+            logger.warning(f"Campo {self.campo} no disponible en el volumen")
+            return None
+
+        datos, azimuts = sweep
+        tabla = tabla_para_sweep(radar_obj, self.sweep, self.rejilla)
+
+        if self._cobertura is None:
+            self._cobertura = tabla.validos
+
+        dbz = tabla.aplicar(datos, azimuts, relleno=np.nan, enmascarado=-np.inf)
+        tasa = reflectividad_a_lluvia(dbz, self.zr_a, self.zr_b)
+        return np.nan_to_num(tasa, nan=0.0)
+
+    # ------------------------------------------------------------------
+    # Integración temporal
+    # ------------------------------------------------------------------
+
+    def _limites_ventana(self, nombre, t):
+        duracion = self.ventanas[nombre]
+        n = (t - self.origen) // duracion
+        inicio = self.origen + n * duracion
+        return inicio, inicio + duracion
+
+    def _abrir(self, nombre, t):
+        inicio, fin = self._limites_ventana(nombre, t)
+        self._abiertas[nombre] = {
+            'inicio': inicio,
+            'fin': fin,
+            'suma': np.zeros(self.rejilla.forma, dtype=np.float32),
+            'segundos_cubiertos': 0.0,
+            'num_volumenes': 0
+        }
+
+    def _cerrar(self, nombre, completa=True):
+        estado = self._abiertas.pop(nombre)
+        acumulado = estado['suma']
+        if self._cobertura is not None:
+            acumulado = np.where(self._cobertura, acumulado, np.nan).astype(np.float32)
+
+        duracion = (estado['fin'] - estado['inicio']).total_seconds()
+        return {
+            'radar': self.radar,
+            'ventana': nombre,
+            'inicio': estado['inicio'],
+            'fin': estado['fin'],
+            'acumulado_mm': acumulado,
+            'cobertura': estado['segundos_cubiertos'] / duracion,
+            'num_volumenes': estado['num_volumenes'],
+            'completa': completa
+        }
+
+    def _integrar(self, t0, t1, r0=None, r1=None):
+        """
+        Integra el tramo [t0, t1] con tasa lineal entre r0 y r1
+
+        Con r0 = None el tramo es un hueco: solo se avanzan (y cierran) las
+        ventanas. Retorna las ventanas que se cerraron.
+        """
+        cerradas = []
+        duracion_tramo = (t1 - t0).total_seconds()
+
+        for nombre in self.ventanas:
+            a = t0
+            while a < t1:
+                if nombre not in self._abiertas:
+                    self._abrir(nombre, a)
+                estado = self._abiertas[nombre]
+                b = min(t1, estado['fin'])
+
+                if r0 is not None:
+                    fa = (a - t0).total_seconds() / duracion_tramo
+                    fb = (b - t0).total_seconds() / duracion_tramo
+                    ra = r0 + (r1 - r0) * fa
+                    rb = r0 + (r1 - r0) * fb
+                    horas = (b - a).total_seconds() / 3600.0
+                    estado['suma'] += (ra + rb) * (0.5 * horas)
+                    estado['segundos_cubiertos'] += (b - a).total_seconds()
+
+                if b >= estado['fin']:
+                    cerradas.append(self._cerrar(nombre))
+                a = b
+
+        return cerradas
+
+    def agregar(self, timestamp, tasa):
+        """
+        Agrega una tasa de lluvia (mm/h) observada en timestamp
+
+        Los volúmenes deben llegar en orden temporal. Retorna la lista de
+        ventanas que quedaron completas con este volumen.
+        """
+        cerradas = []
+
+        if self._t_prev is not None:
+            if timestamp <= self._t_prev:
+                logger.warning(f"Volumen fuera de orden o duplicado ignorado: {timestamp}")
+                return cerradas
+
+            hueco = timestamp - self._t_prev
+            if hueco <= self.max_hueco:
+                cerradas += self._integrar(self._t_prev, timestamp, self._tasa_prev, tasa)
+            else:
+                medio = self.max_hueco / 2
+                logger.info(f"Hueco de {hueco} entre volúmenes ({self._t_prev} - {timestamp})")
+                cerradas += self._integrar(self._t_prev, self._t_prev + medio,
+                                           self._tasa_prev, self._tasa_prev)
+                cerradas += self._integrar(self._t_prev + medio, timestamp - medio)
+                cerradas += self._integrar(timestamp - medio, timestamp, tasa, tasa)
+
+        for nombre in self.ventanas:
+            if nombre not in self._abiertas:
+                self._abrir(nombre, timestamp)
+            self._abiertas[nombre]['num_volumenes'] += 1
+
+        self._t_prev = timestamp
+        self._tasa_prev = tasa
+        return cerradas
+
+    def agregar_volumen(self, radar_obj, timestamp):
+        """Convierte un volumen PyART y lo agrega a la integración"""
+        tasa = self.tasa_desde_volumen(radar_obj)
+        if tasa is None:
+            return []
+        return self.agregar(timestamp, tasa)
+
+    def finalizar(self):
+        """Cierra las ventanas en curso (marcadas como incompletas)"""
+        cerradas = [self._cerrar(nombre, completa=False) for nombre in list(self._abiertas)]
+        self._t_prev = None
+        self._tasa_prev = None
+        return cerradas
+
+    def procesar(self, inicio=None, fin=None):
+        """
+        Recorre los volúmenes descargados del radar en un solo paso
+
+        Es un generador: emite cada ventana en cuanto se completa, de modo que
+        en memoria solo permanecen los acumuladores en curso.
+        """
+        volumenes = listar_volumenes(self.radar, self.data_dir, inicio, fin)
+        logger.info(f"📡 Acumulando {len(volumenes)} volúmenes de {self.radar}")
+
+        for timestamp, ruta in volumenes:
+            radar_obj = leer_volumen(ruta)
+            if radar_obj is None:
+                continue
+            for resultado in self.agregar_volumen(radar_obj, timestamp):
+                yield resultado
+
+        for resultado in self.finalizar():
+            yield resultado
+
+    def guardar_resultado(self, resultado, output_dir="productos_radar/qpe"):
+        """Guarda un acumulado en formato .npz comprimido"""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        nombre = (f"qpe_{resultado['radar'].lower()}_{resultado['ventana']}_"
+                  f"{resultado['inicio']:%Y%m%d%H%M}.npz")
+        ruta = output_dir / nombre
+
+        np.savez_compressed(
+            ruta,
+            acumulado_mm=resultado['acumulado_mm'],
+            x=self.rejilla.x1d,
+            y=self.rejilla.y1d,
+            inicio=str(resultado['inicio']),
+            fin=str(resultado['fin']),
+            cobertura=resultado['cobertura'],
+            num_volumenes=resultado['num_volumenes']
+        )
+        logger.info(f"💾 Acumulado guardado en: {ruta}")
+        return ruta
+
+
+def main():
+    """Acumulado diario del radar Barrancabermeja sobre los datos descargados"""
+    print("🌧️ ACUMULADO DE PRECIPITACIÓN (QPE) - RADAR BARRANCABERMEJA 🌧️")
+
+    acumulador = AcumuladorPrecipitacion('Barrancabermeja', ventanas={'diario': timedelta(days=1)})
+
+    for resultado in acumulador.procesar():
+        ruta = acumulador.guardar_resultado(resultado)
+        print(f"   {resultado['inicio']:%Y-%m-%d}: máx {np.nanmax(resultado['acumulado_mm']):.1f} mm, "
+              f"cobertura {resultado['cobertura']:.0%} → {ruta}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,28 +4,26 @@ Requiere: pip install arm-pyart
 """
 
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 from pathlib import Path
 from datetime import datetime
+import importlib.util
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Configuración de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# PyART y matplotlib se importan al primer uso; aquí solo se verifica
+# que PyART esté instalado sin importarlo
+PYART_AVAILABLE = importlib.util.find_spec('pyart') is not None
 
-# Intentar importar PyART
-try:
-    import pyart
-    PYART_AVAILABLE = True
-    logger.info("✅ PyART disponible")
-except ImportError:
-    PYART_AVAILABLE = False
-    logger.warning("⚠️  PyART no disponible. Instale con: pip install arm-pyart")
+# Cambiar cuando cambie el aspecto de los productos para invalidar los ya generados
+VERSION_PRODUCTOS = 1
+
+# Empaquetado entero para exportación compacta (resolución de 0.01 en int16)
+EMPAQUETADO_NETCDF = {
+    'reflectivity': {'dtype': 'i2', 'scale_factor': 0.01, 'add_offset': 0.0},
+    'velocity': {'dtype': 'i2', 'scale_factor': 0.01, 'add_offset': 0.0},
+}
 
 
 class RadarAdvancedProcessor:
@@ -64,6 +62,36 @@ class RadarAdvancedProcessor:
                 'cmap': 'pyart_NWS_SPW'
             }
         }
+        
+        # Plantillas de figura y colormaps reutilizados entre productos
+        self._figuras = {}
+        self._colormaps = {}
+    
+    def _figura_plantilla(self, figsize=(12, 10)):
+        """Retorna una figura reutilizable (limpia) del tamaño indicado"""
+        import matplotlib.pyplot as plt
+        
+        fig = self._figuras.get(figsize)
+        
+        if fig is None or not plt.fignum_exists(fig.number):
+            fig = plt.figure(figsize=figsize)
+            self._figuras[figsize] = fig
+        else:
+            fig.clf()
+        
+        return fig
+    
+    def _colormap(self, nombre):
+        """Resuelve un colormap por nombre una sola vez"""
+        if nombre not in self._colormaps:
+            import matplotlib
+            
+            try:
+                self._colormaps[nombre] = matplotlib.colormaps[nombre]
+            except KeyError:
+                logger.warning(f"Colormap {nombre} no disponible, usando viridis")
+                self._colormaps[nombre] = matplotlib.colormaps['viridis']
+        return self._colormaps[nombre]
     
     def leer_con_pyart(self, ruta_archivo):
         """Lee archivo de radar usando PyART"""
@@ -72,6 +100,8 @@ class RadarAdvancedProcessor:
             return None
         
         try:
+            import pyart
+            
             logger.info(f"Leyendo con PyART: {ruta_archivo}")
             
             # PyART puede leer varios formatos
@@ -87,6 +117,37 @@ class RadarAdvancedProcessor:
             logger.error(f"Error leyendo archivo con PyART: {e}")
             return None
     
+    def leer_desde_memoria(self, datos, nombre="volumen", campos=None):
+        """
+        Lee un volumen IRIS/Sigmet (opcionalmente gzip) desde bytes en memoria
+        
+        Si el lector Sigmet no lo reconoce se recurre a un archivo temporal y a
+        la detección automática de formato de PyART.
+        """
+        if not self.pyart_enabled:
+            logger.error("PyART no está disponible")
+            return None
+        
+        import io
+        import pyart
+        
+        opciones = {'include_fields': list(campos)} if campos else {}
+        try:
+            return pyart.io.read_sigmet(io.BytesIO(datos), **opciones)
+        except Exception as e:
+            logger.debug(f"Lector Sigmet en memoria falló para {nombre}: {e}")
+        
+        import tempfile
+        
+        with tempfile.NamedTemporaryFile(suffix=Path(nombre).suffix) as temporal:
+            temporal.write(datos)
+            temporal.flush()
+            try:
+                return pyart.io.read(temporal.name, **opciones)
+            except Exception as e:
+                logger.error(f"Error leyendo {nombre} desde memoria: {e}")
+                return None
+    
     def extraer_informacion(self, radar):
         """Extrae información del objeto radar de PyART"""
         if radar is None:
@@ -132,10 +193,13 @@ class RadarAdvancedProcessor:
                 'cmap': 'viridis'
             })
             
+            import pyart
+            
             # Crear display
             display = pyart.graph.RadarDisplay(radar)
             
-            fig = plt.figure(figsize=(12, 10))
+            fig = self._figura_plantilla((12, 10))
+            ax = fig.add_subplot(111)
             
             # Plotear PPI
             display.plot_ppi(
@@ -143,23 +207,25 @@ class RadarAdvancedProcessor:
                 sweep=sweep,
                 vmin=config['vmin'],
                 vmax=config['vmax'],
-                cmap=config['cmap'],
-                title=f"{config['nombre']} - Sweep {sweep}"
+                cmap=self._colormap(config['cmap']),
+                title=f"{config['nombre']} - Sweep {sweep}",
+                fig=fig,
+                ax=ax
             )
             
             # Agregar anillos de rango
-            display.plot_range_rings([50, 100, 150, 200])
+            display.plot_range_rings([50, 100, 150, 200], ax=ax)
             
             # Agregar líneas de azimuth
-            display.plot_cross_hair(5)
+            display.plot_cross_hair(5, ax=ax)
             
-            plt.tight_layout()
+            fig.tight_layout()
             
             # Guardar si se especifica ruta
             if output_path:
                 output_path = Path(output_path)
                 output_path.parent.mkdir(parents=True, exist_ok=True)
-                plt.savefig(output_path, dpi=150, bbox_inches='tight')
+                fig.savefig(output_path, dpi=150, bbox_inches='tight')
                 logger.info(f"PPI guardado en: {output_path}")
             
             return fig
@@ -176,6 +242,9 @@ class RadarAdvancedProcessor:
             return None
         
         try:
+            import pyart
+            import matplotlib.pyplot as plt
+            
             # Crear grid
             grid = pyart.map.grid_from_radars(
                 radar,
@@ -275,17 +344,136 @@ class RadarAdvancedProcessor:
             logger.error(f"Error calculando precipitación: {e}")
             return None
     
-    def exportar_a_netcdf(self, radar, output_path):
-        """Exporta datos de radar a formato NetCDF"""
+    def _subconjunto_radar(self, radar, campos=None, sweeps=None):
+        """Copia del radar restringida a ciertos campos y sweeps (sin modificar el original)"""
+        import copy
+        
+        if sweeps is not None:
+            radar = radar.extract_sweeps(list(sweeps))
+        else:
+            radar = copy.copy(radar)
+        
+        if campos is not None:
+            faltantes = [c for c in campos if c not in radar.fields]
+            if faltantes:
+                logger.warning(f"Campos no disponibles para exportar: {faltantes}")
+            radar.fields = {k: v for k, v in radar.fields.items() if k in campos}
+        
+        return radar
+    
+    def _empaquetado_campo(self, nombre):
+        """Parámetros de empaquetado entero para un campo, o None si se deja en float"""
+        for clave, empaque in EMPAQUETADO_NETCDF.items():
+            if clave in nombre:
+                return empaque
+        return None
+    
+    def _recomprimir_netcdf(self, origen, destino, rayos_por_sweep, compresion='zlib',
+                            nivel=4, empaquetar=True):
+        """
+        Reescribe un CfRadial con compresión, chunks de un sweep y empaquetado entero
+        
+        Los campos (time, range) se dividen en chunks de un sweep completo para
+        que leer un sweep descomprima un solo chunk.
+        """
+        import netCDF4
+        
+        with netCDF4.Dataset(origen, 'r') as src, \
+                netCDF4.Dataset(destino, 'w', format='NETCDF4') as dst:
+            src.set_auto_chartostring(False)
+            dst.setncatts({a: src.getncattr(a) for a in src.ncattrs()})
+            
+            for nombre, dim in src.dimensions.items():
+                dst.createDimension(nombre, None if dim.isunlimited() else len(dim))
+            
+            for nombre, var in src.variables.items():
+                es_campo = var.dimensions == ('time', 'range')
+                empaque = self._empaquetado_campo(nombre) if (empaquetar and es_campo) else None
+                
+                atributos = {a: var.getncattr(a) for a in var.ncattrs() if a != '_FillValue'}
+                relleno = getattr(var, '_FillValue', None)
+                dtype = var.datatype
+                
+                if empaque:
+                    dtype = np.dtype(empaque['dtype'])
+                    relleno = np.iinfo(dtype).min
+                    atributos['scale_factor'] = empaque['scale_factor']
+                    atributos['add_offset'] = empaque['add_offset']
+                
+                opciones = {'fill_value': relleno}
+                if var.ndim > 0:
+                    opciones.update(compression=compresion, complevel=nivel, shuffle=True)
+                if es_campo:
+                    opciones['chunksizes'] = (min(rayos_por_sweep, len(src.dimensions['time'])),
+                                              len(src.dimensions['range']))
+                
+                nueva = dst.createVariable(nombre, dtype, var.dimensions, **opciones)
+                nueva.set_auto_chartostring(False)
+                nueva.setncatts(atributos)
+                
+                if empaque:
+                    # Recortar al rango representable antes de que netCDF4 empaquete
+                    datos = np.ma.asarray(var[:], dtype=np.float64)
+                    limite = np.iinfo(dtype)
+                    minimo = (limite.min + 1) * empaque['scale_factor'] + empaque['add_offset']
+                    maximo = limite.max * empaque['scale_factor'] + empaque['add_offset']
+                    nueva[:] = np.ma.clip(datos, minimo, maximo)
+                else:
+                    nueva[:] = var[:]
+    
+    def exportar_a_netcdf(self, radar, output_path, compacto=False, campos=None, sweeps=None,
+                          compresion='zlib', nivel=4, empaquetar=True):
+        """
+        Exporta datos de radar a formato NetCDF (CfRadial)
+        
+        Args:
+            radar: objeto radar de PyART
+            output_path: ruta del archivo .nc
+            compacto: si True, comprime (zlib/zstd), divide en chunks por sweep y
+                empaqueta DBZ/VEL como enteros con scale_factor/add_offset
+            campos: lista de campos a exportar (None para todos)
+            sweeps: lista de índices de sweep a exportar (None para todos)
+            compresion: 'zlib' o 'zstd' (este último requiere netCDF-C con plugins)
+            nivel: nivel de compresión
+            empaquetar: empaquetado entero de los campos en EMPAQUETADO_NETCDF
+        """
         if not self.pyart_enabled or radar is None:
             return False
         
         try:
+            import pyart
+            
             output_path = Path(output_path)
             output_path.parent.mkdir(parents=True, exist_ok=True)
             
-            pyart.io.write_cfradial(str(output_path), radar)
-            logger.info(f"✅ Datos exportados a NetCDF: {output_path}")
+            if campos is not None or sweeps is not None:
+                radar = self._subconjunto_radar(radar, campos, sweeps)
+            
+            if not compacto:
+                pyart.io.write_cfradial(str(output_path), radar)
+                logger.info(f"✅ Datos exportados a NetCDF: {output_path}")
+                return True
+            
+            # PyART escribe la estructura CfRadial; luego se reempaqueta
+            temporal = output_path.with_name(output_path.name + '.tmp')
+            rayos_por_sweep = int(np.max(radar.rays_per_sweep['data']))
+            
+            try:
+                pyart.io.write_cfradial(str(temporal), radar)
+                try:
+                    self._recomprimir_netcdf(temporal, output_path, rayos_por_sweep,
+                                             compresion, nivel, empaquetar)
+                except (ValueError, RuntimeError) as e:
+                    if compresion == 'zlib':
+                        raise
+                    logger.warning(f"Compresión {compresion} no disponible ({e}); usando zlib")
+                    self._recomprimir_netcdf(temporal, output_path, rayos_por_sweep,
+                                             'zlib', nivel, empaquetar)
+            finally:
+                temporal.unlink(missing_ok=True)
+            
+            logger.info(f"✅ Datos exportados a NetCDF compacto ({compresion}): {output_path} "
+                        f"({output_path.stat().st_size / (1024 * 1024):.2f} MB)")
             
             return True
             
@@ -293,10 +481,82 @@ class RadarAdvancedProcessor:
             logger.error(f"Error exportando a NetCDF: {e}")
             return False
     
-    def procesar_archivo_completo(self, ruta_archivo, output_dir=None):
-        """Procesa un archivo completo y genera todos los productos"""
+    def _firma_entrada(self, ruta_archivo):
+        """Identifica el contenido de un archivo de entrada (tamaño, mtime y versión)"""
+        stat = Path(ruta_archivo).stat()
+        return {
+            'tamaño': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'version': VERSION_PRODUCTOS
+        }
+    
+    def _firma_producto(self, firma_entrada, campo, sweep=0):
+        """Firma de un producto: entrada más la configuración con la que se genera"""
+        return json.dumps({
+            'entrada': firma_entrada,
+            'campo': campo,
+            'sweep': sweep,
+            'config': self.productos_config.get(campo)
+        }, sort_keys=True, default=str)
+    
+    def leer_manifiesto(self, output_dir):
+        """Lee el manifiesto de productos generados en una ejecución anterior"""
+        manifiesto_path = Path(output_dir) / "manifest.json"
+        
+        if not manifiesto_path.exists():
+            return {'entrada': None, 'productos': {}}
+        
+        try:
+            with open(manifiesto_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Manifiesto ilegible en {manifiesto_path}: {e}")
+            return {'entrada': None, 'productos': {}}
+    
+    def _producto_vigente(self, manifiesto, output_dir, nombre, firma):
+        """Indica si un producto existe y fue generado con la misma firma"""
+        return (manifiesto['productos'].get(nombre) == firma and
+                (Path(output_dir) / nombre).exists())
+    
+    def productos_al_dia(self, output_dir, firma_entrada):
+        """Manifiesto si la entrada no cambió y todos sus productos existen; None si hay que procesar"""
+        output_dir = Path(output_dir)
+        manifiesto = self.leer_manifiesto(output_dir)
+        
+        if (manifiesto['entrada'] == firma_entrada and manifiesto['productos'] and
+                all((output_dir / nombre).exists() for nombre in manifiesto['productos'])):
+            return manifiesto
+        return None
+    
+    def procesar_archivo_completo(self, ruta_archivo, output_dir=None, forzar=False):
+        """
+        Procesa un archivo completo y genera todos los productos
+        
+        Los productos cuya entrada y configuración no cambiaron desde la última
+        ejecución (según manifest.json) no se regeneran, salvo con forzar=True.
+        """
         logger.info(f"🔄 Procesando archivo completo: {ruta_archivo}")
         
+        # Crear directorio de salida
+        if output_dir is None:
+            output_dir = Path("productos_radar") / Path(ruta_archivo).stem
+        else:
+            output_dir = Path(output_dir)
+        
+        firma_entrada = self._firma_entrada(ruta_archivo)
+        
+        # Si la entrada no cambió y todos los productos existen, no hay nada que hacer
+        manifiesto = None if forzar else self.productos_al_dia(output_dir, firma_entrada)
+        if manifiesto is not None:
+            logger.info(f"⏭️  Productos al día, se omite: {ruta_archivo}")
+            return {
+                'archivo': ruta_archivo,
+                'info': manifiesto.get('info'),
+                'productos_generados': [],
+                'productos_omitidos': list(manifiesto['productos']),
+                'omitido': True
+            }
+        
         # Leer archivo
         radar = self.leer_con_pyart(ruta_archivo)
         
@@ -304,75 +564,97 @@ class RadarAdvancedProcessor:
             logger.error("No se pudo leer el archivo")
             return None
         
+        return self.procesar_radar(radar, ruta_archivo, output_dir, firma_entrada, forzar=forzar)
+    
+    def procesar_radar(self, radar, ruta_archivo, output_dir, firma_entrada, forzar=False):
+        """
+        Genera todos los productos de un volumen ya leído
+        
+        Args:
+            radar: objeto radar de PyART
+            ruta_archivo: ruta o llave S3 de origen (da nombre al NetCDF)
+            output_dir: directorio de productos
+            firma_entrada: identificación del contenido de entrada para el manifiesto
+        """
+        output_dir = Path(output_dir)
+        manifiesto = {'entrada': None, 'productos': {}} if forzar else self.leer_manifiesto(output_dir)
+        
         # Extraer información
         info = self.extraer_informacion(radar)
         
-        # Crear directorio de salida
-        if output_dir is None:
-            output_dir = Path("productos_radar") / Path(ruta_archivo).stem
-        else:
-            output_dir = Path(output_dir)
-        
         output_dir.mkdir(parents=True, exist_ok=True)
         
         resultados = {
             'archivo': ruta_archivo,
             'info': info,
-            'productos_generados': []
+            'productos_generados': [],
+            'productos_omitidos': [],
+            'omitido': False
         }
+        productos = {}
+        
+        def registrar(nombre, firma, generado):
+            productos[nombre] = firma
+            clave = 'productos_generados' if generado else 'productos_omitidos'
+            resultados[clave].append(nombre)
+        
+        # Calcular precipitación si hay reflectividad
+        campos = list(radar.fields.keys())
+        if 'reflectivity' in radar.fields and self.calcular_precipitacion(radar) is not None:
+            campos.append('rainfall_rate')
         
         # Generar productos para cada campo disponible
-        for campo in radar.fields.keys():
+        for campo in campos:
+            nombre = "ppi_rainfall.png" if campo == 'rainfall_rate' else f"ppi_{campo}.png"
+            firma = self._firma_producto(firma_entrada, campo, sweep=0)
+            
+            if self._producto_vigente(manifiesto, output_dir, nombre, firma):
+                registrar(nombre, firma, generado=False)
+                continue
+            
             try:
-                # PPI para sweep 0
+                # PPI para sweep 0 (la figura es una plantilla reutilizada)
                 fig_ppi = self.generar_ppi(
                     radar,
                     campo=campo,
                     sweep=0,
-                    output_path=output_dir / f"ppi_{campo}.png"
+                    output_path=output_dir / nombre
                 )
                 
                 if fig_ppi:
-                    plt.close(fig_ppi)
-                    resultados['productos_generados'].append(f"ppi_{campo}.png")
+                    registrar(nombre, firma, generado=True)
                 
             except Exception as e:
                 logger.error(f"Error generando PPI para {campo}: {e}")
         
-        # Calcular precipitación si hay reflectividad
-        if 'reflectivity' in radar.fields:
-            rain_rate = self.calcular_precipitacion(radar)
-            
-            if rain_rate is not None:
-                # Generar PPI de precipitación
-                fig_rain = self.generar_ppi(
-                    radar,
-                    campo='rainfall_rate',
-                    sweep=0,
-                    output_path=output_dir / "ppi_rainfall.png"
-                )
-                
-                if fig_rain:
-                    plt.close(fig_rain)
-                    resultados['productos_generados'].append("ppi_rainfall.png")
-        
         # Exportar a NetCDF
         netcdf_path = output_dir / f"{Path(ruta_archivo).stem}.nc"
-        if self.exportar_a_netcdf(radar, netcdf_path):
-            resultados['productos_generados'].append(str(netcdf_path.name))
+        firma = self._firma_producto(firma_entrada, 'netcdf')
+        if self._producto_vigente(manifiesto, output_dir, netcdf_path.name, firma):
+            registrar(netcdf_path.name, firma, generado=False)
+        elif self.exportar_a_netcdf(radar, netcdf_path):
+            registrar(netcdf_path.name, firma, generado=True)
+        
+        # Convertir datetime a string para JSON
+        info_serializable = info.copy()
+        if 'tiempo' in info_serializable:
+            info_serializable['tiempo'] = {
+                'tiempo_inicio': str(info['tiempo']['tiempo_inicio']),
+                'tiempo_fin': str(info['tiempo']['tiempo_fin'])
+            }
         
         # Guardar información en JSON
-        import json
         info_path = output_dir / "info.json"
         with open(info_path, 'w') as f:
-            # Convertir datetime a string para JSON
-            info_serializable = info.copy()
-            if 'tiempo' in info_serializable:
-                info_serializable['tiempo'] = {
-                    'tiempo_inicio': str(info['tiempo']['tiempo_inicio']),
-                    'tiempo_fin': str(info['tiempo']['tiempo_fin'])
-                }
-            json.dump(info_serializable, f, indent=2)
+            json.dump(info_serializable, f, indent=2, default=str)
+        
+        # Guardar manifiesto para omitir productos vigentes en la próxima ejecución
+        with open(output_dir / "manifest.json", 'w') as f:
+            json.dump({
+                'entrada': firma_entrada,
+                'productos': productos,
+                'info': info_serializable
+            }, f, indent=2, default=str)
         
         logger.info(f"✅ Procesamiento completo. Productos en: {output_dir}")
         
@@ -504,6 +786,11 @@ def menu_avanzado():
 
 def main():
     """Función principal"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    
     print("🔬 PROCESADOR AVANZADO DE RADAR CON PYART 🔬")
     menu_avanzado()
 
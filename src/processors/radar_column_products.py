@@ -0,0 +1,194 @@
+"""
+Productos de columna (reflectividad máxima, topes de eco y VIL) sin rejilla 3D
+Proyecta cada sweep sobre una rejilla 2D con las tablas de índices y reduce
+entre elevaciones usando tablas precalculadas de altura del haz
+"""
+
+import numpy as np
+from pathlib import Path
+from datetime import datetime
+import logging
+
+from src.processors.radar_geometry import RejillaCartesiana, tabla_para_sweep, firma_sweep, altura_haz
+from src.processors.radar_volumes import listar_volumenes, leer_volumen, datos_sweep
+
+logger = logging.getLogger(__name__)
+
+# Caché de alturas del haz por (rejilla, geometría del sweep, altitud del radar)
+_CACHE_ALTURAS = {}
+
+# Coeficiente de Greene y Clark (1972) para VIL en kg/m² con Z en mm⁶/m³ y dh en m
+COEF_VIL = 3.44e-6
+# Tope de reflectividad para VIL (limita la contaminación por granizo)
+DBZ_MAX_VIL = 56.0
+
+
+def tabla_alturas(radar, sweep, rejilla, tabla):
+    """
+    Altura del haz (m sobre el nivel del mar) en cada celda de la rejilla para un sweep
+
+    Depende solo de la geometría del sweep, así que se calcula una vez y se
+    reutiliza en todos los volúmenes con la misma estrategia de escaneo.
+    Las celdas fuera de cobertura quedan en NaN.
+    """
+    altitud = float(radar.altitude['data'][0])
+    clave = (rejilla.clave, firma_sweep(radar, sweep), round(altitud, 0))
+
+    alturas = _CACHE_ALTURAS.get(clave)
+    if alturas is None:
+        elevacion = float(radar.fixed_angle['data'][sweep])
+        rangos = np.asarray(radar.range['data'], dtype=np.float64)
+
+        alturas = np.full(int(np.prod(rejilla.forma)), np.nan, dtype=np.float32)
+        alturas[tabla.celdas] = altura_haz(rangos[tabla.idx_gate], elevacion, altitud)
+        _CACHE_ALTURAS[clave] = alturas
+
+    return alturas
+
+
+class MotorProductosColumna:
+    """Calcula MAX, topes de eco y VIL de un volumen con reducciones vectorizadas"""
+
+    def __init__(self, alcance_m=240000, resolucion_m=1000, campo='reflectivity',
+                 umbral_tope_dbz=18.0, num_bins=360):
+        """
+        Args:
+            alcance_m, resolucion_m: definición de la rejilla 2D
+            campo: campo de reflectividad
+            umbral_tope_dbz: reflectividad mínima que define el tope de eco
+            num_bins: bins azimutales de las tablas de índices
+        """
+        self.rejilla = RejillaCartesiana(alcance_m, resolucion_m)
+        self.campo = campo
+        self.umbral_tope_dbz = umbral_tope_dbz
+        self.num_bins = num_bins
+
+    def _columnas(self, radar):
+        """
+        Pila (elevaciones x celdas) de reflectividad y altura del haz
+
+        Los sweeps se ordenan por elevación para que las capas del VIL queden
+        entre haces consecutivos. Las celdas sin eco o fuera de cobertura son NaN.
+        """
+        sweeps = sorted(range(radar.nsweeps), key=lambda s: float(radar.fixed_angle['data'][s]))
+        num_celdas = int(np.prod(self.rejilla.forma))
+
+        dbz = np.full((len(sweeps), num_celdas), np.nan, dtype=np.float32)
+        alturas = np.full((len(sweeps), num_celdas), np.nan, dtype=np.float32)
+
+        for nivel, sweep in enumerate(sweeps):
+            sweep_datos = datos_sweep(radar, self.campo, sweep)
+            if sweep_datos is None:
+                continue
+            datos, azimuts = sweep_datos
+
+            tabla = tabla_para_sweep(radar, sweep, self.rejilla, self.num_bins)
+            dbz[nivel] = tabla.aplicar(datos, azimuts).ravel()
+            alturas[nivel] = tabla_alturas(radar, sweep, self.rejilla, tabla)
+
+        return dbz, alturas
+
+    def calcular(self, radar):
+        """
+        Productos de columna de un volumen
+
+        Returns:
+            dict con 'max' (dBZ), 'tope_eco' (m), 'vil' (kg/m²), 'x' e 'y' de la
+            rejilla (filas de sur a norte); None si el campo no existe
+        """
+        if self.campo not in radar.fields:
+            logger.warning(f"Campo {self.campo} no disponible")
+            return None
+
+        dbz, alturas = self._columnas(radar)
+        hay_eco = ~np.isnan(dbz)
+        alguno = hay_eco.any(axis=0)
+
+        # Reflectividad máxima de la columna
+        maximo = np.where(hay_eco, dbz, -np.inf).max(axis=0)
+        maximo[~alguno] = np.nan
+
+        # Tope de eco: haz más alto con reflectividad sobre el umbral
+        with np.errstate(invalid='ignore'):
+            sobre_umbral = hay_eco & (dbz >= self.umbral_tope_dbz)
+        tope = np.where(sobre_umbral, alturas, -np.inf).max(axis=0)
+        tope[~sobre_umbral.any(axis=0)] = np.nan
+
+        # VIL: regla del trapecio en Z^(4/7) entre haces consecutivos
+        z_lineal = np.where(hay_eco, 10.0 ** (np.minimum(np.nan_to_num(dbz, nan=-99.0), DBZ_MAX_VIL) / 10.0), 0.0)
+        espesor = np.nan_to_num(np.diff(alturas, axis=0), nan=0.0).clip(min=0.0)
+        z_media = 0.5 * (z_lineal[:-1] + z_lineal[1:])
+        vil = COEF_VIL * (z_media ** (4.0 / 7.0) * espesor).sum(axis=0)
+        vil[~alguno] = np.nan
+
+        forma = self.rejilla.forma
+        return {
+            'max': maximo.reshape(forma).astype(np.float32),
+            'tope_eco': tope.reshape(forma).astype(np.float32),
+            'vil': vil.reshape(forma).astype(np.float32),
+            'x': self.rejilla.x1d,
+            'y': self.rejilla.y1d
+        }
+
+    def guardar(self, productos, output_path):
+        """Guarda los productos de un volumen en formato .npz comprimido"""
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(output_path, **productos)
+        logger.info(f"💾 Productos de columna guardados en: {output_path}")
+        return output_path
+
+    def procesar_volumenes(self, radar='Barrancabermeja', data_dir="data/Radar_IDEAM",
+                           inicio=None, fin=None, output_base="productos_radar", forzar=False):
+        """
+        Calcula los productos de todos los volúmenes descargados en un rango
+
+        Los volúmenes cuyo archivo de productos ya existe se omiten salvo forzar=True.
+
+        Returns:
+            Lista de rutas generadas
+        """
+        rutas = []
+        for timestamp, ruta in listar_volumenes(radar, data_dir, inicio, fin):
+            destino = Path(output_base) / ruta.stem / "columna.npz"
+            if destino.exists() and not forzar:
+                continue
+
+            radar_obj = leer_volumen(ruta, campos=[self.campo])
+            if radar_obj is None:
+                continue
+
+            productos = self.calcular(radar_obj)
+            if productos is not None:
+                rutas.append(self.guardar(productos, destino))
+
+        logger.info(f"✅ {radar}: productos de columna de {len(rutas)} volúmenes")
+        return rutas
+
+
+def limpiar_cache_alturas():
+    """Vacía la caché de alturas del haz"""
+    _CACHE_ALTURAS.clear()
+
+
+def main():
+    """Productos de columna de los volúmenes de hoy del radar Barrancabermeja"""
+    import time
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    print("⛈️  MAX, TOPES DE ECO Y VIL - RADAR BARRANCABERMEJA ⛈️")
+
+    motor = MotorProductosColumna()
+    hoy = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    inicio = time.perf_counter()
+    rutas = motor.procesar_volumenes('Barrancabermeja', inicio=hoy)
+    print(f"\n✅ {len(rutas)} volúmenes en {time.perf_counter() - inicio:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
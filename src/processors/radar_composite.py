@@ -0,0 +1,208 @@
+"""
+Mosaico nacional multi-radar sobre una rejilla lat/lon de Colombia
+Combina volúmenes sincronizados de los radares IDEAM por máximo o radar más cercano
+"""
+
+import numpy as np
+from pathlib import Path
+from datetime import timedelta
+import logging
+
+from src.processors.radar_geometry import latlon_a_xy, tabla_para_sweep
+from src.processors.radar_volumes import listar_volumenes, leer_volumen, datos_sweep
+from src.processors.radar_processor import RADARES_IDEAM
+
+logger = logging.getLogger(__name__)
+
+# Valor asignado a gates cubiertos pero sin eco (enmascarados)
+SIN_ECO_DBZ = -32.0
+
+
+class HuellaRadar:
+    """Celdas de la rejilla nacional cubiertas por un radar y su posición relativa"""
+
+    def __init__(self, nombre, lat0, lon0, lat1d, lon1d, alcance_m):
+        self.nombre = nombre
+        self.lat0 = lat0
+        self.lon0 = lon0
+
+        # Recortar primero a la caja que contiene el alcance del radar
+        dlat = alcance_m / 111000.0
+        dlon = dlat / np.cos(np.deg2rad(lat0))
+        filas = np.flatnonzero(np.abs(lat1d - lat0) <= dlat)
+        columnas = np.flatnonzero(np.abs(lon1d - lon0) <= dlon)
+
+        f, c = np.meshgrid(filas, columnas, indexing='ij')
+        x, y = latlon_a_xy(lat1d[f], lon1d[c], lat0, lon0)
+        distancia = np.hypot(x, y)
+        dentro = distancia <= alcance_m
+
+        self.celdas = np.ravel_multi_index((f[dentro], c[dentro]), (len(lat1d), len(lon1d)))
+        self.x = x[dentro]
+        self.y = y[dentro]
+        self.distancia = distancia[dentro].astype(np.float32)
+        self.forma = self.x.shape
+        self.clave = ('huella', nombre, float(lat1d[0]), float(lon1d[0]),
+                      len(lat1d), len(lon1d), float(alcance_m))
+
+
+class MosaicoNacional:
+    """Compone productos de varios radares IDEAM sobre una rejilla común"""
+
+    LIMITES_COLOMBIA = {
+        'lat_min': -4.5,
+        'lat_max': 13.5,
+        'lon_min': -80.0,
+        'lon_max': -66.5
+    }
+
+    METODOS = ('max', 'cercano', 'ponderado')
+
+    def __init__(self, radares=None, data_dir="data/Radar_IDEAM", resolucion_deg=0.02,
+                 alcance_m=240000, campo='reflectivity', sweep=0, limites=None):
+        self.data_dir = Path(data_dir)
+        self.campo = campo
+        self.sweep = sweep
+        self.resolucion_deg = resolucion_deg
+
+        limites = limites or self.LIMITES_COLOMBIA
+        self.lat1d = np.arange(limites['lat_min'], limites['lat_max'], resolucion_deg) + resolucion_deg / 2
+        self.lon1d = np.arange(limites['lon_min'], limites['lon_max'], resolucion_deg) + resolucion_deg / 2
+        self.forma = (len(self.lat1d), len(self.lon1d))
+
+        radares = radares or list(RADARES_IDEAM.keys())
+        self.huellas = {}
+        for nombre in radares:
+            info = RADARES_IDEAM[nombre]
+            self.huellas[nombre] = HuellaRadar(
+                nombre, info['lat'], info['lon'], self.lat1d, self.lon1d, alcance_m
+            )
+            logger.info(f"Huella de {nombre}: {len(self.huellas[nombre].celdas)} celdas")
+
+    def volumenes_sincronizados(self, instante, tolerancia=timedelta(minutes=5)):
+        """Para cada radar, el volumen descargado más cercano a instante dentro de la tolerancia"""
+        seleccion = {}
+        for nombre in self.huellas:
+            candidatos = listar_volumenes(nombre, self.data_dir,
+                                          instante - tolerancia, instante + tolerancia)
+            if candidatos:
+                seleccion[nombre] = min(candidatos, key=lambda v: abs(v[0] - instante))
+        return seleccion
+
+    def componer(self, volumenes, metodo='max'):
+        """
+        Combina volúmenes PyART ya leídos
+
+        Args:
+            volumenes: dict nombre_radar -> objeto radar de PyART
+            metodo: 'max' (reflectividad máxima), 'cercano' (radar más
+                cercano con dato) o 'ponderado' (promedio por 1/distancia²)
+
+        Returns:
+            dict con el mosaico (NaN fuera de cobertura) y el radar de origen
+            de cada celda (-1 sin dato; solo para 'max' y 'cercano')
+        """
+        if metodo not in self.METODOS:
+            raise ValueError(f"Método no soportado: {metodo}. Opciones: {self.METODOS}")
+
+        n = self.forma[0] * self.forma[1]
+        mosaico = np.full(n, np.nan, dtype=np.float32)
+        origen = np.full(n, -1, dtype=np.int8)
+        distancia = np.full(n, np.inf, dtype=np.float32)
+        pesos = np.zeros(n, dtype=np.float32) if metodo == 'ponderado' else None
+
+        nombres = list(self.huellas)
+        radares_usados = []
+
+        for nombre, radar_obj in volumenes.items():
+            huella = self.huellas.get(nombre)
+            sweep = datos_sweep(radar_obj, self.campo, self.sweep) if huella else None
+            if sweep is None:
+                logger.warning(f"Sin datos de {self.campo} para {nombre}")
+                continue
+
+            datos, azimuts = sweep
+            tabla = tabla_para_sweep(radar_obj, self.sweep, huella)
+            valores = tabla.aplicar(datos, azimuts, relleno=np.nan, enmascarado=SIN_ECO_DBZ)
+            hay_dato = ~np.isnan(valores)
+            celdas = huella.celdas[hay_dato]
+            valores = valores[hay_dato]
+
+            if metodo == 'max':
+                actual = mosaico[celdas]
+                gana = np.isnan(actual) | (valores > actual)
+            elif metodo == 'cercano':
+                gana = huella.distancia[hay_dato] < distancia[celdas]
+            else:
+                peso = 1.0 / np.maximum(huella.distancia[hay_dato], 1000.0) ** 2
+                mosaico[celdas] = np.nan_to_num(mosaico[celdas]) + valores * peso
+                pesos[celdas] += peso
+                radares_usados.append(nombre)
+                continue
+
+            mosaico[celdas[gana]] = valores[gana]
+            origen[celdas[gana]] = nombres.index(nombre)
+            distancia[celdas[gana]] = huella.distancia[hay_dato][gana]
+            radares_usados.append(nombre)
+
+        if metodo == 'ponderado':
+            con_peso = pesos > 0
+            mosaico[con_peso] /= pesos[con_peso]
+
+        return {
+            'campo': self.campo,
+            'metodo': metodo,
+            'mosaico': mosaico.reshape(self.forma),
+            'radar_origen': origen.reshape(self.forma),
+            'radares': nombres,
+            'radares_usados': radares_usados,
+            'lat': self.lat1d,
+            'lon': self.lon1d
+        }
+
+    def componer_instante(self, instante, metodo='max', tolerancia=timedelta(minutes=5), seleccion=None):
+        """
+        Lee los volúmenes sincronizados con instante y genera el mosaico
+
+        Args:
+            seleccion: resultado de volumenes_sincronizados si ya se calculó
+        """
+        if seleccion is None:
+            seleccion = self.volumenes_sincronizados(instante, tolerancia)
+        if not seleccion:
+            logger.warning(f"No hay volúmenes cerca de {instante}")
+            return None
+
+        volumenes = {}
+        tiempos = {}
+        for nombre, (timestamp, ruta) in seleccion.items():
+            radar_obj = leer_volumen(ruta)
+            if radar_obj is not None:
+                volumenes[nombre] = radar_obj
+                tiempos[nombre] = timestamp
+
+        resultado = self.componer(volumenes, metodo)
+        resultado['instante'] = instante
+        resultado['tiempos_volumenes'] = tiempos
+        return resultado
+
+    def guardar(self, resultado, output_dir="productos_radar/mosaico"):
+        """Guarda el mosaico en formato .npz comprimido"""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        instante = resultado.get('instante')
+        sufijo = f"{instante:%Y%m%d%H%M}" if instante else "sin_fecha"
+        ruta = output_dir / f"mosaico_{resultado['campo']}_{resultado['metodo']}_{sufijo}.npz"
+
+        np.savez_compressed(
+            ruta,
+            mosaico=resultado['mosaico'],
+            radar_origen=resultado['radar_origen'],
+            lat=resultado['lat'],
+            lon=resultado['lon'],
+            radares=np.array(resultado['radares']),
+            radares_usados=np.array(resultado['radares_usados'])
+        )
+        logger.info(f"💾 Mosaico guardado en: {ruta}")
+        return ruta
@@ -0,0 +1,234 @@
+"""
+Geometría de radar y tablas de índices precalculadas
+Relaciona celdas de una rejilla (cartesiana o lat/lon) con (rayo, gate) de un sweep
+"""
+
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Modelo de tierra efectiva 4/3 para propagación estándar del haz
+RADIO_TIERRA_M = 6371000.0
+RADIO_EFECTIVO_M = RADIO_TIERRA_M * 4.0 / 3.0
+
+# Caché de tablas por (rejilla, geometría del sweep)
+_CACHE_TABLAS = {}
+
+
+def altura_haz(rango_m, elevacion_deg, altitud_radar=0.0):
+    """Altura del centro del haz (m) para un rango inclinado y elevación dados"""
+    rango_m = np.asarray(rango_m, dtype=np.float64)
+    el = np.deg2rad(elevacion_deg)
+    re = RADIO_EFECTIVO_M
+    return np.sqrt(rango_m ** 2 + re ** 2 + 2.0 * rango_m * re * np.sin(el)) - re + altitud_radar
+
+
+def distancia_superficie(rango_m, elevacion_deg):
+    """Distancia sobre la superficie (m) correspondiente a un rango inclinado"""
+    rango_m = np.asarray(rango_m, dtype=np.float64)
+    el = np.deg2rad(elevacion_deg)
+    re = RADIO_EFECTIVO_M
+    h = altura_haz(rango_m, elevacion_deg)
+    return re * np.arcsin(rango_m * np.cos(el) / (re + h))
+
+
+def rango_inclinado(distancia_m, elevacion_deg):
+    """Rango inclinado (m) a lo largo del haz para una distancia sobre la superficie"""
+    theta = np.asarray(distancia_m, dtype=np.float64) / RADIO_EFECTIVO_M
+    el = np.deg2rad(elevacion_deg)
+    return RADIO_EFECTIVO_M * np.sin(theta) / np.cos(el + theta)
+
+
+def latlon_a_xy(lat, lon, lat0, lon0):
+    """Proyección azimutal equidistante centrada en (lat0, lon0); retorna x, y en metros"""
+    lat = np.deg2rad(np.asarray(lat, dtype=np.float64))
+    lon = np.deg2rad(np.asarray(lon, dtype=np.float64))
+    lat0 = np.deg2rad(lat0)
+    lon0 = np.deg2rad(lon0)
+
+    dlon = lon - lon0
+    cos_c = np.sin(lat0) * np.sin(lat) + np.cos(lat0) * np.cos(lat) * np.cos(dlon)
+    c = np.arccos(np.clip(cos_c, -1.0, 1.0))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        k = np.where(c == 0, 1.0, c / np.sin(c))
+
+    x = RADIO_TIERRA_M * k * np.cos(lat) * np.sin(dlon)
+    y = RADIO_TIERRA_M * k * (np.cos(lat0) * np.sin(lat) -
+                              np.sin(lat0) * np.cos(lat) * np.cos(dlon))
+    return x, y
+
+
+def xy_a_latlon(x, y, lat0, lon0):
+    """Inversa de latlon_a_xy; retorna lat, lon en grados"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    lat0 = np.deg2rad(lat0)
+    lon0 = np.deg2rad(lon0)
+
+    rho = np.hypot(x, y)
+    c = rho / RADIO_TIERRA_M
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        lat = np.arcsin(np.cos(c) * np.sin(lat0) +
+                        np.where(rho == 0, 0.0, y * np.sin(c) * np.cos(lat0) / rho))
+    lon = lon0 + np.arctan2(x * np.sin(c),
+                            rho * np.cos(lat0) * np.cos(c) - y * np.sin(lat0) * np.sin(c))
+    return np.rad2deg(lat), np.rad2deg(lon)
+
+
+def rayos_por_bin(azimuts, num_bins=360, max_separacion=None):
+    """
+    Asigna a cada bin azimutal canónico el rayo más cercano del sweep
+
+    Los sweeps no empiezan siempre en el mismo azimut, por eso las tablas
+    guardan bins azimutales y este mapeo (O(rayos)) se calcula por volumen.
+    Retorna un array de tamaño num_bins con el índice de rayo o -1 si no hay
+    rayo a menos de max_separacion grados.
+    """
+    azimuts = np.mod(np.asarray(azimuts, dtype=np.float64), 360.0)
+    ancho = 360.0 / num_bins
+
+    if max_separacion is None:
+        max_separacion = ancho
+
+    orden = np.argsort(azimuts)
+    az_ord = azimuts[orden]
+    centros = (np.arange(num_bins) + 0.5) * ancho
+
+    pos = np.searchsorted(az_ord, centros)
+    inferior = (pos - 1) % len(az_ord)
+    superior = pos % len(az_ord)
+
+    d_inf = np.abs((centros - az_ord[inferior] + 180.0) % 360.0 - 180.0)
+    d_sup = np.abs((az_ord[superior] - centros + 180.0) % 360.0 - 180.0)
+
+    elegido = np.where(d_inf <= d_sup, inferior, superior)
+    separacion = np.minimum(d_inf, d_sup)
+
+    mapa = orden[elegido]
+    mapa[separacion > max_separacion] = -1
+    return mapa
+
+
+class RejillaCartesiana:
+    """Rejilla cuadrada en metros centrada en el radar"""
+
+    def __init__(self, alcance_m=240000, resolucion_m=1000):
+        self.alcance_m = float(alcance_m)
+        self.resolucion_m = float(resolucion_m)
+
+        n = int(round(2 * self.alcance_m / self.resolucion_m))
+        self.x1d = (np.arange(n) + 0.5) * self.resolucion_m - self.alcance_m
+        self.y1d = self.x1d.copy()
+
+        # Filas de sur a norte, columnas de oeste a este
+        self.x, self.y = np.meshgrid(self.x1d, self.y1d)
+        self.forma = self.x.shape
+        self.clave = ('cartesiana', self.alcance_m, self.resolucion_m)
+
+    def latlon(self, lat0, lon0):
+        """Coordenadas geográficas de las celdas para un radar en (lat0, lon0)"""
+        return xy_a_latlon(self.x, self.y, lat0, lon0)
+
+
+class TablaIndices:
+    """Tabla (bin azimutal, gate) precalculada para proyectar un sweep sobre una rejilla"""
+
+    def __init__(self, forma, celdas, idx_bin, idx_gate, num_bins=360):
+        self.forma = tuple(forma)
+        self.celdas = celdas          # índices planos de las celdas cubiertas
+        self.idx_bin = idx_bin
+        self.idx_gate = idx_gate
+        self.num_bins = num_bins
+
+        self.validos = np.zeros(int(np.prod(self.forma)), dtype=bool)
+        self.validos[celdas] = True
+        self.validos = self.validos.reshape(self.forma)
+
+    @classmethod
+    def desde_geometria(cls, rangos, x, y, elevacion=0.0, num_bins=360):
+        """
+        Construye la tabla para celdas con coordenadas (x, y) relativas al radar
+
+        Args:
+            rangos: centros de los gates a lo largo del haz (m)
+            x, y: coordenadas de las celdas destino (m), misma forma
+            elevacion: ángulo de elevación del sweep (grados)
+            num_bins: número de bins azimutales canónicos
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        rangos = np.asarray(rangos, dtype=np.float64)
+
+        distancia = np.hypot(x, y).ravel()
+        azimut = np.mod(np.rad2deg(np.arctan2(x, y)).ravel(), 360.0)
+
+        rango = rango_inclinado(distancia, elevacion)
+        paso = rangos[1] - rangos[0] if len(rangos) > 1 else 1.0
+        gate = np.rint((rango - rangos[0]) / paso).astype(np.int64)
+
+        celdas = np.flatnonzero((gate >= 0) & (gate < len(rangos)))
+        idx_bin = (azimut[celdas] * num_bins / 360.0).astype(np.int64) % num_bins
+
+        return cls(x.shape, celdas, idx_bin, gate[celdas], num_bins=num_bins)
+
+    def aplicar(self, datos, azimuts, relleno=np.nan, enmascarado=np.nan):
+        """
+        Proyecta un sweep (rayos x gates) sobre la rejilla
+
+        Args:
+            datos: array o masked array del sweep (rayos, gates)
+            azimuts: azimut de cada rayo del sweep
+            relleno: valor para celdas fuera de cobertura
+            enmascarado: valor para gates enmascarados (sin eco / inválidos)
+        """
+        mapa = rayos_por_bin(azimuts, self.num_bins)
+        rayo = mapa[self.idx_bin]
+        hay_rayo = rayo >= 0
+
+        salida = np.full(int(np.prod(self.forma)), relleno, dtype=np.float32)
+
+        datos_llenos = np.ma.filled(np.ma.asarray(datos, dtype=np.float32), np.nan)
+        valores = datos_llenos[rayo[hay_rayo], self.idx_gate[hay_rayo]]
+        valores = np.where(np.isnan(valores), enmascarado, valores)
+        salida[self.celdas[hay_rayo]] = valores
+
+        return salida.reshape(self.forma)
+
+
+def firma_sweep(radar, sweep=0, num_bins=360):
+    """Clave de geometría de un sweep (rangos y elevación) para reutilizar tablas"""
+    rangos = radar.range['data']
+    elevacion = float(radar.fixed_angle['data'][sweep])
+    paso = float(rangos[1] - rangos[0]) if len(rangos) > 1 else 0.0
+    return (
+        round(float(rangos[0]), 1),
+        round(paso, 1),
+        len(rangos),
+        round(elevacion, 1),
+        num_bins
+    )
+
+
+def tabla_para_sweep(radar, sweep, rejilla, num_bins=360):
+    """Obtiene (o construye y guarda en caché) la tabla de índices de un sweep"""
+    clave = (rejilla.clave, firma_sweep(radar, sweep, num_bins))
+
+    tabla = _CACHE_TABLAS.get(clave)
+    if tabla is None:
+        elevacion = float(radar.fixed_angle['data'][sweep])
+        tabla = TablaIndices.desde_geometria(
+            radar.range['data'], rejilla.x, rejilla.y,
+            elevacion=elevacion, num_bins=num_bins
+        )
+        _CACHE_TABLAS[clave] = tabla
+        logger.info(f"Tabla de índices creada para sweep {sweep} ({len(tabla.celdas)} celdas)")
+
+    return tabla
+
+
+def limpiar_cache_tablas():
+    """Vacía la caché de tablas de índices"""
+    _CACHE_TABLAS.clear()
@@ -0,0 +1,320 @@
+"""
+Loops animados de radar (GIF, WebP o MP4) con caché de cuadros por volumen
+Cada volumen se renderiza una sola vez; al refrescar un loop solo se generan
+los cuadros de los volúmenes nuevos y se reensambla la animación
+"""
+
+import os
+import json
+import numpy as np
+from pathlib import Path
+from datetime import datetime, timedelta
+import logging
+
+from src.processors.radar_quicklook import RasterizadorPPI
+from src.processors.radar_volumes import listar_volumenes, leer_volumen
+
+logger = logging.getLogger(__name__)
+
+FORMATOS_LOOP = ('gif', 'webp', 'mp4')
+
+# Fondo opaco de los cuadros (los GIF no manejan bien la transparencia parcial)
+FONDO_CUADRO = (18, 18, 24, 255)
+
+
+def _leer_json(ruta):
+    """Contenido de un JSON auxiliar de la caché; None si no existe o está dañado"""
+    try:
+        return json.loads(ruta.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+class GeneradorLoops:
+    """Ensambla animaciones a partir de cuadros PNG cacheados en disco"""
+
+    def __init__(self, cache_dir="productos_radar/cache_cuadros", output_dir="productos_radar/loops",
+                 data_dir="data/Radar_IDEAM", tamaño=600, campo='reflectivity', sweep=0):
+        """
+        Args:
+            cache_dir: directorio de cuadros cacheados (uno por volumen o instante)
+            output_dir: directorio de las animaciones
+            data_dir: directorio raíz de los volúmenes descargados
+            tamaño: lado en pixeles de los cuadros de un radar
+            campo: campo representado
+            sweep: sweep representado (0 = elevación más baja)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.output_dir = Path(output_dir)
+        self.data_dir = Path(data_dir)
+        self.campo = campo
+        self.sweep = sweep
+        self.rasterizador = RasterizadorPPI(tamaño=tamaño, fondo=FONDO_CUADRO)
+        self._mosaico = None
+        self._teselas = None
+
+    # ------------------------------------------------------------------
+    # Caché de cuadros
+    # ------------------------------------------------------------------
+
+    def _dir_cuadros(self, origen):
+        """Los cuadros dependen del campo, el sweep y el tamaño; cada combinación tiene su directorio"""
+        return self.cache_dir / origen / f"{self.campo}_s{self.sweep}_{self.rasterizador.tamaño}"
+
+    def ruta_cuadro(self, origen, timestamp):
+        return self._dir_cuadros(origen) / f"{timestamp:%Y%m%d%H%M%S}.png"
+
+    def _guardar_cuadro(self, rgba, ruta, etiqueta):
+        """Rotula y escribe el cuadro de forma atómica (otro proceso puede estar leyendo la caché)"""
+        from PIL import Image, ImageDraw
+
+        imagen = Image.fromarray(rgba, 'RGBA').convert('RGB')
+        dibujo = ImageDraw.Draw(imagen)
+        dibujo.rectangle((0, 0, imagen.width, 18), fill=FONDO_CUADRO[:3])
+        dibujo.text((6, 4), etiqueta, fill=(235, 235, 235))
+
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = ruta.with_name(ruta.name + '.part')
+        imagen.save(temporal, format='PNG', compress_level=3)
+        os.replace(temporal, ruta)
+        return ruta
+
+    def cuadro_radar(self, radar, timestamp, ruta_volumen):
+        """
+        Cuadro cacheado de un volumen; se renderiza solo si no existe
+
+        Returns:
+            Path del cuadro o None si el volumen no se pudo leer
+        """
+        ruta = self.ruta_cuadro(radar, timestamp)
+        if ruta.exists():
+            return ruta
+
+        radar_obj = leer_volumen(ruta_volumen, campos=[self.campo])
+        if radar_obj is None:
+            return None
+
+        rgba = self.rasterizador.rasterizar(radar_obj, self.campo, self.sweep)
+        if rgba is None:
+            logger.warning(f"Campo {self.campo} no disponible en {ruta_volumen}")
+            return None
+
+        return self._guardar_cuadro(rgba, ruta, f"{radar}  {self.campo}  {timestamp:%Y-%m-%d %H:%M}")
+
+    def cuadro_mosaico(self, instante, tolerancia=timedelta(minutes=5)):
+        """
+        Cuadro cacheado del mosaico nacional en un instante; None si no hay volúmenes
+
+        Los radares reportan con retraso: un cuadro compuesto sin todos ellos es
+        provisional y junto al PNG se guardan (.json) los volúmenes que usó; se
+        vuelve a componer cuando hay volúmenes distintos para ese instante.
+        """
+        ruta = self.ruta_cuadro('mosaico', instante)
+        provisional = ruta.with_suffix('.json')
+        if ruta.exists() and not provisional.exists():
+            return ruta
+
+        if self._mosaico is None:
+            from src.processors.radar_composite import MosaicoNacional
+            from src.processors.radar_tiles import GeneradorTeselas
+            self._mosaico = MosaicoNacional(data_dir=self.data_dir, campo=self.campo, sweep=self.sweep)
+            self._teselas = GeneradorTeselas()
+
+        seleccion = self._mosaico.volumenes_sincronizados(instante, tolerancia)
+        entradas = {nombre: f"{timestamp:%Y%m%d%H%M%S}" for nombre, (timestamp, _) in seleccion.items()}
+        if ruta.exists() and (not seleccion or _leer_json(provisional) == entradas):
+            return ruta
+
+        resultado = self._mosaico.componer_instante(instante, 'max', tolerancia, seleccion=seleccion)
+        if resultado is None:
+            return None
+
+        # La rejilla del mosaico va de sur a norte; la imagen, de norte a sur
+        rgba = self._teselas.colorear(resultado['mosaico'][::-1], 'reflectividad')
+        rgba[rgba[..., 3] == 0] = FONDO_CUADRO
+
+        etiqueta = (f"Mosaico  {self.campo}  {instante:%Y-%m-%d %H:%M}  "
+                    f"({len(resultado['radares_usados'])} radares)")
+        self._guardar_cuadro(rgba, ruta, etiqueta)
+
+        if len(resultado['radares_usados']) < len(self._mosaico.huellas):
+            provisional.write_text(json.dumps(entradas))
+        else:
+            provisional.unlink(missing_ok=True)
+        return ruta
+
+    def podar_cache(self, origen, antes_de):
+        """Elimina los cuadros anteriores a una fecha; retorna cuántos se borraron"""
+        directorio = self._dir_cuadros(origen)
+        if not directorio.exists():
+            return 0
+
+        borrados = 0
+        limite = f"{antes_de:%Y%m%d%H%M%S}"
+        for ruta in directorio.glob('*.png'):
+            if ruta.stem < limite:
+                ruta.unlink(missing_ok=True)
+                ruta.with_suffix('.json').unlink(missing_ok=True)
+                borrados += 1
+
+        if borrados:
+            logger.info(f"🧹 {borrados} cuadros antiguos eliminados de {directorio}")
+        return borrados
+
+    # ------------------------------------------------------------------
+    # Ensamblado de animaciones
+    # ------------------------------------------------------------------
+
+    def _codificar(self, cuadros, destino, formato, fps):
+        """Escribe la animación a partir de los PNG cacheados"""
+        from PIL import Image
+
+        duracion_ms = int(1000 / fps)
+        temporal = destino.with_name(destino.name + '.part')
+
+        if formato == 'mp4':
+            try:
+                import imageio.v3 as iio
+            except ImportError:
+                logger.error("MP4 requiere imageio con ffmpeg: pip install imageio[ffmpeg]")
+                return None
+            imagenes = np.stack([np.asarray(Image.open(c).convert('RGB')) for c in cuadros])
+            iio.imwrite(temporal, imagenes, extension='.mp4', fps=fps, codec='libx264')
+        else:
+            imagenes = [Image.open(c).convert('RGB') for c in cuadros]
+            # El último cuadro se mantiene más tiempo para marcar el final del loop
+            duraciones = [duracion_ms] * (len(imagenes) - 1) + [duracion_ms * 3]
+            if formato == 'gif':
+                imagenes = [img.quantize(colors=255, method=Image.Quantize.FASTOCTREE) for img in imagenes]
+                imagenes[0].save(temporal, format='GIF', save_all=True, append_images=imagenes[1:],
+                                 duration=duraciones, loop=0, optimize=False)
+            else:
+                imagenes[0].save(temporal, format='WEBP', save_all=True, append_images=imagenes[1:],
+                                 duration=duraciones, loop=0, quality=75, method=0)
+
+        os.replace(temporal, destino)
+        return destino
+
+    def _ensamblar(self, nombre, cuadros, formato, fps):
+        """
+        Codifica el loop salvo que ya exista con exactamente los mismos cuadros
+
+        Un manifiesto JSON junto a la animación guarda la lista de cuadros
+        usada y su fecha de modificación (un cuadro provisional del mosaico se
+        reescribe en la misma ruta); si no cambió no se vuelve a codificar.
+        """
+        if formato not in FORMATOS_LOOP:
+            raise ValueError(f"Formato no soportado: {formato}")
+        if not cuadros:
+            logger.warning(f"Sin cuadros para el loop {nombre}")
+            return None
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        destino = self.output_dir / f"{nombre}.{formato}"
+        manifiesto_path = destino.with_suffix(destino.suffix + '.json')
+        manifiesto = {'cuadros': [[str(c), Path(c).stat().st_mtime_ns] for c in cuadros], 'fps': fps}
+
+        if destino.exists() and _leer_json(manifiesto_path) == manifiesto:
+            logger.info(f"⏭️  Loop {destino.name} al día ({len(cuadros)} cuadros)")
+            return destino
+
+        if self._codificar(cuadros, destino, formato, fps) is None:
+            return None
+        manifiesto_path.write_text(json.dumps(manifiesto))
+
+        logger.info(f"🎞️  Loop generado: {destino} ({len(cuadros)} cuadros)")
+        return destino
+
+    def loop(self, radar, inicio, fin, formato='gif', fps=4):
+        """
+        Loop de un radar con los volúmenes descargados entre inicio y fin
+
+        Returns:
+            Path de la animación o None
+        """
+        cuadros = []
+        renderizados = 0
+        for timestamp, ruta_volumen in listar_volumenes(radar, self.data_dir, inicio, fin):
+            existia = self.ruta_cuadro(radar, timestamp).exists()
+            cuadro = self.cuadro_radar(radar, timestamp, ruta_volumen)
+            if cuadro is not None:
+                cuadros.append(cuadro)
+                renderizados += not existia
+
+        logger.info(f"🖼️  {radar}: {len(cuadros)} cuadros ({renderizados} nuevos)")
+        return self._ensamblar(f"loop_{radar}_{self.campo}_s{self.sweep}", cuadros, formato, fps)
+
+    def loop_mosaico(self, inicio, fin, paso=timedelta(minutes=10), formato='gif', fps=4):
+        """Loop del mosaico nacional con un cuadro cada `paso`"""
+        # Instantes alineados al paso para que los refrescos reutilicen los mismos cuadros
+        segundos_paso = int(paso.total_seconds())
+        epoca = datetime(2000, 1, 1)
+        instante = epoca + timedelta(seconds=-(-int((inicio - epoca).total_seconds()) // segundos_paso)
+                                     * segundos_paso)
+
+        cuadros = []
+        while instante <= fin:
+            cuadro = self.cuadro_mosaico(instante, tolerancia=paso / 2)
+            if cuadro is not None:
+                cuadros.append(cuadro)
+            instante += paso
+
+        return self._ensamblar(f"loop_mosaico_{self.campo}_s{self.sweep}", cuadros, formato, fps)
+
+    def loop_reciente(self, radar='Barrancabermeja', horas=3, formato='gif', fps=4, podar=True):
+        """
+        Loop de las últimas `horas` hasta el volumen más reciente descargado
+
+        Pensado para refrescarse periódicamente: los cuadros de volúmenes
+        anteriores ya están en caché, así que solo se renderizan los nuevos.
+        Con podar=True se borran los cuadros que salieron de la ventana.
+        """
+        ultimo = None
+        if radar == 'mosaico':
+            for nombre in self._radares_mosaico():
+                volumenes = listar_volumenes(nombre, self.data_dir, datetime.now() - timedelta(days=2))
+                if volumenes and (ultimo is None or volumenes[-1][0] > ultimo):
+                    ultimo = volumenes[-1][0]
+        else:
+            volumenes = listar_volumenes(radar, self.data_dir, datetime.now() - timedelta(days=2))
+            ultimo = volumenes[-1][0] if volumenes else None
+
+        if ultimo is None:
+            logger.warning(f"No hay volúmenes recientes de {radar}")
+            return None
+
+        inicio = ultimo - timedelta(hours=horas)
+        if radar == 'mosaico':
+            resultado = self.loop_mosaico(inicio, ultimo, formato=formato, fps=fps)
+        else:
+            resultado = self.loop(radar, inicio, ultimo, formato, fps)
+
+        if podar:
+            self.podar_cache(radar, inicio - timedelta(hours=1))
+        return resultado
+
+    def _radares_mosaico(self):
+        from src.processors.radar_processor import RADARES_IDEAM
+        return list(RADARES_IDEAM.keys())
+
+
+def main():
+    """Loop de las últimas 3 horas del radar Barrancabermeja"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    print("🎞️  LOOP ANIMADO - RADAR BARRANCABERMEJA 🎞️")
+
+    generador = GeneradorLoops()
+    ruta = generador.loop_reciente('Barrancabermeja', horas=3)
+
+    if ruta:
+        print(f"\n✅ Loop: {ruta}")
+    else:
+        print("\n❌ No se pudo generar el loop")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Extracción rápida de series de tiempo puntuales desde archivos de radar
+Precalcula gates y pesos de interpolación para puntos registrados (ciudades, estaciones SIATA)
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import logging
+
+from src.processors.radar_geometry import latlon_a_xy, rango_inclinado, rayos_por_bin, firma_sweep
+from src.processors.radar_volumes import listar_volumenes, leer_volumen, datos_sweep
+from src.processors.radar_accumulation import reflectividad_a_lluvia
+from src.processors.radar_processor import RADARES_IDEAM
+
+logger = logging.getLogger(__name__)
+
+# Puntos de interés por defecto (lat, lon)
+PUNTOS_DEFECTO = {
+    'Medellin': (6.2442, -75.5812),
+    'Bello': (6.3373, -75.5580),
+    'Envigado': (6.1759, -75.5917),
+    'Itagui': (6.1846, -75.5991),
+    'Bogota': (4.7110, -74.0721),
+    'Bucaramanga': (7.1193, -73.1227),
+    'Barrancabermeja': (7.0653, -73.8547),
+}
+
+
+def cargar_puntos_csv(ruta):
+    """Carga puntos desde un CSV con columnas nombre, lat, lon (ej. estaciones SIATA)"""
+    df = pd.read_csv(ruta)
+    return {str(fila['nombre']): (float(fila['lat']), float(fila['lon'])) for _, fila in df.iterrows()}
+
+
+class TablaPuntos:
+    """Gates vecinos y pesos bilineales (azimut x rango) de cada punto para un sweep"""
+
+    def __init__(self, lat, lon, lat0, lon0, rangos, elevacion, num_bins=360):
+        x, y = latlon_a_xy(lat, lon, lat0, lon0)
+        azimut = np.mod(np.rad2deg(np.arctan2(x, y)), 360.0)
+        rango = rango_inclinado(np.hypot(x, y), elevacion)
+
+        # Interpolación entre los dos bins azimutales más cercanos
+        pos_az = azimut * num_bins / 360.0 - 0.5
+        base_az = np.floor(pos_az)
+        self.bin0 = base_az.astype(np.int64) % num_bins
+        self.bin1 = (self.bin0 + 1) % num_bins
+        self.peso_az = (pos_az - base_az).astype(np.float32)
+
+        # Interpolación entre los dos gates más cercanos
+        paso = rangos[1] - rangos[0]
+        pos_r = (rango - rangos[0]) / paso
+        self.gate0 = np.clip(np.floor(pos_r).astype(np.int64), 0, len(rangos) - 1)
+        self.gate1 = np.clip(self.gate0 + 1, 0, len(rangos) - 1)
+        self.peso_r = np.clip(pos_r - np.floor(pos_r), 0.0, 1.0).astype(np.float32)
+
+        self.validos = (pos_r >= 0) & (pos_r <= len(rangos) - 1)
+        self.num_bins = num_bins
+
+    def interpolar(self, datos, azimuts):
+        """Valor interpolado en cada punto; NaN sin eco o fuera de cobertura"""
+        mapa = rayos_por_bin(azimuts, self.num_bins, max_separacion=1.5 * 360.0 / self.num_bins)
+        datos = np.ma.filled(np.ma.asarray(datos, dtype=np.float32), np.nan)
+
+        valores = []
+        pesos = []
+        for rayo, w_az in ((mapa[self.bin0], 1.0 - self.peso_az), (mapa[self.bin1], self.peso_az)):
+            for gate, w_r in ((self.gate0, 1.0 - self.peso_r), (self.gate1, self.peso_r)):
+                v = np.where(rayo >= 0, datos[np.maximum(rayo, 0), gate], np.nan)
+                valores.append(v)
+                pesos.append(np.where(np.isnan(v), 0.0, w_az * w_r))
+
+        valores = np.nan_to_num(np.stack(valores))
+        pesos = np.stack(pesos)
+        total = pesos.sum(axis=0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            resultado = (valores * pesos).sum(axis=0) / total
+        resultado[(total == 0) | ~self.validos] = np.nan
+        return resultado.astype(np.float32)
+
+
+class ExtractorPuntos:
+    """Extrae series de tiempo de reflectividad y lluvia en puntos fijos"""
+
+    def __init__(self, radar='Barrancabermeja', puntos=None, data_dir="data/Radar_IDEAM",
+                 campo='reflectivity', num_bins=360):
+        self.radar = radar
+        self.data_dir = Path(data_dir)
+        self.campo = campo
+        self.num_bins = num_bins
+        self.puntos = dict(puntos or PUNTOS_DEFECTO)
+        self._tablas = {}
+
+    def registrar_punto(self, nombre, lat, lon):
+        """Agrega un punto de interés (invalida las tablas precalculadas)"""
+        self.puntos[nombre] = (lat, lon)
+        self._tablas.clear()
+
+    def _tabla(self, radar_obj):
+        clave = firma_sweep(radar_obj, 0, self.num_bins)
+        tabla = self._tablas.get(clave)
+
+        if tabla is None:
+            lat = np.array([p[0] for p in self.puntos.values()])
+            lon = np.array([p[1] for p in self.puntos.values()])
+            info = RADARES_IDEAM.get(self.radar)
+            lat0 = info['lat'] if info else float(radar_obj.latitude['data'][0])
+            lon0 = info['lon'] if info else float(radar_obj.longitude['data'][0])
+
+            tabla = TablaPuntos(lat, lon, lat0, lon0, radar_obj.range['data'],
+                                float(radar_obj.fixed_angle['data'][0]), self.num_bins)
+            self._tablas[clave] = tabla
+            logger.info(f"Tabla de {len(lat)} puntos creada para {self.radar}")
+
+        return tabla
+
+    def extraer_volumen(self, radar_obj):
+        """Reflectividad interpolada en cada punto desde el sweep más bajo"""
+        sweep = datos_sweep(radar_obj, self.campo, 0)
+        if sweep is None:
+            return None
+        datos, azimuts = sweep
+        return self._tabla(radar_obj).interpolar(datos, azimuts)
+
+    def extraer_archivo(self, ruta):
+        """Lee solo el campo necesario de un volumen y extrae los puntos"""
+        radar_obj = leer_volumen(ruta, campos=[self.campo])
+        if radar_obj is None:
+            return None
+        return self.extraer_volumen(radar_obj)
+
+    def procesar(self, inicio=None, fin=None, num_workers=None):
+        """
+        Serie de tiempo de todos los volúmenes descargados en el rango
+
+        Los volúmenes se reparten entre procesos; cada worker conserva sus
+        tablas de puntos entre volúmenes.
+
+        Returns:
+            DataFrame largo con timestamp, punto, reflectividad_dbz y lluvia_mmh
+        """
+        volumenes = listar_volumenes(self.radar, self.data_dir, inicio, fin)
+        if not volumenes:
+            return pd.DataFrame(columns=['timestamp', 'punto', 'reflectividad_dbz', 'lluvia_mmh'])
+
+        num_workers = num_workers or max(1, (os.cpu_count() or 2) - 1)
+        logger.info(f"📍 Extrayendo {len(self.puntos)} puntos de {len(volumenes)} volúmenes "
+                    f"con {num_workers} workers")
+
+        rutas = [str(ruta) for _, ruta in volumenes]
+        if num_workers == 1:
+            valores = [self.extraer_archivo(ruta) for ruta in rutas]
+        else:
+            with ProcessPoolExecutor(max_workers=num_workers, initializer=_inicializar_worker,
+                                     initargs=(self.radar, self.puntos, str(self.data_dir),
+                                               self.campo, self.num_bins)) as executor:
+                valores = list(executor.map(_extraer_en_worker, rutas, chunksize=16))
+
+        nombres = list(self.puntos)
+        timestamps = [ts for (ts, _), v in zip(volumenes, valores) if v is not None]
+        matriz = np.array([v for v in valores if v is not None], dtype=np.float32)
+
+        if matriz.size == 0:
+            return pd.DataFrame(columns=['timestamp', 'punto', 'reflectividad_dbz', 'lluvia_mmh'])
+
+        df = pd.DataFrame({
+            'timestamp': np.repeat(timestamps, len(nombres)),
+            'punto': np.tile(nombres, len(timestamps)),
+            'reflectividad_dbz': matriz.ravel(),
+        })
+        # reflectividad_a_lluvia lleva NaN a 0 (útil al acumular); aquí un punto fuera de
+        # cobertura o sin dato debe seguir siendo NaN y no confundirse con "sin lluvia"
+        dbz = df['reflectividad_dbz'].to_numpy()
+        df['lluvia_mmh'] = np.where(np.isnan(dbz), np.nan, reflectividad_a_lluvia(dbz))
+        return df
+
+    def guardar(self, df, output_dir="productos_radar/series"):
+        """Guarda la serie en CSV comprimido"""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        if df.empty:
+            logger.warning("Serie vacía, no se guarda")
+            return None
+
+        inicio = pd.Timestamp(df['timestamp'].min())
+        fin = pd.Timestamp(df['timestamp'].max())
+        ruta = output_dir / f"series_{self.radar.lower()}_{inicio:%Y%m%d%H%M}_{fin:%Y%m%d%H%M}.csv.gz"
+        df.to_csv(ruta, index=False, float_format='%.2f', compression='gzip')
+
+        logger.info(f"💾 Serie guardada en: {ruta}")
+        return ruta
+
+
+# Extractor propio de cada worker (conserva sus tablas entre volúmenes)
+_EXTRACTOR = None
+
+
+def _inicializar_worker(radar, puntos, data_dir, campo, num_bins):
+    global _EXTRACTOR
+    _EXTRACTOR = ExtractorPuntos(radar, puntos, data_dir, campo, num_bins)
+
+
+def _extraer_en_worker(ruta):
+    return _EXTRACTOR.extraer_archivo(ruta)
+
+
+def main():
+    """Serie de tiempo de los puntos por defecto para los datos descargados de Barrancabermeja"""
+    print("📍 SERIES DE TIEMPO PUNTUALES - RADAR BARRANCABERMEJA 📍")
+
+    extractor = ExtractorPuntos('Barrancabermeja')
+    df = extractor.procesar()
+    ruta = extractor.guardar(df)
+
+    if ruta:
+        print(f"\n✅ {len(df)} registros guardados en: {ruta}")
+        print(df.groupby('punto')['lluvia_mmh'].max().to_string())
+
+
+if __name__ == "__main__":
+    main()
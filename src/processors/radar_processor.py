@@ -4,14 +4,14 @@ Procesa archivos descargados y genera visualizaciones
 """
 
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import plotly.graph_objects as go
-import plotly.express as px
 from pathlib import Path
 from datetime import datetime
 import logging
-import sys
+
+from src.data_sources.radar_inventory import InventarioRadar
+
+# pandas y plotly se importan en los métodos que los usan: RADARES_IDEAM se
+# importa desde módulos que no generan gráficos
 
 logger = logging.getLogger(__name__)
 
@@ -68,16 +68,35 @@ class RadarDataProcessor:
             'RAIN': 'Acumulado de Precipitación',
             'VIL': 'Vertically Integrated Liquid'
         }
+        
+        # Inventario en memoria (se recarga cuando cambia la versión del índice)
+        self._inventario = None
+        self._inventario_df = None
+        self._inventario_version = None
     
     def leer_inventario(self):
-        """Lee el inventario de archivos disponibles"""
-        inventario_path = self.data_dir / 'inventario_radares.csv'
-        
-        if not inventario_path.exists():
+        """
+        Lee el inventario de archivos disponibles desde el índice SQLite
+        
+        El DataFrame se conserva en memoria mientras el índice no cambie; el
+        índice se reconcilia completo con el disco la primera vez (aunque el
+        descargador ya haya registrado archivos sueltos).
+        """
+        if not self.data_dir.exists():
             logger.warning("No se encuentra inventario. Ejecute primero el descargador.")
             return None
         
-        return pd.read_csv(inventario_path)
+        if self._inventario is None:
+            self._inventario = InventarioRadar(self.data_dir, RADARES_IDEAM)
+            if not self._inventario.reconciliado():
+                self._inventario.reconciliar()
+        
+        version = self._inventario.version()
+        if self._inventario_df is None or version != self._inventario_version:
+            self._inventario_df = self._inventario.como_dataframe()
+            self._inventario_version = version
+        
+        return self._inventario_df
     
     def analizar_disponibilidad(self, radar='Barrancabermeja'):
         """Analiza la disponibilidad de datos por fecha"""
@@ -95,6 +114,8 @@ class RadarDataProcessor:
             print(f"Radares disponibles: {inventario['radar'].unique().tolist()}")
             return None
         
+        import pandas as pd
+        
         # Convertir fechas
         datos_radar['fecha'] = pd.to_datetime(datos_radar['fecha_directorio'])
         
@@ -115,6 +136,8 @@ class RadarDataProcessor:
         if resumen is None:
             return None
         
+        import plotly.graph_objects as go
+        
         # Crear figura con subplots
         fig = go.Figure()
         
@@ -141,6 +164,9 @@ class RadarDataProcessor:
     
     def crear_mapa_cobertura(self):
         """Crea mapa de cobertura de radares"""
+        import pandas as pd
+        import plotly.graph_objects as go
+        
         # Preparar datos para el mapa
         radar_data = []
         for codigo, info in RADARES_IDEAM.items():
@@ -287,6 +313,14 @@ class RadarDataProcessor:
         radares = inventario['radar'].unique().tolist()
         return radares
 
+    def generar_productos_columna(self, radar='Barrancabermeja', inicio=None, fin=None,
+                                  output_base="productos_radar"):
+        """Calcula los productos MAX, topes de eco y VIL de los volúmenes descargados"""
+        from src.processors.radar_column_products import MotorProductosColumna
+
+        motor = MotorProductosColumna()
+        return motor.procesar_volumenes(radar, self.data_dir, inicio, fin, output_base)
+
 
 class EnhancedClimateDashboard:
     """Dashboard climático mejorado con datos de radar"""
@@ -377,6 +411,8 @@ class EnhancedClimateDashboard:
         comparacion.columns = ['Radar', 'Archivos', 'Tamaño_MB']
         comparacion['Tamaño_MB'] = comparacion['Tamaño_MB'].round(2)
         
+        import plotly.graph_objects as go
+        
         # Crear visualización
         fig = go.Figure()
         
@@ -0,0 +1,184 @@
+"""
+Rasterizador rápido de PPI con numpy (vistas rápidas sin matplotlib)
+Precalcula por geometría de radar el mapa pixel -> (rayo, gate) y colorea con una LUT
+"""
+
+import numpy as np
+from pathlib import Path
+import logging
+
+from src.processors.radar_geometry import RejillaCartesiana, firma_sweep, tabla_para_sweep, rayos_por_bin
+from src.processors.radar_volumes import listar_volumenes, leer_volumen, datos_sweep
+
+logger = logging.getLogger(__name__)
+
+# Colormap y rango de valores por campo (matplotlib, vmin, vmax)
+PALETAS_CAMPOS = {
+    'reflectivity': ('turbo', -10.0, 70.0),
+    'velocity': ('RdBu_r', -30.0, 30.0),
+    'spectrum_width': ('viridis', 0.0, 10.0),
+    'differential_reflectivity': ('RdYlBu_r', -2.0, 8.0),
+    'cross_correlation_ratio': ('plasma', 0.7, 1.0),
+    'specific_differential_phase': ('coolwarm', -2.0, 5.0),
+    'differential_phase': ('twilight', 0.0, 360.0),
+}
+
+
+class RasterizadorPPI:
+    """Convierte sweeps a imágenes RGBA con un solo indexado y una LUT de colores"""
+
+    def __init__(self, tamaño=800, alcance_m=None, num_bins=360, fondo=None):
+        """
+        Args:
+            tamaño: lado de la imagen en pixeles
+            alcance_m: radio representado (None usa el alcance máximo del radar)
+            num_bins: bins azimutales de la tabla de índices
+            fondo: color RGBA de pixeles sin eco (None = transparente)
+        """
+        self.tamaño = tamaño
+        self.alcance_m = alcance_m
+        self.num_bins = num_bins
+        self.fondo = np.zeros(4, dtype=np.uint8) if fondo is None else np.asarray(fondo, dtype=np.uint8)
+        self._rejillas = {}
+        self._luts = {}
+        self._mapas = {}
+
+    def _rejilla(self, radar):
+        """Rejilla de pixeles (una por alcance); la tabla se cachea por geometría de sweep"""
+        alcance = self.alcance_m or float(radar.range['data'][-1])
+        rejilla = self._rejillas.get(alcance)
+        if rejilla is None:
+            rejilla = RejillaCartesiana(alcance, 2.0 * alcance / self.tamaño)
+            self._rejillas[alcance] = rejilla
+        return rejilla
+
+    def _lut(self, campo, datos):
+        """LUT de colores (índice 0 = sin dato) y rango (vmin, vmax) de un campo"""
+        if campo in PALETAS_CAMPOS:
+            cmap, vmin, vmax = PALETAS_CAMPOS[campo]
+        else:
+            cmap = 'viridis'
+            validos = np.ma.compressed(np.ma.masked_invalid(datos))
+            vmin, vmax = (float(validos.min()), float(validos.max())) if validos.size else (0.0, 1.0)
+            if vmax <= vmin:
+                # Campo constante: un rango mínimo evita dividir por cero al cuantizar
+                vmax = vmin + 1.0
+
+        if cmap not in self._luts:
+            import matplotlib
+            colores = (matplotlib.colormaps[cmap](np.linspace(0, 1, 255)) * 255).astype(np.uint8)
+            self._luts[cmap] = np.vstack([self.fondo[None, :], colores])
+        return self._luts[cmap], vmin, vmax
+
+    def rasterizar(self, radar, campo='reflectivity', sweep=0):
+        """
+        Imagen RGBA (tamaño x tamaño, norte arriba) de un campo en un sweep
+
+        Los valores se cuantizan a índices de color en coordenadas polares
+        (rayos x gates, mucho menor que la imagen) y luego cada pixel toma su
+        índice con un solo indexado a través de la tabla pixel -> (rayo, gate).
+
+        Returns:
+            array uint8 (alto, ancho, 4) o None si el campo no existe
+        """
+        sweep_datos = datos_sweep(radar, campo, sweep)
+        if sweep_datos is None:
+            return None
+        datos, azimuts = sweep_datos
+
+        lut, vmin, vmax = self._lut(campo, datos)
+        valores = np.ma.filled(np.ma.asarray(datos, dtype=np.float32), np.nan)
+        with np.errstate(invalid='ignore'):
+            niveles = np.clip((valores - vmin) * (254.0 / (vmax - vmin)), 0, 254)
+        indices_color = np.where(np.isnan(valores), 0, niveles + 1).astype(np.uint8)
+
+        rejilla = self._rejilla(radar)
+        tabla = tabla_para_sweep(radar, sweep, rejilla, self.num_bins)
+        geometria = (rejilla.clave, firma_sweep(radar, sweep, self.num_bins))
+        celdas, indice_polar = self._mapa_pixeles(tabla, geometria, azimuts, indices_color.shape[1])
+
+        pixeles = np.zeros(int(np.prod(tabla.forma)), dtype=np.uint8)
+        pixeles[celdas] = indices_color.ravel()[indice_polar]
+
+        return lut[pixeles.reshape(tabla.forma)[::-1]]
+
+    def _mapa_pixeles(self, tabla, geometria, azimuts, num_gates):
+        """
+        Pixeles cubiertos y su índice plano (rayo * gates + gate) en el sweep
+
+        Se cachea por geometría (rejilla y firma del sweep, la misma clave de la
+        tabla) y disposición de azimuts: volúmenes sucesivos con la misma estrategia
+        de escaneo reutilizan el mapa completo. No se usa id(tabla): Python puede
+        reutilizar el id de una tabla ya liberada para otra geometría.
+        """
+        clave = (geometria, num_gates, np.round(np.asarray(azimuts), 1).tobytes())
+        mapa = self._mapas.get(clave)
+
+        if mapa is None:
+            rayo = rayos_por_bin(azimuts, self.num_bins)[tabla.idx_bin]
+            hay_rayo = rayo >= 0
+            mapa = (tabla.celdas[hay_rayo],
+                    (rayo[hay_rayo] * num_gates + tabla.idx_gate[hay_rayo]).astype(np.int64))
+            if len(self._mapas) >= 32:
+                self._mapas.pop(next(iter(self._mapas)))
+            self._mapas[clave] = mapa
+
+        return mapa
+
+    def guardar(self, rgba, output_path, formato=None):
+        """Escribe la imagen en PNG o WebP según la extensión (o el formato dado)"""
+        from PIL import Image
+
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        formato = (formato or output_path.suffix.lstrip('.') or 'png').lower()
+
+        imagen = Image.fromarray(rgba, 'RGBA')
+        if formato == 'webp':
+            imagen.save(output_path, format='WEBP', quality=80, method=0)
+        else:
+            imagen.save(output_path, format='PNG', compress_level=3)
+        return output_path
+
+    def generar(self, radar, campo='reflectivity', sweep=0, output_path=None):
+        """Rasteriza y guarda una vista rápida; retorna la ruta o None"""
+        rgba = self.rasterizar(radar, campo, sweep)
+        if rgba is None:
+            logger.warning(f"Campo {campo} no disponible en sweep {sweep}")
+            return None
+        return self.guardar(rgba, output_path or f"ppi_{campo}_s{sweep}.png")
+
+    def generar_volumen(self, radar, output_dir, sweep=0, formato='png'):
+        """Vista rápida de cada campo del volumen"""
+        output_dir = Path(output_dir)
+        rutas = []
+        for campo in radar.fields:
+            ruta = self.generar(radar, campo, sweep, output_dir / f"rapido_{campo}_s{sweep}.{formato}")
+            if ruta:
+                rutas.append(ruta)
+        return rutas
+
+
+def main():
+    """Vistas rápidas de reflectividad para los volúmenes descargados de Barrancabermeja"""
+    import time
+
+    print("⚡ VISTAS RÁPIDAS DE PPI - RADAR BARRANCABERMEJA ⚡")
+
+    rasterizador = RasterizadorPPI()
+    volumenes = listar_volumenes('Barrancabermeja')
+
+    for _, ruta in volumenes:
+        radar = leer_volumen(ruta, campos=['reflectivity'])
+        if radar is None:
+            continue
+
+        inicio = time.perf_counter()
+        salida = rasterizador.generar(radar, 'reflectivity', 0,
+                                      Path("productos_radar") / ruta.stem / "rapido_reflectivity_s0.png")
+        if salida:
+            print(f"  {salida} ({(time.perf_counter() - inicio) * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
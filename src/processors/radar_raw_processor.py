@@ -4,9 +4,6 @@ Lee y procesa datos en formato IRIS/Sigmet
 """
 
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import plotly.graph_objects as go
 from pathlib import Path
 from datetime import datetime
 import struct
@@ -15,11 +12,7 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-# Configuración de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# pandas y matplotlib se importan en los métodos que los usan
 
 
 class RadarRawProcessor:
@@ -42,6 +35,8 @@ class RadarRawProcessor:
     
     def listar_archivos_raw(self, radar=None):
         """Lista todos los archivos RAW disponibles"""
+        import pandas as pd
+        
         archivos = []
         
         if radar:
@@ -240,6 +235,8 @@ class RadarRawProcessor:
                     continue
             
             if reflectividad:
+                import pandas as pd
+                
                 logger.info(f"Extraídos {len(reflectividad)} valores de reflectividad")
                 return pd.DataFrame(reflectividad)
             else:
@@ -287,6 +284,8 @@ class RadarRawProcessor:
             logger.warning("No se encontraron archivos RAW")
             return None
         
+        import pandas as pd
+        
         logger.info(f"Procesando {min(len(archivos), limite)} archivos...")
         
         reportes = []
@@ -320,6 +319,8 @@ class RadarVisualizador:
             logger.warning("No hay datos para visualizar")
             return None
         
+        import matplotlib.pyplot as plt
+        
         fig, ax = plt.subplots(figsize=(10, 10), subplot_kw=dict(projection='polar'))
         
         # Crear visualización polar simple
@@ -483,6 +484,11 @@ def menu_analisis():
 
 def main():
     """Función principal"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    
     print("🔬 PROCESADOR DE ARCHIVOS RAW DE RADAR IDEAM 🔬")
     menu_analisis()
 
@@ -0,0 +1,104 @@
+"""
+Pipeline paralelo de generación de productos de radar
+Reparte volúmenes entre procesos con backend Agg y omite productos vigentes
+"""
+
+import os
+from pathlib import Path
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import logging
+
+from src.processors.radar_volumes import listar_volumenes
+
+logger = logging.getLogger(__name__)
+
+# Procesador propio de cada worker (conserva plantillas de figura y colormaps)
+_PROCESADOR = None
+
+
+def _inicializar_worker(data_dir):
+    """Configura matplotlib sin interfaz gráfica y crea el procesador del worker"""
+    global _PROCESADOR
+
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+
+    from src.processors.radar_advanced_processor import RadarAdvancedProcessor
+    _PROCESADOR = RadarAdvancedProcessor(data_dir)
+
+
+def _procesar_en_worker(ruta_archivo, output_dir, forzar):
+    """Genera los productos de un volumen dentro de un worker"""
+    try:
+        return _PROCESADOR.procesar_archivo_completo(ruta_archivo, output_dir, forzar=forzar)
+    except Exception as e:
+        logger.error(f"Error procesando {ruta_archivo}: {e}")
+        return None
+
+
+class PipelineRenderizado:
+    """Genera productos de muchos volúmenes en paralelo"""
+
+    def __init__(self, data_dir="data/Radar_IDEAM", output_base="productos_radar", num_workers=None):
+        self.data_dir = Path(data_dir)
+        self.output_base = Path(output_base)
+        self.num_workers = num_workers or max(1, (os.cpu_count() or 2) - 1)
+
+    def procesar_archivos(self, rutas, forzar=False):
+        """
+        Procesa una lista de volúmenes repartiéndolos en un pool de procesos
+
+        Cada worker lee su volumen una sola vez y genera todos sus productos;
+        los que no cambiaron desde la última ejecución se omiten.
+        """
+        rutas = [Path(r) for r in rutas]
+        if not rutas:
+            logger.warning("No hay volúmenes para procesar")
+            return []
+
+        logger.info(f"🔄 Procesando {len(rutas)} volúmenes con {self.num_workers} workers")
+
+        resultados = []
+        with ProcessPoolExecutor(max_workers=self.num_workers,
+                                 initializer=_inicializar_worker,
+                                 initargs=(str(self.data_dir),)) as executor:
+            futuros = {
+                executor.submit(_procesar_en_worker, str(ruta),
+                                str(self.output_base / ruta.stem), forzar): ruta
+                for ruta in rutas
+            }
+            for futuro in as_completed(futuros):
+                resultado = futuro.result()
+                if resultado:
+                    resultados.append(resultado)
+
+        generados = sum(len(r['productos_generados']) for r in resultados)
+        omitidos = sum(len(r['productos_omitidos']) for r in resultados)
+        logger.info(f"✅ {len(resultados)}/{len(rutas)} volúmenes: "
+                    f"{generados} productos generados, {omitidos} vigentes omitidos")
+
+        return resultados
+
+    def procesar_dia(self, radar, fecha, forzar=False):
+        """Procesa todos los volúmenes descargados de un radar para una fecha"""
+        inicio = datetime(fecha.year, fecha.month, fecha.day)
+        fin = inicio + timedelta(days=1) - timedelta(microseconds=1)
+
+        volumenes = listar_volumenes(radar, self.data_dir, inicio, fin)
+        return self.procesar_archivos([ruta for _, ruta in volumenes], forzar=forzar)
+
+
+def main():
+    """Procesa en paralelo los volúmenes de ayer del radar Barrancabermeja"""
+    print("🔬 PIPELINE PARALELO DE PRODUCTOS DE RADAR 🔬")
+
+    pipeline = PipelineRenderizado()
+    fecha = datetime.now() - timedelta(days=1)
+    resultados = pipeline.procesar_dia('Barrancabermeja', fecha)
+
+    print(f"\n✅ Volúmenes procesados: {len(resultados)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Pipeline de descarga y decodificación en memoria desde S3
+Los volúmenes se descargan a buffers mientras los ya descargados se decodifican
+en otros procesos; en disco solo quedan los productos (los crudos son opcionales)
+"""
+
+import io
+import os
+import threading
+from pathlib import Path
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import logging
+
+from src.processors.radar_advanced_processor import RadarAdvancedProcessor, VERSION_PRODUCTOS
+
+logger = logging.getLogger(__name__)
+
+# Procesador propio de cada worker (conserva plantillas de figura y colormaps)
+_PROCESADOR = None
+
+
+def _inicializar_worker():
+    """Configura matplotlib sin interfaz gráfica y crea el procesador del worker"""
+    global _PROCESADOR
+
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+
+    _PROCESADOR = RadarAdvancedProcessor()
+
+
+def _procesar_en_worker(datos, key, output_dir, firma_entrada, forzar):
+    """Decodifica un volumen desde bytes y genera sus productos"""
+    try:
+        radar = _PROCESADOR.leer_desde_memoria(datos, key)
+        del datos
+        if radar is None:
+            return None
+        return _PROCESADOR.procesar_radar(radar, key, output_dir, firma_entrada, forzar=forzar)
+    except Exception as e:
+        logger.error(f"Error procesando {key}: {e}")
+        return None
+
+
+class PipelineStreamingS3:
+    """Descarga volúmenes de S3 a memoria y los procesa en paralelo"""
+
+    def __init__(self, downloader=None, output_base="productos_radar", max_descargas=4,
+                 num_workers=None, en_vuelo=None, guardar_crudos=False):
+        """
+        Args:
+            downloader: IDEAMRadarDownloader (se crea uno si es None)
+            output_base: directorio base de productos
+            max_descargas: descargas simultáneas
+            num_workers: procesos de decodificación y renderizado
+            en_vuelo: máximo de volúmenes descargados pendientes de procesar (limita la memoria)
+            guardar_crudos: guardar también el volumen en data/Radar_IDEAM
+        """
+        if downloader is None:
+            from src.data_sources.ideam_radar_downloader import IDEAMRadarDownloader
+            downloader = IDEAMRadarDownloader()
+
+        self.downloader = downloader
+        self.output_base = Path(output_base)
+        self.max_descargas = max_descargas
+        self.num_workers = num_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.en_vuelo = en_vuelo or 2 * self.num_workers
+        self.guardar_crudos = guardar_crudos
+        self.procesador = RadarAdvancedProcessor()
+
+    def descargar_en_memoria(self, key):
+        """Descarga un objeto completo a memoria (multiparte en paralelo si es grande)"""
+        buffer = io.BytesIO()
+        self.downloader.s3_client.download_fileobj(self.downloader.bucket_name, key, buffer)
+        return buffer.getvalue()
+
+    def _firma_objeto(self, objeto):
+        """Identifica el contenido de un objeto S3 sin descargarlo"""
+        return {
+            'etag': objeto.get('etag'),
+            'tamaño': objeto['size'],
+            'version': VERSION_PRODUCTOS
+        }
+
+    def _guardar_crudo(self, radar, key, datos):
+        """Persiste el volumen descargado (escritura atómica) y lo registra en el inventario"""
+        from src.processors.radar_volumes import parsear_timestamp
+
+        timestamp = parsear_timestamp(key) or datetime.now()
+        destino = self.downloader.base_dir / radar / timestamp.strftime("%Y%m%d") / Path(key).name
+        destino.parent.mkdir(parents=True, exist_ok=True)
+
+        temporal = destino.with_name(destino.name + '.part')
+        temporal.write_bytes(datos)
+        os.replace(temporal, destino)
+        self.downloader.inventario.registrar(radar, destino)
+
+    def procesar_objetos(self, radar, objetos, forzar=False):
+        """
+        Descarga y procesa una lista de objetos (formato de listar_archivos_disponibles)
+
+        Los objetos cuyos productos ya están al día según su ETag se omiten
+        antes de descargarlos.
+        """
+        pendientes = []
+        omitidos = 0
+        for objeto in objetos:
+            output_dir = self.output_base / Path(objeto['key']).stem
+            firma = self._firma_objeto(objeto)
+            if not forzar and self.procesador.productos_al_dia(output_dir, firma) is not None:
+                omitidos += 1
+                continue
+            pendientes.append((objeto, output_dir, firma))
+
+        if not pendientes:
+            logger.info(f"⏭️  {omitidos} volúmenes al día, nada que procesar")
+            return []
+
+        logger.info(f"🌊 Procesando {len(pendientes)} volúmenes desde S3 en memoria "
+                    f"({self.max_descargas} descargas, {self.num_workers} workers, {omitidos} al día)")
+
+        cupos = threading.BoundedSemaphore(self.en_vuelo)
+        resultados = []
+
+        with ThreadPoolExecutor(max_workers=self.max_descargas) as descargas, \
+                ProcessPoolExecutor(max_workers=self.num_workers,
+                                    initializer=_inicializar_worker) as workers:
+
+            def descargar_y_encolar(objeto, output_dir, firma):
+                try:
+                    datos = self.descargar_en_memoria(objeto['key'])
+                    if self.guardar_crudos:
+                        self._guardar_crudo(radar, objeto['key'], datos)
+                    futuro = workers.submit(_procesar_en_worker, datos, objeto['key'],
+                                            str(output_dir), firma, forzar)
+                except Exception as e:
+                    cupos.release()
+                    logger.error(f"❌ Error descargando {objeto['key']}: {e}")
+                    return None
+
+                # El cupo se libera cuando el worker termina con el volumen
+                futuro.add_done_callback(lambda _: cupos.release())
+                return futuro
+
+            encolados = []
+            for pendiente in pendientes:
+                cupos.acquire()
+                encolados.append(descargas.submit(descargar_y_encolar, *pendiente))
+
+            for encolado in encolados:
+                futuro = encolado.result()
+                if futuro is None:
+                    continue
+                resultado = futuro.result()
+                if resultado:
+                    resultados.append(resultado)
+
+        generados = sum(len(r['productos_generados']) for r in resultados)
+        logger.info(f"✅ {len(resultados)}/{len(pendientes)} volúmenes procesados, "
+                    f"{generados} productos generados")
+        return resultados
+
+    def procesar_recientes(self, radar='Barrancabermeja', fecha=None, limite=12, forzar=False):
+        """Procesa los `limite` volúmenes más recientes de un radar en una fecha"""
+        if fecha is None:
+            fecha = datetime.now() - timedelta(days=1)
+
+        objetos = self.downloader.listar_archivos_disponibles(radar, fecha)
+        objetos = sorted(objetos, key=lambda o: o['key'])[-limite:] if limite else objetos
+        return self.procesar_objetos(radar, objetos, forzar=forzar)
+
+
+def main():
+    """Procesa en memoria los últimos volúmenes de ayer del radar Barrancabermeja"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    print("🌊 PIPELINE EN MEMORIA S3 → PRODUCTOS 🌊")
+
+    pipeline = PipelineStreamingS3()
+    resultados = pipeline.procesar_recientes('Barrancabermeja')
+
+    print(f"\n✅ Volúmenes procesados: {len(resultados)}")
+
+
+if __name__ == "__main__":
+    main()
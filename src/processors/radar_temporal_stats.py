@@ -0,0 +1,376 @@
+"""
+Reducciones temporales en streaming sobre secuencias de volúmenes de radar
+Máximo, media de eco, horas sobre umbral y percentiles con memoria O(rejilla)
+y estado en checkpoints para extender los productos diarios con volúmenes nuevos
+"""
+
+import os
+import numpy as np
+from pathlib import Path
+from datetime import datetime, timedelta
+import logging
+
+from src.processors.radar_geometry import RejillaCartesiana, tabla_para_sweep
+from src.processors.radar_volumes import listar_volumenes, leer_volumen, datos_sweep
+
+logger = logging.getLogger(__name__)
+
+
+class ReductorMaximo:
+    """Máximo acumulado por celda"""
+
+    def __init__(self, forma):
+        self.maximo = np.full(forma, -np.inf, dtype=np.float32)
+
+    def agregar(self, valores, horas):
+        np.fmax(self.maximo, valores, out=self.maximo)
+
+    def resultado(self):
+        return {'maximo': np.where(np.isfinite(self.maximo), self.maximo, np.nan)}
+
+    def estado(self):
+        return {'maximo': self.maximo}
+
+    def cargar(self, estado):
+        self.maximo = estado['maximo'].astype(np.float32)
+
+
+class ReductorMedia:
+    """Media de los valores con eco por celda (suma y conteo)"""
+
+    def __init__(self, forma):
+        self.suma = np.zeros(forma, dtype=np.float64)
+        self.conteo = np.zeros(forma, dtype=np.uint32)
+
+    def agregar(self, valores, horas):
+        con_eco = np.isfinite(valores)
+        self.suma[con_eco] += valores[con_eco]
+        self.conteo += con_eco
+
+    def resultado(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media = np.where(self.conteo > 0, self.suma / self.conteo, np.nan)
+        return {'media': media.astype(np.float32), 'volumenes_con_eco': self.conteo.copy()}
+
+    def estado(self):
+        return {'suma': self.suma, 'conteo': self.conteo}
+
+    def cargar(self, estado):
+        self.suma = estado['suma'].astype(np.float64)
+        self.conteo = estado['conteo'].astype(np.uint32)
+
+
+class ReductorUmbral:
+    """Horas y número de volúmenes con valor igual o superior a un umbral"""
+
+    def __init__(self, forma, umbral=35.0):
+        self.umbral = umbral
+        self.horas = np.zeros(forma, dtype=np.float32)
+        self.conteo = np.zeros(forma, dtype=np.uint32)
+
+    def agregar(self, valores, horas):
+        with np.errstate(invalid='ignore'):
+            sobre = valores >= self.umbral
+        self.horas[sobre] += horas
+        self.conteo += sobre
+
+    def resultado(self):
+        return {f'horas_sobre_{self.umbral:g}': self.horas.copy(),
+                f'volumenes_sobre_{self.umbral:g}': self.conteo.copy()}
+
+    def estado(self):
+        return {'horas': self.horas, 'conteo': self.conteo}
+
+    def cargar(self, estado):
+        self.horas = estado['horas'].astype(np.float32)
+        self.conteo = estado['conteo'].astype(np.uint32)
+
+
+class ReductorPercentiles:
+    """
+    Percentiles aproximados con un histograma fijo por celda
+
+    Cada celda guarda conteos en bins de ancho fijo (memoria O(rejilla x bins),
+    independiente del número de volúmenes). Los gates sin eco cuentan en el
+    primer bin, así el percentil refleja la fracción del tiempo con eco.
+    """
+
+    def __init__(self, forma, percentiles=(50, 90, 99), vmin=-10.0, vmax=70.0, ancho_bin=2.5):
+        self.percentiles = tuple(percentiles)
+        self.vmin = vmin
+        self.ancho_bin = ancho_bin
+        self.num_bins = int(np.ceil((vmax - vmin) / ancho_bin))
+        self.forma = tuple(forma)
+        self.histograma = np.zeros((self.num_bins,) + self.forma, dtype=np.uint16)
+
+    def agregar(self, valores, horas):
+        cubiertas = ~np.isnan(valores)
+        with np.errstate(invalid='ignore'):
+            bins = np.clip((valores - self.vmin) // self.ancho_bin, 0, self.num_bins - 1)
+        bins = np.where(np.isneginf(valores), 0, bins)
+
+        # Cada celda recibe un solo incremento por volumen: no hay índices repetidos
+        celdas = np.flatnonzero(cubiertas)
+        self.histograma.reshape(self.num_bins, -1)[bins.ravel()[celdas].astype(np.intp), celdas] += 1
+
+    def resultado(self):
+        acumulado = np.cumsum(self.histograma, axis=0, dtype=np.uint32)
+        total = acumulado[-1]
+        salida = {}
+        for p in self.percentiles:
+            objetivo = total * (p / 100.0)
+            # Primer bin cuyo acumulado alcanza el objetivo, interpolando dentro del bin
+            indice = np.minimum((acumulado < objetivo[None]).sum(axis=0), self.num_bins - 1)
+            previo = np.where(indice > 0, np.take_along_axis(acumulado, np.maximum(indice - 1, 0)[None], 0)[0], 0)
+            en_bin = np.take_along_axis(self.histograma, indice[None], 0)[0].astype(np.float32)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                fraccion = np.where(en_bin > 0, (objetivo - previo) / en_bin, 0.5)
+            valor = self.vmin + (indice + np.clip(fraccion, 0.0, 1.0)) * self.ancho_bin
+            salida[f'p{p:g}'] = np.where(total > 0, valor, np.nan).astype(np.float32)
+        return salida
+
+    def estado(self):
+        return {'histograma': self.histograma}
+
+    def cargar(self, estado):
+        self.histograma = estado['histograma'].astype(np.uint16)
+
+
+class ReduccionTemporal:
+    """
+    Pliega una secuencia ordenada de rejillas en un conjunto de reductores
+
+    Cada volumen pesa el tiempo transcurrido desde el anterior (limitado a
+    max_hueco); el primero pesa intervalo_nominal. El estado completo se
+    guarda y se restaura con checkpoints .npz.
+    """
+
+    def __init__(self, reductores, intervalo_nominal=timedelta(minutes=5),
+                 max_hueco=timedelta(minutes=15)):
+        """
+        Args:
+            reductores: dict nombre -> reductor (agregar, resultado, estado, cargar)
+            intervalo_nominal: tiempo representado por el primer volumen
+            max_hueco: tiempo máximo que puede representar un volumen
+        """
+        self.reductores = dict(reductores)
+        self.intervalo_nominal = intervalo_nominal
+        self.max_hueco = max_hueco
+        self.ultimo = None
+        self.num_volumenes = 0
+        self.horas_cubiertas = 0.0
+
+    def agregar(self, timestamp, valores):
+        """Agrega una rejilla observada en timestamp; retorna False si se ignoró"""
+        if self.ultimo is not None and timestamp <= self.ultimo:
+            logger.debug(f"Volumen fuera de orden o ya incluido ignorado: {timestamp}")
+            return False
+
+        intervalo = self.intervalo_nominal if self.ultimo is None else \
+            min(timestamp - self.ultimo, self.max_hueco)
+        horas = intervalo.total_seconds() / 3600.0
+
+        for reductor in self.reductores.values():
+            reductor.agregar(valores, horas)
+
+        self.ultimo = timestamp
+        self.num_volumenes += 1
+        self.horas_cubiertas += horas
+        return True
+
+    def resultados(self):
+        """Productos de todos los reductores en un solo dict"""
+        productos = {}
+        for reductor in self.reductores.values():
+            productos.update(reductor.resultado())
+        return productos
+
+    def guardar_checkpoint(self, ruta):
+        """Escribe el estado de forma atómica (un proceso puede leerlo mientras se actualiza)"""
+        ruta = Path(ruta)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+
+        arrays = {f"{nombre}__{clave}": valor
+                  for nombre, reductor in self.reductores.items()
+                  for clave, valor in reductor.estado().items()}
+        temporal = ruta.with_name(ruta.name + '.part')
+        with open(temporal, 'wb') as f:
+            np.savez(
+                f,
+                ultimo=self.ultimo.isoformat() if self.ultimo else '',
+                num_volumenes=self.num_volumenes,
+                horas_cubiertas=self.horas_cubiertas,
+                **arrays
+            )
+        os.replace(temporal, ruta)
+        return ruta
+
+    def cargar_checkpoint(self, ruta):
+        """Restaura el estado; retorna False si el checkpoint no existe"""
+        ruta = Path(ruta)
+        if not ruta.exists():
+            return False
+
+        with np.load(ruta) as datos:
+            ultimo = str(datos['ultimo'])
+            self.ultimo = datetime.fromisoformat(ultimo) if ultimo else None
+            self.num_volumenes = int(datos['num_volumenes'])
+            self.horas_cubiertas = float(datos['horas_cubiertas'])
+
+            for nombre, reductor in self.reductores.items():
+                prefijo = f"{nombre}__"
+                reductor.cargar({clave[len(prefijo):]: datos[clave]
+                                 for clave in datos.files if clave.startswith(prefijo)})
+        return True
+
+
+class EstadisticasDiariasRadar:
+    """Mapas diarios de máximo, media de eco, horas sobre umbral y percentiles de un radar"""
+
+    def __init__(self, radar='Barrancabermeja', data_dir="data/Radar_IDEAM",
+                 output_dir="productos_radar/estadisticas", alcance_m=240000, resolucion_m=1000,
+                 campo='reflectivity', sweep=0, umbral_dbz=35.0, percentiles=(50, 90, 99),
+                 origen=datetime(1970, 1, 1)):
+        """
+        Args:
+            radar: nombre del radar IDEAM
+            data_dir: directorio base de datos descargados
+            output_dir: directorio de checkpoints y productos
+            alcance_m, resolucion_m: definición de la rejilla fija
+            campo, sweep: campo y sweep reducidos
+            umbral_dbz: umbral del conteo de horas
+            percentiles: percentiles aproximados a calcular
+            origen: instante de alineación de los días (ej. 05:00 UTC para hora local)
+        """
+        self.radar = radar
+        self.data_dir = Path(data_dir)
+        self.output_dir = Path(output_dir) / radar
+        self.rejilla = RejillaCartesiana(alcance_m, resolucion_m)
+        self.campo = campo
+        self.sweep = sweep
+        self.umbral_dbz = umbral_dbz
+        self.percentiles = percentiles
+        self.origen = origen
+
+    def _nueva_reduccion(self):
+        forma = self.rejilla.forma
+        return ReduccionTemporal({
+            'maximo': ReductorMaximo(forma),
+            'media': ReductorMedia(forma),
+            'umbral': ReductorUmbral(forma, self.umbral_dbz),
+            'percentiles': ReductorPercentiles(forma, self.percentiles)
+        })
+
+    def rejilla_desde_volumen(self, radar_obj):
+        """Proyecta el sweep a la rejilla: NaN fuera de cobertura, -inf sin eco"""
+        sweep = datos_sweep(radar_obj, self.campo, self.sweep)
+        if sweep is None:
+            logger.warning(f"Campo {self.campo} no disponible en el volumen")
+            return None
+
+        datos, azimuts = sweep
+        tabla = tabla_para_sweep(radar_obj, self.sweep, self.rejilla)
+        return tabla.aplicar(datos, azimuts, relleno=np.nan, enmascarado=-np.inf)
+
+    def _inicio_dia(self, fecha):
+        dia = timedelta(days=1)
+        return self.origen + ((fecha - self.origen) // dia) * dia
+
+    def ruta_checkpoint(self, inicio_dia):
+        return self.output_dir / f"estado_{inicio_dia:%Y%m%d}.npz"
+
+    def actualizar(self, fecha=None):
+        """
+        Extiende el producto del día de `fecha` con los volúmenes nuevos
+
+        Se restaura el checkpoint del día y solo se leen los volúmenes
+        posteriores al último incluido; al terminar se guardan el checkpoint y
+        los productos.
+
+        Returns:
+            dict con los productos y metadatos, o None si no hay volúmenes
+        """
+        inicio = self._inicio_dia(fecha or datetime.now())
+        fin = inicio + timedelta(days=1)
+
+        reduccion = self._nueva_reduccion()
+        checkpoint = self.ruta_checkpoint(inicio)
+        if reduccion.cargar_checkpoint(checkpoint):
+            logger.info(f"♻️  Checkpoint {checkpoint.name}: {reduccion.num_volumenes} volúmenes "
+                        f"hasta {reduccion.ultimo}")
+
+        desde = reduccion.ultimo + timedelta(seconds=1) if reduccion.ultimo else inicio
+        volumenes = [(t, r) for t, r in listar_volumenes(self.radar, self.data_dir, desde, fin) if t < fin]
+
+        nuevos = 0
+        for timestamp, ruta in volumenes:
+            radar_obj = leer_volumen(ruta, campos=[self.campo])
+            if radar_obj is None:
+                continue
+            valores = self.rejilla_desde_volumen(radar_obj)
+            if valores is not None and reduccion.agregar(timestamp, valores):
+                nuevos += 1
+
+        if reduccion.num_volumenes == 0:
+            logger.warning(f"No hay volúmenes de {self.radar} para {inicio:%Y-%m-%d}")
+            return None
+
+        if nuevos:
+            reduccion.guardar_checkpoint(checkpoint)
+        logger.info(f"📊 {self.radar} {inicio:%Y-%m-%d}: {nuevos} volúmenes nuevos, "
+                    f"{reduccion.num_volumenes} en total")
+
+        resultado = {
+            'radar': self.radar,
+            'inicio': inicio,
+            'fin': fin,
+            'ultimo_volumen': reduccion.ultimo,
+            'num_volumenes': reduccion.num_volumenes,
+            'cobertura': min(1.0, reduccion.horas_cubiertas / 24.0),
+            'productos': reduccion.resultados()
+        }
+        if nuevos:
+            self.guardar_resultado(resultado)
+        return resultado
+
+    def guardar_resultado(self, resultado):
+        """Guarda los mapas del día en formato .npz comprimido"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        ruta = self.output_dir / f"estadisticas_{resultado['inicio']:%Y%m%d}.npz"
+
+        np.savez_compressed(
+            ruta,
+            x=self.rejilla.x1d,
+            y=self.rejilla.y1d,
+            inicio=str(resultado['inicio']),
+            ultimo_volumen=str(resultado['ultimo_volumen']),
+            num_volumenes=resultado['num_volumenes'],
+            cobertura=resultado['cobertura'],
+            **resultado['productos']
+        )
+        logger.info(f"💾 Estadísticas guardadas en: {ruta}")
+        return ruta
+
+
+def main():
+    """Actualiza las estadísticas de hoy del radar Barrancabermeja"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    print("📊 ESTADÍSTICAS DIARIAS - RADAR BARRANCABERMEJA 📊")
+
+    estadisticas = EstadisticasDiariasRadar('Barrancabermeja')
+    resultado = estadisticas.actualizar()
+
+    if resultado:
+        productos = resultado['productos']
+        print(f"\n✅ {resultado['num_volumenes']} volúmenes, cobertura {resultado['cobertura']:.0%}")
+        print(f"   Máximo: {np.nanmax(productos['maximo']):.1f} dBZ")
+        print(f"   Horas sobre {estadisticas.umbral_dbz:g} dBZ (máx): "
+              f"{np.nanmax(productos[f'horas_sobre_{estadisticas.umbral_dbz:g}']):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Generador de pirámides de teselas XYZ (slippy map) para productos de radar
+Renderiza CAPPI, tasa de lluvia o mosaicos en PNG/WebP solo donde hay ecos
+"""
+
+import json
+import numpy as np
+from pathlib import Path
+from datetime import datetime
+import logging
+
+from src.processors.radar_geometry import latlon_a_xy, xy_a_latlon
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de un pixel (m) en el ecuador para zoom 0 con teselas de 256 px
+METROS_PIXEL_Z0 = 156543.03392
+
+PALETAS = {
+    'reflectividad': {'cmap': 'turbo', 'vmin': 5.0, 'vmax': 70.0, 'umbral': 5.0, 'log': False},
+    'lluvia': {'cmap': 'YlGnBu', 'vmin': 0.1, 'vmax': 100.0, 'umbral': 0.1, 'log': True},
+    'acumulado': {'cmap': 'viridis', 'vmin': 1.0, 'vmax': 200.0, 'umbral': 1.0, 'log': True},
+}
+
+
+def lon_a_tesela(lon, zoom):
+    """Coordenada x fraccionaria de tesela para una longitud"""
+    return (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0 * (2 ** zoom)
+
+
+def lat_a_tesela(lat, zoom):
+    """Coordenada y fraccionaria de tesela para una latitud (Web Mercator)"""
+    lat = np.deg2rad(np.clip(np.asarray(lat, dtype=np.float64), -85.05, 85.05))
+    return (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0 * (2 ** zoom)
+
+
+def tesela_a_lon(x, zoom):
+    """Longitud correspondiente a una coordenada x fraccionaria de tesela"""
+    return np.asarray(x, dtype=np.float64) / (2 ** zoom) * 360.0 - 180.0
+
+
+def tesela_a_lat(y, zoom):
+    """Latitud correspondiente a una coordenada y fraccionaria de tesela"""
+    n = np.pi * (1.0 - 2.0 * np.asarray(y, dtype=np.float64) / (2 ** zoom))
+    return np.rad2deg(np.arctan(np.sinh(n)))
+
+
+class GeneradorTeselas:
+    """Renderiza rejillas de radar en una pirámide de teselas cacheada en disco"""
+
+    def __init__(self, output_dir="productos_radar/teselas", tamaño=256, formato='png'):
+        if formato not in ('png', 'webp'):
+            raise ValueError(f"Formato no soportado: {formato}")
+
+        self.output_dir = Path(output_dir)
+        self.tamaño = tamaño
+        self.formato = formato
+        self._luts = {}
+
+    def _lut(self, paleta):
+        """Tabla de 256 colores RGBA para una paleta (se construye una vez)"""
+        if paleta not in self._luts:
+            import matplotlib
+            cmap = matplotlib.colormaps[PALETAS[paleta]['cmap']]
+            self._luts[paleta] = (cmap(np.linspace(0, 1, 256)) * 255).astype(np.uint8)
+        return self._luts[paleta]
+
+    def colorear(self, valores, paleta='reflectividad'):
+        """Convierte valores a RGBA con la LUT de la paleta (transparente sin eco)"""
+        config = PALETAS[paleta]
+        valores = np.asarray(valores, dtype=np.float32)
+        hay_eco = ~np.isnan(valores) & (valores >= config['umbral'])
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if config['log']:
+                norm = ((np.log10(valores) - np.log10(config['vmin'])) /
+                        (np.log10(config['vmax']) - np.log10(config['vmin'])))
+            else:
+                norm = (valores - config['vmin']) / (config['vmax'] - config['vmin'])
+
+        indices = np.clip(np.nan_to_num(norm) * 255, 0, 255).astype(np.uint8)
+        rgba = self._lut(paleta)[indices]
+        rgba[~hay_eco] = 0
+        return rgba
+
+    def _guardar_tesela(self, rgba, ruta):
+        from PIL import Image
+
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        imagen = Image.fromarray(rgba, 'RGBA')
+        if self.formato == 'png':
+            imagen.save(ruta, format='PNG', optimize=True)
+        else:
+            imagen.save(ruta, format='WEBP', quality=80)
+
+    def _zoom_util(self, resolucion_m, lat_media, zoom_max):
+        """Zoom a partir del cual los pixeles son más finos que la rejilla de datos"""
+        metros_pixel = METROS_PIXEL_Z0 * np.cos(np.deg2rad(lat_media)) * 256.0 / self.tamaño
+        return int(min(zoom_max, max(0, np.ceil(np.log2(metros_pixel / (resolucion_m / 2.0))))))
+
+    def _generar(self, muestrear, lat_eco, lon_eco, medio_lado_deg, resolucion_m,
+                 producto, marca, paleta, zoom_min, zoom_max):
+        """Recorre los zooms renderizando solo las teselas que contienen ecos"""
+        destino = self.output_dir / producto / marca
+        resumen = {}
+
+        if len(lat_eco) == 0:
+            logger.info(f"Sin ecos en {producto} {marca}; no se generan teselas")
+            return {'producto': producto, 'marca': marca, 'teselas_por_zoom': resumen}
+
+        zoom_max = self._zoom_util(resolucion_m, float(np.mean(lat_eco)), zoom_max)
+
+        for zoom in range(zoom_min, zoom_max + 1):
+            # Esquinas de cada celda con eco para no perder teselas vecinas
+            oeste = np.floor(lon_a_tesela(lon_eco - medio_lado_deg[1], zoom))
+            este = np.floor(lon_a_tesela(lon_eco + medio_lado_deg[1], zoom))
+            norte = np.floor(lat_a_tesela(lat_eco + medio_lado_deg[0], zoom))
+            sur = np.floor(lat_a_tesela(lat_eco - medio_lado_deg[0], zoom))
+            tx = np.concatenate([oeste, este, oeste, este]).astype(np.int64)
+            ty = np.concatenate([norte, norte, sur, sur]).astype(np.int64)
+            teselas = np.unique(np.stack([tx, ty], axis=1), axis=0)
+
+            generadas = 0
+            for x, y in teselas:
+                ruta = destino / str(zoom) / str(x) / f"{y}.{self.formato}"
+                if ruta.exists():
+                    continue
+
+                pixeles = (np.arange(self.tamaño) + 0.5) / self.tamaño
+                lat_px = tesela_a_lat(y + pixeles, zoom)
+                lon_px = tesela_a_lon(x + pixeles, zoom)
+
+                rgba = self.colorear(muestrear(lat_px, lon_px), paleta)
+                if not rgba[..., 3].any():
+                    continue
+
+                self._guardar_tesela(rgba, ruta)
+                generadas += 1
+
+            resumen[zoom] = generadas
+
+        metadata = {
+            'producto': producto,
+            'marca': marca,
+            'formato': self.formato,
+            'paleta': paleta,
+            'zoom_min': zoom_min,
+            'zoom_max': zoom_max,
+            'limites': {
+                'lat_min': float(np.min(lat_eco)), 'lat_max': float(np.max(lat_eco)),
+                'lon_min': float(np.min(lon_eco)), 'lon_max': float(np.max(lon_eco))
+            },
+            'teselas_por_zoom': resumen,
+            'generado': datetime.now().isoformat()
+        }
+        destino.mkdir(parents=True, exist_ok=True)
+        with open(destino / "metadata.json", 'w') as f:
+            json.dump(metadata, f, indent=2)
+
+        logger.info(f"🗺️  Teselas de {producto} {marca}: {sum(resumen.values())} nuevas en zooms "
+                    f"{zoom_min}-{zoom_max}")
+        return metadata
+
+    def generar_latlon(self, datos, lat1d, lon1d, producto, marca,
+                       paleta='reflectividad', zoom_min=4, zoom_max=11):
+        """
+        Genera teselas de una rejilla lat/lon regular (ej. mosaico nacional)
+
+        Args:
+            datos: array (lat, lon) con NaN donde no hay dato
+            lat1d, lon1d: centros de celda crecientes y equiespaciados
+            producto: nombre del producto (subdirectorio)
+            marca: marca temporal del producto (ej. 202602081200)
+        """
+        datos = np.asarray(datos, dtype=np.float32)
+        lat1d = np.asarray(lat1d, dtype=np.float64)
+        lon1d = np.asarray(lon1d, dtype=np.float64)
+        dlat = lat1d[1] - lat1d[0]
+        dlon = lon1d[1] - lon1d[0]
+
+        def muestrear(lat_px, lon_px):
+            filas = np.floor((lat_px - lat1d[0]) / dlat + 0.5).astype(np.int64)
+            cols = np.floor((lon_px - lon1d[0]) / dlon + 0.5).astype(np.int64)
+            fila_ok = (filas >= 0) & (filas < len(lat1d))
+            col_ok = (cols >= 0) & (cols < len(lon1d))
+
+            salida = np.full((len(filas), len(cols)), np.nan, dtype=np.float32)
+            salida[np.ix_(fila_ok, col_ok)] = datos[np.ix_(filas[fila_ok], cols[col_ok])]
+            return salida
+
+        f, c = np.nonzero(datos >= PALETAS[paleta]['umbral'])
+        resolucion_m = dlat * 111000.0
+
+        return self._generar(muestrear, lat1d[f], lon1d[c], (dlat / 2, dlon / 2), resolucion_m,
+                             producto, marca, paleta, zoom_min, zoom_max)
+
+    def generar_cartesiana(self, datos, x1d, y1d, lat0, lon0, producto, marca,
+                           paleta='reflectividad', zoom_min=5, zoom_max=11):
+        """
+        Genera teselas de una rejilla cartesiana centrada en un radar (CAPPI, QPE)
+
+        Args:
+            datos: array (y, x) con NaN donde no hay dato
+            x1d, y1d: centros de celda en metros relativos al radar
+            lat0, lon0: posición del radar
+        """
+        datos = np.asarray(datos, dtype=np.float32)
+        x1d = np.asarray(x1d, dtype=np.float64)
+        y1d = np.asarray(y1d, dtype=np.float64)
+        dx = x1d[1] - x1d[0]
+        dy = y1d[1] - y1d[0]
+
+        def muestrear(lat_px, lon_px):
+            lat, lon = np.meshgrid(lat_px, lon_px, indexing='ij')
+            x, y = latlon_a_xy(lat, lon, lat0, lon0)
+            cols = np.floor((x - x1d[0]) / dx + 0.5).astype(np.int64)
+            filas = np.floor((y - y1d[0]) / dy + 0.5).astype(np.int64)
+            ok = (filas >= 0) & (filas < len(y1d)) & (cols >= 0) & (cols < len(x1d))
+
+            salida = np.full(lat.shape, np.nan, dtype=np.float32)
+            salida[ok] = datos[filas[ok], cols[ok]]
+            return salida
+
+        f, c = np.nonzero(datos >= PALETAS[paleta]['umbral'])
+        lat_eco, lon_eco = xy_a_latlon(x1d[c], y1d[f], lat0, lon0)
+        medio_lado = (abs(dy) / 2 / 111000.0, abs(dx) / 2 / 111000.0 / np.cos(np.deg2rad(lat0)))
+
+        return self._generar(muestrear, lat_eco, lon_eco, medio_lado, abs(dx),
+                             producto, marca, paleta, zoom_min, zoom_max)
+
+    def generar_mosaico(self, resultado, zoom_min=4, zoom_max=11):
+        """Genera teselas a partir del resultado de MosaicoNacional.componer_instante"""
+        instante = resultado.get('instante') or datetime.now()
+        return self.generar_latlon(
+            resultado['mosaico'], resultado['lat'], resultado['lon'],
+            producto='mosaico', marca=f"{instante:%Y%m%d%H%M}",
+            paleta='reflectividad', zoom_min=zoom_min, zoom_max=zoom_max
+        )
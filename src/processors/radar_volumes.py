@@ -0,0 +1,115 @@
+"""
+Recorrido de volúmenes de radar IDEAM en orden temporal
+Listado de archivos descargados, timestamps y lectura de sweeps con PyART
+"""
+
+import os
+import re
+import importlib.util
+import numpy as np
+from pathlib import Path
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+# PyART se importa al leer el primer volumen
+PYART_AVAILABLE = importlib.util.find_spec('pyart') is not None
+
+# Formato típico: PREFIJOYYMMDDHHMMSS.RAW[.gz]  (ej: BAR241211010000.RAW)
+PATRON_NOMBRE = re.compile(r'^([A-Z]{3})(\d{6})(\d{6})')
+
+
+def parsear_timestamp(nombre_archivo):
+    """Extrae el timestamp del nombre de un volumen; None si no coincide"""
+    match = PATRON_NOMBRE.match(os.path.basename(str(nombre_archivo)))
+    if not match:
+        return None
+
+    try:
+        return datetime.strptime(match.group(2) + match.group(3), "%y%m%d%H%M%S")
+    except ValueError:
+        return None
+
+
+def listar_volumenes(radar, data_dir="data/Radar_IDEAM", inicio=None, fin=None):
+    """
+    Lista los volúmenes descargados de un radar ordenados por tiempo
+
+    Usa os.scandir y descarta directorios de fecha (YYYYMMDD) fuera del rango
+    sin recorrerlos.
+
+    Returns:
+        Lista de tuplas (timestamp, Path)
+    """
+    radar_dir = Path(data_dir) / radar
+    if not radar_dir.exists():
+        logger.warning(f"No hay datos descargados para {radar}")
+        return []
+
+    dia_inicio = inicio.strftime("%Y%m%d") if inicio else None
+    dia_fin = fin.strftime("%Y%m%d") if fin else None
+
+    volumenes = []
+    with os.scandir(radar_dir) as dirs_fecha:
+        for dir_fecha in dirs_fecha:
+            if not dir_fecha.is_dir():
+                continue
+            if dia_inicio and dir_fecha.name < dia_inicio:
+                continue
+            if dia_fin and dir_fecha.name > dia_fin:
+                continue
+
+            with os.scandir(dir_fecha.path) as archivos:
+                for archivo in archivos:
+                    if not archivo.is_file() or archivo.name.endswith(('.txt', '.part')):
+                        continue
+
+                    timestamp = parsear_timestamp(archivo.name)
+                    if timestamp is None:
+                        continue
+                    if inicio and timestamp < inicio:
+                        continue
+                    if fin and timestamp > fin:
+                        continue
+
+                    volumenes.append((timestamp, Path(archivo.path)))
+
+    volumenes.sort(key=lambda v: v[0])
+    return volumenes
+
+
+def leer_volumen(ruta, campos=None):
+    """
+    Lee un volumen con PyART; retorna None si no se puede leer
+
+    Args:
+        ruta: archivo del volumen
+        campos: lista de campos a decodificar (ej. ['reflectivity']); None para todos
+    """
+    if not PYART_AVAILABLE:
+        logger.error("PyART no está disponible")
+        return None
+
+    try:
+        import pyart
+        
+        if campos:
+            return pyart.io.read(str(ruta), include_fields=list(campos))
+        return pyart.io.read(str(ruta))
+    except Exception as e:
+        logger.error(f"Error leyendo volumen {ruta}: {e}")
+        return None
+
+
+def datos_sweep(radar, campo='reflectivity', sweep=0):
+    """Retorna (datos, azimuts) de un campo para un sweep; None si no existe"""
+    if campo not in radar.fields or sweep >= radar.nsweeps:
+        return None
+
+    inicio = radar.sweep_start_ray_index['data'][sweep]
+    fin = radar.sweep_end_ray_index['data'][sweep] + 1
+
+    datos = np.ma.asarray(radar.fields[campo]['data'][inicio:fin])
+    azimuts = np.asarray(radar.azimuth['data'][inicio:fin])
+    return datos, azimuts
@@ -0,0 +1 @@
+# Tests unitarios del procesamiento y descarga de radar (src/)
\ No newline at end of file
@@ -0,0 +1,77 @@
+"""
+Tests del acumulado de precipitación (src/processors/radar_accumulation.py)
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from src.processors.radar_accumulation import AcumuladorPrecipitacion, reflectividad_a_lluvia
+
+T0 = datetime(2026, 1, 1, 0, 0)
+
+
+@pytest.fixture
+def acumulador():
+    # Rejilla de 4 x 4 celdas y una sola ventana horaria
+    return AcumuladorPrecipitacion(alcance_m=2000, resolucion_m=1000,
+                                   ventanas={'horario': timedelta(hours=1)})
+
+
+def _tasa(acumulador, valor):
+    return np.full(acumulador.rejilla.forma, valor, dtype=np.float32)
+
+
+def test_relacion_z_r():
+    tasa = reflectividad_a_lluvia([0.0, 4.9, 10 * np.log10(200.0), 55.0, 70.0])
+    assert tasa[0] == tasa[1] == 0.0           # por debajo de dbz_min no llueve
+    assert tasa[2] == pytest.approx(1.0)       # Z = 200 -> 1 mm/h con Marshall-Palmer
+    assert tasa[3] == tasa[4]                  # recorte por granizo en dbz_max
+
+
+def test_tasa_constante_cierra_la_hora(acumulador):
+    cerradas = []
+    for minuto in range(0, 61, 5):
+        cerradas += acumulador.agregar(T0 + timedelta(minutes=minuto), _tasa(acumulador, 10.0))
+
+    assert len(cerradas) == 1
+    hora = cerradas[0]
+    assert (hora['inicio'], hora['fin']) == (T0, T0 + timedelta(hours=1))
+    assert np.allclose(hora['acumulado_mm'], 10.0)
+    assert hora['cobertura'] == pytest.approx(1.0)
+    assert hora['completa']
+
+
+def test_integracion_trapezoidal_de_una_rampa(acumulador):
+    # De 0 a 12 mm/h en una hora (un volumen cada 10 min): el área bajo la rampa es 6 mm
+    cerradas = []
+    for minuto in range(0, 61, 10):
+        cerradas += acumulador.agregar(T0 + timedelta(minutes=minuto), _tasa(acumulador, minuto / 5.0))
+    hora, = cerradas
+    assert np.allclose(hora['acumulado_mm'], 6.0)
+
+
+def test_tramo_que_cruza_el_limite_se_reparte(acumulador):
+    acumulador.agregar(T0 + timedelta(minutes=55), _tasa(acumulador, 12.0))
+    hora, = acumulador.agregar(T0 + timedelta(minutes=65), _tasa(acumulador, 12.0))
+    assert np.allclose(hora['acumulado_mm'], 1.0)   # 5 minutos a 12 mm/h
+    siguiente, = acumulador.finalizar()
+    assert siguiente['inicio'] == T0 + timedelta(hours=1)
+    assert np.allclose(siguiente['acumulado_mm'], 1.0)
+    assert not siguiente['completa']
+
+
+def test_hueco_mayor_al_maximo_solo_cubre_los_bordes(acumulador):
+    # Con max_hueco = 15 min cada volumen cubre 7.5 min a su lado del hueco
+    acumulador.agregar(T0, _tasa(acumulador, 10.0))
+    hora, = acumulador.agregar(T0 + timedelta(hours=1), _tasa(acumulador, 10.0))
+    assert np.allclose(hora['acumulado_mm'], 10.0 * 15 / 60)
+    assert hora['cobertura'] == pytest.approx(0.25)
+    assert hora['num_volumenes'] == 1
+
+
+def test_volumen_fuera_de_orden_se_ignora(acumulador):
+    acumulador.agregar(T0 + timedelta(minutes=10), _tasa(acumulador, 10.0))
+    assert acumulador.agregar(T0 + timedelta(minutes=5), _tasa(acumulador, 99.0)) == []
+    hora, = acumulador.agregar(T0 + timedelta(hours=1), _tasa(acumulador, 10.0))
+    assert hora['acumulado_mm'].max() < 99.0
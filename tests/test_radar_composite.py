@@ -0,0 +1,83 @@
+"""
+Tests de la composición del mosaico nacional (src/processors/radar_composite.py)
+"""
+import numpy as np
+import pytest
+
+from src.processors import radar_composite
+from src.processors.radar_composite import MosaicoNacional, SIN_ECO_DBZ
+
+# Caja entre Guaviare y Carimagua (~2.4° de separación): hay celdas cubiertas por ambos
+LIMITES = {'lat_min': 2.4, 'lat_max': 4.8, 'lon_min': -73.0, 'lon_max': -71.0}
+
+
+class _TablaConstante:
+    """Proyección falsa: cada celda de la huella recibe el valor del 'volumen'"""
+
+    def __init__(self, huella):
+        self.huella = huella
+
+    def aplicar(self, datos, azimuts, relleno=np.nan, enmascarado=np.nan):
+        return np.full(self.huella.forma, enmascarado if datos is None else datos, dtype=np.float32)
+
+
+@pytest.fixture
+def mosaico(monkeypatch):
+    # Los 'volúmenes' son directamente el valor en dBZ de todo el sweep
+    monkeypatch.setattr(radar_composite, 'datos_sweep', lambda radar, campo, sweep: (radar, None))
+    monkeypatch.setattr(radar_composite, 'tabla_para_sweep', lambda radar, sweep, huella: _TablaConstante(huella))
+    return MosaicoNacional(radares=['Guaviare', 'Carimagua'], resolucion_deg=0.1,
+                           alcance_m=240000, limites=LIMITES)
+
+
+def _celdas_comunes(mosaico):
+    g, c = mosaico.huellas['Guaviare'], mosaico.huellas['Carimagua']
+    comunes, en_g, en_c = np.intersect1d(g.celdas, c.celdas, return_indices=True)
+    assert len(comunes) > 0
+    return comunes, g.distancia[en_g], c.distancia[en_c]
+
+
+def test_metodo_max(mosaico):
+    resultado = mosaico.componer({'Guaviare': 30.0, 'Carimagua': 45.0}, 'max')
+    comunes, _, _ = _celdas_comunes(mosaico)
+
+    assert np.all(resultado['mosaico'].ravel()[comunes] == 45.0)
+    assert np.all(resultado['radar_origen'].ravel()[comunes] == resultado['radares'].index('Carimagua'))
+
+
+def test_metodo_cercano(mosaico):
+    resultado = mosaico.componer({'Guaviare': 30.0, 'Carimagua': 45.0}, 'cercano')
+    comunes, dist_g, dist_c = _celdas_comunes(mosaico)
+
+    esperado = np.where(dist_g < dist_c, 30.0, 45.0)
+    assert np.array_equal(resultado['mosaico'].ravel()[comunes], esperado)
+
+
+def test_metodo_ponderado_por_inverso_de_la_distancia(mosaico):
+    resultado = mosaico.componer({'Guaviare': 30.0, 'Carimagua': 45.0}, 'ponderado')
+    comunes, dist_g, dist_c = _celdas_comunes(mosaico)
+
+    w_g = 1.0 / np.maximum(dist_g, 1000.0) ** 2
+    w_c = 1.0 / np.maximum(dist_c, 1000.0) ** 2
+    esperado = (30.0 * w_g + 45.0 * w_c) / (w_g + w_c)
+    assert np.allclose(resultado['mosaico'].ravel()[comunes], esperado, rtol=1e-4)
+
+    # Donde solo hay un radar el promedio es su propio valor
+    solo_g = np.setdiff1d(mosaico.huellas['Guaviare'].celdas, mosaico.huellas['Carimagua'].celdas)
+    assert np.allclose(resultado['mosaico'].ravel()[solo_g], 30.0)
+
+
+def test_gates_sin_eco_y_celdas_sin_cobertura(mosaico):
+    resultado = mosaico.componer({'Guaviare': None}, 'max')
+    plano = resultado['mosaico'].ravel()
+    cubiertas = mosaico.huellas['Guaviare'].celdas
+
+    assert np.all(plano[cubiertas] == SIN_ECO_DBZ)
+    fuera = np.setdiff1d(np.arange(plano.size), cubiertas)
+    assert np.all(np.isnan(plano[fuera]))
+    assert resultado['radares_usados'] == ['Guaviare']
+
+
+def test_metodo_desconocido(mosaico):
+    with pytest.raises(ValueError):
+        mosaico.componer({}, 'promedio')
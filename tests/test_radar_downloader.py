@@ -0,0 +1,117 @@
+"""
+Tests de la descarga reanudable y verificada (src/data_sources/ideam_radar_downloader.py)
+"""
+import hashlib
+
+import pytest
+from botocore.exceptions import ClientError
+
+from src.data_sources.ideam_radar_downloader import IDEAMRadarDownloader
+
+CONTENIDO = bytes(range(256)) * 40
+ETAG = hashlib.md5(CONTENIDO).hexdigest()
+
+
+class _Cuerpo:
+    def __init__(self, datos, cortar_en=None):
+        self.datos = datos
+        self.cortar_en = cortar_en
+
+    def iter_chunks(self, tamaño):
+        if self.cortar_en is None:
+            yield self.datos
+            return
+        yield self.datos[:self.cortar_en]
+        raise ConnectionError("conexión reiniciada")
+
+
+class _S3Objeto:
+    """Cliente S3 que sirve un objeto con Range/IfMatch; puede cortar la primera respuesta"""
+
+    def __init__(self, contenido, etag, cortar_en=None):
+        self.contenido = contenido
+        self.etag = etag
+        self.cortar_en = cortar_en
+        self.peticiones = []
+
+    def get_object(self, Bucket, Key, Range, IfMatch):
+        self.peticiones.append(Range)
+        if IfMatch != f'"{self.etag}"':
+            raise ClientError({'Error': {'Code': 'PreconditionFailed'}}, 'GetObject')
+        inicio = int(Range[len('bytes='):].rstrip('-'))
+        cortar_en, self.cortar_en = self.cortar_en, None
+        return {'Body': _Cuerpo(self.contenido[inicio:], cortar_en)}
+
+    def head_object(self, Bucket, Key):
+        return {'ContentLength': len(self.contenido), 'ETag': f'"{self.etag}"'}
+
+
+def _descargador(s3):
+    # Sin __init__: no crea el cliente boto3 real ni el inventario en disco
+    descargador = IDEAMRadarDownloader.__new__(IDEAMRadarDownloader)
+    descargador.s3_client = s3
+    descargador.bucket_name = 'bucket'
+    descargador.espejo = type('EspejoVacio', (), {'objeto': lambda self, key: None})()
+    return descargador
+
+
+def test_descarga_se_reanuda_desde_el_parcial(tmp_path):
+    s3 = _S3Objeto(CONTENIDO, ETAG, cortar_en=3000)
+    destino = tmp_path / 'GUA240315000000.RAWA001'
+
+    assert _descargador(s3)._descargar_verificado('key', destino, {'size': len(CONTENIDO), 'etag': ETAG})
+
+    assert s3.peticiones == ['bytes=0-', 'bytes=3000-']
+    assert destino.read_bytes() == CONTENIDO
+    assert not destino.with_name(destino.name + '.part').exists()
+
+
+def test_parcial_mayor_al_objeto_se_descarta(tmp_path):
+    destino = tmp_path / 'vol.RAW'
+    destino.with_name('vol.RAW.part').write_bytes(b'x' * (len(CONTENIDO) + 10))
+    s3 = _S3Objeto(CONTENIDO, ETAG)
+
+    assert _descargador(s3)._descargar_verificado('key', destino, {'size': len(CONTENIDO), 'etag': ETAG})
+    assert s3.peticiones == ['bytes=0-']
+    assert destino.read_bytes() == CONTENIDO
+
+
+def test_objeto_vacio_no_hace_get(tmp_path):
+    s3 = _S3Objeto(b'', hashlib.md5(b'').hexdigest())
+    destino = tmp_path / 'vacio.RAW'
+
+    assert _descargador(s3)._descargar_verificado('key', destino, {'size': 0, 'etag': s3.etag})
+    assert s3.peticiones == []
+    assert destino.exists() and destino.stat().st_size == 0
+
+
+def test_md5_distinto_no_publica_el_archivo(tmp_path):
+    s3 = _S3Objeto(CONTENIDO, 'f' * 32)
+    destino = tmp_path / 'vol.RAW'
+    esperado = {'size': len(CONTENIDO), 'etag': 'f' * 32}
+
+    assert not _descargador(s3)._descargar_verificado('key', destino, esperado, intentos=2)
+    assert len(s3.peticiones) == 2
+    assert not destino.exists()
+    assert not destino.with_name('vol.RAW.part').exists()
+
+
+def test_objeto_cambiado_en_s3_reinicia_la_descarga(tmp_path):
+    destino = tmp_path / 'vol.RAW'
+    destino.with_name('vol.RAW.part').write_bytes(b'viejo')
+    s3 = _S3Objeto(CONTENIDO, ETAG)
+    esperado = {'size': 9999, 'etag': 'etag-anterior'}
+
+    assert _descargador(s3)._descargar_verificado('key', destino, esperado)
+
+    # El 412 borra el parcial y relee tamaño y ETag del objeto actual
+    assert esperado == {'size': len(CONTENIDO), 'etag': ETAG}
+    assert s3.peticiones == ['bytes=5-', 'bytes=0-']
+    assert destino.read_bytes() == CONTENIDO
+
+
+@pytest.mark.parametrize('etag', ['', 'abc-3'])
+def test_etag_multiparte_no_se_compara_con_md5(tmp_path, etag):
+    ruta = tmp_path / 'vol.RAW'
+    ruta.write_bytes(CONTENIDO)
+    assert _descargador(None)._verificar_md5(ruta, etag)
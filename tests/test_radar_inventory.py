@@ -0,0 +1,89 @@
+"""
+Tests del inventario incremental de volúmenes descargados (src/data_sources/radar_inventory.py)
+"""
+import os
+import shutil
+
+import pytest
+
+from src.data_sources.radar_inventory import InventarioRadar
+
+
+def _archivo(directorio, nombre, contenido=b'volumen'):
+    directorio.mkdir(parents=True, exist_ok=True)
+    ruta = directorio / nombre
+    ruta.write_bytes(contenido)
+    return ruta
+
+
+def _tocar(directorio, segundos):
+    # Fija el mtime del directorio para no depender de la resolución del sistema de archivos
+    os.utime(directorio, ns=(segundos * 10**9, segundos * 10**9))
+
+
+@pytest.fixture
+def base(tmp_path):
+    dia = tmp_path / 'Guaviare' / '20240315'
+    _archivo(dia, 'GUA240315000000.RAWA001')
+    _archivo(dia, 'GUA240315000500.RAWA002')
+    _archivo(dia, 'resumen.txt')
+    _archivo(dia, 'GUA240315001000.RAWA003.part')
+    _tocar(dia, 1_700_000_000)
+    return tmp_path
+
+
+def test_primera_reconciliacion_indexa_solo_volumenes(base):
+    inventario = InventarioRadar(base)
+    assert inventario.vacio()
+
+    resumen = inventario.reconciliar()
+
+    assert resumen == {'directorios_revisados': 1, 'nuevos': 2, 'eliminados': 0}
+    assert inventario.reconciliado()
+    assert sorted(inventario.como_dataframe()['archivo']) == \
+        ['GUA240315000000.RAWA001', 'GUA240315000500.RAWA002']
+
+
+def test_directorios_sin_cambios_no_se_recorren(base):
+    inventario = InventarioRadar(base)
+    inventario.reconciliar()
+    version = inventario.version()
+
+    assert inventario.reconciliar() == {'directorios_revisados': 0, 'nuevos': 0, 'eliminados': 0}
+    assert inventario.version() == version
+
+
+def test_cambios_en_un_directorio_de_fecha(base):
+    inventario = InventarioRadar(base)
+    inventario.reconciliar()
+
+    dia = base / 'Guaviare' / '20240315'
+    (dia / 'GUA240315000000.RAWA001').unlink()
+    _archivo(dia, 'GUA240315001500.RAWA004')
+    _tocar(dia, 1_700_000_600)
+
+    assert inventario.reconciliar() == {'directorios_revisados': 1, 'nuevos': 1, 'eliminados': 1}
+    assert sorted(inventario.como_dataframe()['archivo']) == \
+        ['GUA240315000500.RAWA002', 'GUA240315001500.RAWA004']
+
+
+def test_directorio_de_fecha_borrado(base):
+    inventario = InventarioRadar(base)
+    inventario.reconciliar()
+
+    shutil.rmtree(base / 'Guaviare' / '20240315')
+
+    assert inventario.reconciliar()['eliminados'] == 2
+    assert inventario.como_dataframe().empty
+
+
+def test_registrar_y_reconciliar_no_duplican(base):
+    inventario = InventarioRadar(base)
+    ruta = _archivo(base / 'Guaviare' / '20240316', 'GUA240316000000.RAWA005')
+
+    assert inventario.registrar('Guaviare', ruta)
+    assert not inventario.reconciliado()
+    assert not inventario.registrar('Guaviare', base / 'no_existe.RAW')
+
+    inventario.reconciliar()
+    assert len(inventario.como_dataframe()) == 3
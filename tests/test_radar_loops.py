@@ -0,0 +1,86 @@
+"""
+Tests de la caché de cuadros de los loops de radar (src/processors/radar_loops.py)
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from src.processors.radar_loops import GeneradorLoops
+
+INSTANTE = datetime(2024, 3, 15, 12, 0)
+
+
+class _MosaicoFalso:
+    """Mosaico con dos radares cuya disponibilidad de volúmenes cambia entre llamadas"""
+
+    def __init__(self):
+        self.huellas = {'Guaviare': None, 'Carimagua': None}
+        self.disponibles = {}
+        self.composiciones = 0
+
+    def volumenes_sincronizados(self, instante, tolerancia):
+        return dict(self.disponibles)
+
+    def componer_instante(self, instante, metodo, tolerancia, seleccion=None):
+        if not seleccion:
+            return None
+        self.composiciones += 1
+        return {'mosaico': np.full((4, 4), 30.0, dtype=np.float32), 'radares_usados': list(seleccion)}
+
+
+class _TeselasFalsas:
+    def colorear(self, valores, paleta):
+        return np.full(valores.shape + (4,), 200, dtype=np.uint8)
+
+
+@pytest.fixture
+def generador(tmp_path):
+    generador = GeneradorLoops(cache_dir=tmp_path / 'cache', output_dir=tmp_path / 'loops',
+                               data_dir=tmp_path / 'datos', tamaño=40)
+    generador._mosaico = _MosaicoFalso()
+    generador._teselas = _TeselasFalsas()
+    return generador
+
+
+def _volumen(nombre, minutos):
+    return (INSTANTE + timedelta(minutes=minutos), f"{nombre}.RAW")
+
+
+def test_cuadro_provisional_se_recompone_con_volumenes_tardios(generador):
+    mosaico = generador._mosaico
+    mosaico.disponibles = {'Guaviare': _volumen('Guaviare', 1)}
+
+    ruta = generador.cuadro_mosaico(INSTANTE)
+    provisional = ruta.with_suffix('.json')
+    assert ruta.exists() and provisional.exists()
+
+    # Sin volúmenes nuevos se reutiliza el cuadro provisional
+    assert generador.cuadro_mosaico(INSTANTE) == ruta
+    assert mosaico.composiciones == 1
+
+    # Llega el segundo radar: se recompone y el cuadro deja de ser provisional
+    mosaico.disponibles['Carimagua'] = _volumen('Carimagua', -2)
+    generador.cuadro_mosaico(INSTANTE)
+    assert mosaico.composiciones == 2
+    assert not provisional.exists()
+
+    # Un cuadro completo no vuelve a consultar los volúmenes
+    mosaico.disponibles = {}
+    assert generador.cuadro_mosaico(INSTANTE) == ruta
+    assert mosaico.composiciones == 2
+
+
+def test_sin_volumenes_no_hay_cuadro(generador):
+    assert generador.cuadro_mosaico(INSTANTE) is None
+    assert not generador.ruta_cuadro('mosaico', INSTANTE).exists()
+
+
+def test_podar_cache_elimina_cuadros_y_sidecars(generador):
+    generador._mosaico.disponibles = {'Guaviare': _volumen('Guaviare', 0)}
+    antiguo = generador.cuadro_mosaico(INSTANTE)
+    reciente = generador.cuadro_mosaico(INSTANTE + timedelta(hours=1))
+
+    assert generador.podar_cache('mosaico', INSTANTE + timedelta(minutes=30)) == 1
+    assert not antiguo.exists() and not antiguo.with_suffix('.json').exists()
+    assert reciente.exists() and reciente.with_suffix('.json').exists()
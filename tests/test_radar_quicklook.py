@@ -0,0 +1,66 @@
+"""
+Tests del rasterizador rápido de PPI (src/processors/radar_quicklook.py)
+"""
+import numpy as np
+import pytest
+
+from src.processors import radar_quicklook
+from src.processors.radar_quicklook import RasterizadorPPI
+
+
+class _Radar:
+    """Geometría mínima de un volumen: rangos de gates y elevación de cada sweep"""
+
+    def __init__(self, num_gates=50, paso_m=1000.0):
+        self.range = {'data': (np.arange(num_gates) + 0.5) * paso_m}
+        self.fixed_angle = {'data': np.array([0.5])}
+
+
+AZIMUTS = np.arange(360) + 0.5
+
+
+@pytest.fixture
+def rasterizador(monkeypatch):
+    # El 'radar' trae sus datos en el atributo campo para no depender de PyART
+    monkeypatch.setattr(radar_quicklook, 'datos_sweep',
+                        lambda radar, campo, sweep: (radar.campo, AZIMUTS))
+    return RasterizadorPPI(tamaño=40)
+
+
+def test_campo_constante_sin_paleta(rasterizador):
+    radar = _Radar()
+    radar.campo = np.full((360, 50), 7.0, dtype=np.float32)
+
+    lut, vmin, vmax = rasterizador._lut('campo_nuevo', radar.campo)
+    assert (vmin, vmax) == (7.0, 8.0)
+
+    with np.errstate(all='raise'):
+        rgba = rasterizador.rasterizar(radar, 'campo_nuevo')
+    assert rgba.shape == (40, 40, 4)
+    # Todos los pixeles cubiertos toman el primer color de la LUT
+    cubiertos = rgba[..., 3] > 0
+    assert cubiertos.any()
+    assert np.all(rgba[cubiertos] == lut[1])
+
+
+def test_campo_sin_datos_validos(rasterizador):
+    datos = np.ma.masked_all((360, 50), dtype=np.float32)
+    _, vmin, vmax = rasterizador._lut('campo_nuevo', datos)
+    assert (vmin, vmax) == (0.0, 1.0)
+
+
+def test_mapa_de_pixeles_por_geometria(rasterizador):
+    # Mismo alcance (misma rejilla) pero gates de distinto tamaño: no deben compartir mapa
+    finos = _Radar(num_gates=50, paso_m=1000.0)
+    gruesos = _Radar(num_gates=25, paso_m=2000.0)
+    finos.campo = np.tile(np.arange(50, dtype=np.float32), (360, 1))
+    gruesos.campo = np.tile(np.arange(25, dtype=np.float32) * 2, (360, 1))
+    rasterizador.alcance_m = 50000.0
+
+    rasterizador.rasterizar(finos, 'reflectivity')
+    rasterizador.rasterizar(gruesos, 'reflectivity')
+    assert len(rasterizador._mapas) == 2
+
+    # Un volumen con la misma estrategia de escaneo reutiliza el mapa
+    rasterizador.rasterizar(finos, 'reflectivity')
+    assert len(rasterizador._mapas) == 2
@@ -0,0 +1,111 @@
+"""
+Tests de la lectura parcial de volúmenes IRIS por HTTP Range (src/data_sources/radar_range_reader.py)
+"""
+import io
+import struct
+from datetime import datetime
+
+import pytest
+
+from src.data_sources.radar_range_reader import (
+    LectorParcialS3, MAGIA_GZIP, OFFSET_INICIO_VOLUMEN, OFFSET_NOMBRE_SITIO,
+    OFFSET_SWEEPS_COMPLETOS, OFFSET_TAMAÑO_TOTAL, OFFSET_VERSION_IRIS,
+    REGISTROS_ENCABEZADO, TAMAÑO_REGISTRO, parsear_encabezado,
+)
+
+
+def _encabezados(sweeps=3, sitio=b'GUAVIARE'):
+    """product_hdr vacío + ingest_header con los campos que lee parsear_encabezado"""
+    datos = bytearray(REGISTROS_ENCABEZADO * TAMAÑO_REGISTRO)
+    ingest = TAMAÑO_REGISTRO
+    struct.pack_into('<h', datos, ingest + OFFSET_SWEEPS_COMPLETOS, sweeps)
+    struct.pack_into('<i', datos, ingest + OFFSET_TAMAÑO_TOTAL, 123456)
+    struct.pack_into('<iHhhh', datos, ingest + OFFSET_INICIO_VOLUMEN, 3600 + 61, 250, 2024, 3, 15)
+    datos[ingest + OFFSET_VERSION_IRIS:ingest + OFFSET_VERSION_IRIS + 5] = b'8.13\x00'
+    datos[ingest + OFFSET_NOMBRE_SITIO:ingest + OFFSET_NOMBRE_SITIO + len(sitio)] = sitio
+    return datos
+
+
+def _volumen(registros_por_sweep):
+    """Encabezados seguidos de registros de datos cuyo raw_prod_bhdr lleva el sweep (desde 1)"""
+    datos = _encabezados(sweeps=len(registros_por_sweep))
+    for numero, cantidad in enumerate(registros_por_sweep, start=1):
+        for _ in range(cantidad):
+            registro = bytearray(TAMAÑO_REGISTRO)
+            struct.pack_into('<hh', registro, 0, len(datos) // TAMAÑO_REGISTRO, numero)
+            datos += registro
+    return bytes(datos)
+
+
+class _S3Rangos:
+    """Cliente S3 mínimo que sirve un objeto en memoria y registra los rangos pedidos"""
+
+    def __init__(self, contenido):
+        self.contenido = contenido
+        self.rangos = []
+
+    def get_object(self, Bucket, Key, Range=None):
+        if Range is None:
+            cuerpo = self.contenido
+        else:
+            inicio, fin = (int(v) for v in Range[len('bytes='):].split('-'))
+            self.rangos.append((inicio, fin))
+            cuerpo = self.contenido[inicio:fin + 1]
+        return {'Body': io.BytesIO(cuerpo)}
+
+    def head_object(self, Bucket, Key):
+        return {'ContentLength': len(self.contenido)}
+
+
+def test_parsear_encabezado_lee_los_offsets_del_ingest_header():
+    encabezado = parsear_encabezado(bytes(_encabezados()))
+
+    assert encabezado['sweeps'] == 3
+    assert encabezado['tamaño_total'] == 123456
+    assert encabezado['inicio_volumen'] == datetime(2024, 3, 15, 1, 1, 1, 250000)
+    assert encabezado['version_iris'] == '8.13'
+    assert encabezado['sitio'] == 'GUAVIARE'
+
+
+def test_encabezado_incompleto():
+    with pytest.raises(ValueError):
+        parsear_encabezado(bytes(TAMAÑO_REGISTRO + 10))
+
+
+def test_localizar_sweeps_por_busqueda_binaria():
+    s3 = _S3Rangos(_volumen([4, 3, 5]))
+    rangos = LectorParcialS3(s3, 'bucket').localizar_sweeps('key', [0, 1, 2])
+
+    primero = REGISTROS_ENCABEZADO * TAMAÑO_REGISTRO
+    assert rangos == {
+        0: (primero, primero + 4 * TAMAÑO_REGISTRO),
+        1: (primero + 4 * TAMAÑO_REGISTRO, primero + 7 * TAMAÑO_REGISTRO),
+        2: (primero + 7 * TAMAÑO_REGISTRO, primero + 12 * TAMAÑO_REGISTRO),
+    }
+    # Solo se leen los 4 bytes del raw_prod_bhdr de cada registro sondeado
+    assert all(fin - inicio == 3 for inicio, fin in s3.rangos)
+
+
+def test_leer_sweeps_arma_un_volumen_reducido():
+    contenido = _volumen([2, 3, 2])
+    s3 = _S3Rangos(contenido)
+    datos, transferidos = LectorParcialS3(s3, 'bucket').leer_sweeps('key', sweeps=(1,))
+
+    assert transferidos == len(datos) == (REGISTROS_ENCABEZADO + 3) * TAMAÑO_REGISTRO
+    inicio = (REGISTROS_ENCABEZADO + 2) * TAMAÑO_REGISTRO
+    assert datos[REGISTROS_ENCABEZADO * TAMAÑO_REGISTRO:] == contenido[inicio:inicio + 3 * TAMAÑO_REGISTRO]
+    # El ingest_header declara solo los sweeps incluidos
+    assert parsear_encabezado(datos)['sweeps'] == 1
+
+
+def test_leer_sweeps_inexistentes():
+    with pytest.raises(ValueError):
+        LectorParcialS3(_S3Rangos(_volumen([2])), 'bucket').leer_sweeps('key', sweeps=(4,))
+
+
+def test_volumen_comprimido_se_descarga_completo():
+    contenido = MAGIA_GZIP + bytes(3 * TAMAÑO_REGISTRO)
+    lector = LectorParcialS3(_S3Rangos(contenido), 'bucket')
+
+    assert lector.leer_encabezado('key') == {'key': 'key', 'comprimido': True}
+    assert lector.leer_sweeps('key') == (contenido, len(contenido))
@@ -0,0 +1,87 @@
+"""
+Tests del espejo local del listado S3 (src/data_sources/radar_s3_mirror.py)
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from src.data_sources.radar_s3_mirror import EspejoS3Radar
+
+
+def _key(dia, hora):
+    return f"l2_data/{dia:%Y/%m/%d}/Guaviare/GUA{dia:%y%m%d}{hora}.RAWA001"
+
+
+class _S3Listado:
+    """Cliente S3 con un listado fijo paginado como list_objects_v2 (StartAfter incluido)"""
+
+    def __init__(self, keys, por_pagina=2):
+        self.keys = sorted(keys)
+        self.por_pagina = por_pagina
+
+    def get_paginator(self, operacion):
+        return self
+
+    def paginate(self, Bucket, Prefix, StartAfter=''):
+        keys = [k for k in self.keys if k.startswith(Prefix) and k > StartAfter]
+        for i in range(0, len(keys), self.por_pagina):
+            yield {'Contents': [{'Key': k, 'Size': 100, 'ETag': '"abc"',
+                                 'LastModified': datetime(2024, 3, 20)}
+                                for k in keys[i:i + self.por_pagina]]}
+
+
+DIA = date(2024, 3, 15)
+KEYS = [_key(DIA, h) for h in ('000000', '000500', '001000')] + \
+       [_key(DIA + timedelta(days=1), h) for h in ('000000', '000500', '001000')]
+
+
+@pytest.fixture
+def espejo(tmp_path):
+    return EspejoS3Radar(_S3Listado(KEYS), 'bucket', tmp_path)
+
+
+def test_sincronizar_llena_el_espejo(espejo):
+    resumen = espejo.sincronizar(desde=DIA)
+
+    assert resumen == {'objetos': 6, 'eliminados': 0, 'paginas': 3}
+    assert [a['key'] for a in espejo.archivos('Guaviare', DIA)] == KEYS[:3]
+    assert espejo.objeto(KEYS[0]) == {'size': 100, 'etag': 'abc'}
+
+
+def test_llaves_borradas_en_origen_se_eliminan(espejo):
+    espejo.sincronizar(desde=DIA)
+    # En el último día (el que se vuelve a listar) se borra una llave intermedia...
+    espejo.s3_client.keys = [k for k in KEYS if k not in (KEYS[1], KEYS[4])]
+    assert espejo.sincronizar()['eliminados'] == 1
+    assert espejo.objeto(KEYS[4]) is None
+
+    # ...y luego la última del bucket, que no queda entre dos llaves listadas
+    espejo.s3_client.keys = [k for k in KEYS if k not in (KEYS[1], KEYS[4], KEYS[5])]
+    assert espejo.sincronizar()['eliminados'] == 1
+    assert espejo.objeto(KEYS[5]) is None
+    assert espejo.objeto(KEYS[3]) is not None
+    # Los días anteriores al tramo listado no se revisan
+    assert espejo.objeto(KEYS[1]) is not None
+
+
+def test_sincronizar_con_hasta_no_borra_lo_posterior(espejo):
+    espejo.sincronizar(desde=DIA)
+    espejo.s3_client.keys = [k for k in KEYS if k != KEYS[1]]
+
+    # Volver a listar desde antes fuerza el tramo; el listado se corta al pasar de hasta
+    resumen = espejo.sincronizar(desde=DIA - timedelta(days=1), hasta=DIA)
+
+    assert resumen['eliminados'] == 1
+    assert espejo.objeto(KEYS[1]) is None
+    assert all(espejo.objeto(k) is not None for k in KEYS[3:])
+
+
+def test_huecos_con_fechas_sin_hora_cubren_el_dia(espejo):
+    espejo.sincronizar(desde=DIA)
+    huecos = espejo.huecos('Guaviare', DIA, DIA)
+
+    # Después del último volumen (00:10) el resto del día es un hueco
+    assert len(huecos) == 1
+    desde, hasta, duracion = huecos[0]
+    assert desde == datetime(2024, 3, 15, 0, 10)
+    assert hasta.date() == DIA and hasta.hour == 23
@@ -0,0 +1,30 @@
+"""
+Tests de la aritmética de teselas XYZ (src/processors/radar_tiles.py)
+"""
+import numpy as np
+import pytest
+
+from src.processors.radar_tiles import lat_a_tesela, lon_a_tesela, tesela_a_lat, tesela_a_lon
+
+
+@pytest.mark.parametrize('zoom', [0, 5, 11])
+def test_ida_y_vuelta_latlon_tesela(zoom):
+    lat = np.array([-4.2, 0.0, 6.25, 13.4])
+    lon = np.array([-79.9, -75.57, -70.0, -66.6])
+
+    assert np.allclose(tesela_a_lat(lat_a_tesela(lat, zoom), zoom), lat)
+    assert np.allclose(tesela_a_lon(lon_a_tesela(lon, zoom), zoom), lon)
+
+
+def test_esquinas_del_mundo():
+    assert lon_a_tesela(-180.0, 3) == pytest.approx(0.0)
+    assert lon_a_tesela(180.0, 3) == pytest.approx(8.0)
+    assert lat_a_tesela(0.0, 3) == pytest.approx(4.0)
+    # Web Mercator recorta en ±85.05°: los polos caen en el borde de la pirámide
+    assert lat_a_tesela(90.0, 3) == pytest.approx(0.0, abs=1e-3)
+    assert lat_a_tesela(-90.0, 3) == pytest.approx(8.0, abs=1e-3)
+
+
+def test_y_crece_hacia_el_sur():
+    y = lat_a_tesela(np.array([10.0, 5.0, 0.0, -4.0]), 7)
+    assert np.all(np.diff(y) > 0)